@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
-from .models import User, TherapistApplication, JournalEntry, SessionRequest, Session # Import all your models
+from .models import User, TherapistApplication, JournalEntry, SessionRequest, Session, Tag # Import all your models
 
 # Define a custom UserAdmin to display extra fields for your custom User model
 class CustomUserAdmin(BaseUserAdmin):
@@ -18,7 +18,7 @@ class CustomUserAdmin(BaseUserAdmin):
     # Add new fieldsets to the user change form
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
-        ('Personal info', {'fields': ('first_name', 'last_name', 'phone', 'profile_picture', 'bio', 'years_of_experience', 'specializations', 'hourly_rate', 'license_credentials', 'approach_modalities', 'languages_spoken', 'client_focus', 'insurance_accepted', 'video_introduction_url', 'is_free_consultation', 'session_modes', 'physical_address')}), # Added new fields here
+        ('Personal info', {'fields': ('first_name', 'last_name', 'phone', 'profile_picture', 'bio', 'years_of_experience', 'specializations', 'hourly_rate', 'license_credentials', 'approach_modalities', 'languages_spoken', 'client_focus', 'insurance_accepted', 'video_introduction_url', 'is_free_consultation', 'session_modes', 'physical_address', 'latitude', 'longitude')}), # Added new fields here
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Therapist Status', {'fields': ('is_therapist', 'is_verified', 'is_available')}), # New fields for therapist status
         ('Important dates', {'fields': ('last_login',)}), # REMOVED 'date_joined' from here
@@ -110,6 +110,13 @@ admin.site.register(JournalEntry)
 admin.site.register(SessionRequest)
 admin.site.register(Session) # Register the new Session model here
 
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'slug')
+    list_filter = ('category',)
+    search_fields = ('name', 'slug')
+
 # Unregister Group if you manage permissions solely through UserAdmin's groups field
 # You might want to keep this if you plan to use Django's built-in group permissions
 # admin.site.unregister(Group)
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MentalHealthAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mental_health_app'
+
+    def ready(self):
+        # Registers the signal handlers that keep the slot calendar and profile tags current.
+        from . import signals  # noqa: F401
@@ -0,0 +1,94 @@
+# File: Backend_work/mental_health_app/authentication.py
+"""
+JWT authentication that resolves the token's user from a cache instead of the database.
+
+Users are cached by token subject (SIMPLE_JWT's USER_ID_CLAIM, the email) in Django's shared
+cache (Redis, see settings.CACHES), so every worker shares one copy and signals.py can drop it
+when a User row is saved or deleted. There is no per-process layer: a deactivated or demoted
+user is seen by every worker as soon as the save commits.
+
+Only AUTH_CACHED_FIELDS are cached, never the password hash. For CHECK_REVOKE_TOKEN the cache
+keeps the same md5 fingerprint of the hash that the tokens themselves carry. The returned User
+has every other field deferred, so reading one costs a query and saving it writes only the
+cached columns.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# What authentication, permission classes and the chat consumer read from request.user.
+AUTH_CACHED_FIELDS = (
+    'id', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'is_therapist', 'is_verified',
+)
+
+
+def _cache_key(user_id):
+    return 'jwt-user:' + hashlib.sha1(str(user_id).encode()).hexdigest()
+
+
+def forget_cached_user(user_id):
+    """Drops a user (by USER_ID_FIELD value) from the shared cache."""
+    cache.delete(_cache_key(user_id))
+
+
+def _cached_fields(user):
+    fields = {field: getattr(user, field) for field in AUTH_CACHED_FIELDS}
+    fields['revoke_hash'] = get_md5_hash_password(user.password)
+    return fields
+
+
+def _user_from_fields(fields):
+    """A User instance holding the cached fields, with everything else deferred."""
+    User = get_user_model()
+    attnames = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+    user = User.from_db(router.db_for_read(User), attnames, [fields[name] for name in attnames])
+    user._revoke_hash = fields['revoke_hash']
+    return user
+
+
+def get_cached_user(user_id):
+    """
+    The user whose USER_ID_FIELD equals `user_id`, from the shared cache or the database.
+    Each call returns its own instance. Raises User.DoesNotExist.
+    """
+    key = _cache_key(user_id)
+    fields = cache.get(key)
+    if fields is None:
+        user = get_user_model().objects.only('password', *AUTH_CACHED_FIELDS).get(
+            **{api_settings.USER_ID_FIELD: user_id}
+        )
+        fields = _cached_fields(user)
+        cache.set(key, fields, getattr(settings, 'AUTH_USER_CACHE_TTL', 300))
+    return _user_from_fields(fields)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication whose user lookup goes through get_cached_user()."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = get_cached_user(user_id)
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        # Same checks as JWTAuthentication.get_user, applied to the cached fields.
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user._revoke_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,161 @@
+# File: Backend_work/mental_health_app/autocomplete.py
+"""
+In-process prefix index for the therapist search box.
+
+Therapist names and specialization tags are kept in two sorted arrays of
+(normalized key, ref) pairs, so a prefix lookup is a bisect to the first match
+followed by a short forward scan, with no database access. Every word of a
+name is indexed, so "doe" finds "Jane Doe".
+
+The whole index is built lazily from one query on first use. After that,
+signals.py updates a single therapist's entries whenever their directory
+fields change. Other worker processes don't see those signals, so each
+process also rebuilds from scratch once its copy is older than
+AUTOCOMPLETE_REBUILD_SECONDS.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .tags import parse_tags
+
+
+def normalize(text):
+    return ' '.join((text or '').casefold().split())
+
+
+def _is_listed(first_name, last_name, is_therapist, is_available, is_verified):
+    return bool(is_therapist and is_available and is_verified and (first_name or last_name))
+
+
+def _name_keys(full_name):
+    """The normalized name and every suffix of it that starts at a word boundary."""
+    words = normalize(full_name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class AutocompleteIndex:
+    def __init__(self, rebuild_seconds):
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._reset()
+
+    def _reset(self):
+        self._names = []         # sorted [(key, therapist_id)]
+        self._therapists = {}    # therapist_id -> (full name, [name keys], {tag slug})
+        self._tags = []          # sorted [(key, slug)]
+        self._tag_names = {}     # slug -> display name
+        self._tag_members = {}   # slug -> {therapist_id}
+
+    # --- Mutations; callers hold self._lock ---
+
+    def _remove(self, therapist_id):
+        entry = self._therapists.pop(therapist_id, None)
+        if entry is None:
+            return
+        _, keys, slugs = entry
+        for key in keys:
+            position = bisect_left(self._names, (key, therapist_id))
+            if position < len(self._names) and self._names[position] == (key, therapist_id):
+                del self._names[position]
+        for slug in slugs:
+            members = self._tag_members[slug]
+            members.discard(therapist_id)
+            if not members:
+                del self._tag_members[slug]
+                self._tags.remove((normalize(self._tag_names.pop(slug)), slug))
+
+    def _add(self, therapist_id, full_name, specializations):
+        keys = sorted(_name_keys(full_name))
+        tags = parse_tags(specializations)
+        self._therapists[therapist_id] = (full_name, keys, set(tags))
+        for key in keys:
+            insort(self._names, (key, therapist_id))
+        for slug, name in tags.items():
+            if slug not in self._tag_members:
+                self._tag_members[slug] = set()
+                self._tag_names[slug] = name
+                insort(self._tags, (normalize(name), slug))
+            self._tag_members[slug].add(therapist_id)
+
+    # --- Public API ---
+
+    def rebuild(self):
+        from .models import User
+
+        rows = User.objects.filter(is_therapist=True, is_available=True, is_verified=True).values_list(
+            'id', 'first_name', 'last_name', 'specializations'
+        )
+        with self._lock:
+            self._reset()
+            for therapist_id, first_name, last_name, specializations in rows:
+                if first_name or last_name:
+                    self._add(therapist_id, f"{first_name} {last_name}".strip(), specializations)
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.rebuild_seconds:
+            self.rebuild()
+
+    def update_therapist(self, user):
+        """Re-indexes one user from its current field values; unlisted users are just removed."""
+        if self._built_at is None:
+            return  # Nothing built yet; the first lookup will load the current state.
+        with self._lock:
+            self._remove(user.pk)
+            if _is_listed(user.first_name, user.last_name, user.is_therapist, user.is_available, user.is_verified):
+                self._add(user.pk, f"{user.first_name} {user.last_name}".strip(), user.specializations)
+
+    def remove_therapist(self, therapist_id):
+        with self._lock:
+            self._remove(therapist_id)
+
+    def suggest(self, prefix, limit):
+        """
+        Up to `limit` suggestions for `prefix`: matching specializations first (most therapists
+        first), then matching therapists in name order.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            specializations = []
+            position = bisect_left(self._tags, (prefix,))
+            while position < len(self._tags) and self._tags[position][0].startswith(prefix):
+                slug = self._tags[position][1]
+                specializations.append({
+                    "type": "specialization",
+                    "label": self._tag_names[slug],
+                    "slug": slug,
+                    "therapist_count": len(self._tag_members[slug]),
+                })
+                position += 1
+            specializations.sort(key=lambda suggestion: -suggestion["therapist_count"])
+            suggestions = specializations[:limit]
+
+            seen = set()
+            position = bisect_left(self._names, (prefix,))
+            while (
+                len(suggestions) < limit
+                and position < len(self._names)
+                and self._names[position][0].startswith(prefix)
+            ):
+                therapist_id = self._names[position][1]
+                if therapist_id not in seen:
+                    seen.add(therapist_id)
+                    suggestions.append({
+                        "type": "therapist",
+                        "label": self._therapists[therapist_id][0],
+                        "id": therapist_id,
+                    })
+                position += 1
+        return suggestions
+
+
+autocomplete_index = AutocompleteIndex(
+    rebuild_seconds=getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 300),
+)
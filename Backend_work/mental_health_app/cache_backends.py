@@ -0,0 +1,82 @@
+# File: Backend_work/mental_health_app/cache_backends.py
+"""
+Redis cache backend that degrades to "no cache" when Redis is unreachable.
+
+Everything kept in the shared cache (directory pages, profiles, facet counts,
+JWT users, slot cache generations) can be rebuilt from the database, so a
+Redis outage should cost speed, not availability. Connection errors and
+timeouts are logged and each operation returns what a miss would: reads
+return their default, writes are dropped. Other errors still raise.
+"""
+import logging
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class FailSafeRedisCache(RedisCache):
+    @contextmanager
+    def _fail_safe(self, operation):
+        try:
+            yield
+        except (RedisConnectionError, RedisTimeoutError) as exc:
+            logger.warning("Cache %s failed, carrying on without the cache: %s", operation, exc)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._fail_safe('add'):
+            return super().add(key, value, timeout, version)
+        return False
+
+    def get(self, key, default=None, version=None):
+        with self._fail_safe('get'):
+            return super().get(key, default, version)
+        return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._fail_safe('set'):
+            super().set(key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._fail_safe('touch'):
+            return super().touch(key, timeout, version)
+        return False
+
+    def delete(self, key, version=None):
+        with self._fail_safe('delete'):
+            return super().delete(key, version)
+        return False
+
+    def get_many(self, keys, version=None):
+        with self._fail_safe('get_many'):
+            return super().get_many(keys, version)
+        return {}
+
+    def has_key(self, key, version=None):
+        with self._fail_safe('has_key'):
+            return super().has_key(key, version)
+        return False
+
+    def incr(self, key, delta=1, version=None):
+        # A missing key still raises ValueError, which callers use to seed the value.
+        with self._fail_safe('incr'):
+            return super().incr(key, delta, version)
+        return None
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._fail_safe('set_many'):
+            return super().set_many(data, timeout, version)
+        return list(data)
+
+    def delete_many(self, keys, version=None):
+        with self._fail_safe('delete_many'):
+            super().delete_many(keys, version)
+
+    def clear(self):
+        with self._fail_safe('clear'):
+            return super().clear()
+        return False
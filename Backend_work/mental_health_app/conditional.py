@@ -0,0 +1,54 @@
+# File: Backend_work/mental_health_app/conditional.py
+"""
+Conditional GET support for frequently polled read endpoints.
+
+A view using ConditionalGetMixin implements `get_etag_parts()`, returning a few
+cheap values (typically updated_at / max(updated_at) and a row count from one
+aggregate query) that change whenever the response would. The parts are hashed
+together with the query string into a strong ETag; a request whose
+If-None-Match matches it gets an empty 304 without the object being loaded or
+serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(request, parts):
+    # The user is part of the tag because list endpoints return per-user rows under one URL.
+    digest = hashlib.sha1(repr((request.get_full_path(), request.user.pk, parts)).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def aggregate_etag_parts(queryset, *timestamp_fields):
+    """max() of each timestamp field plus the row count, in a single aggregate query."""
+    values = queryset.order_by().aggregate(
+        rows=Count('pk'),
+        **{f'max_{index}': Max(field) for index, field in enumerate(timestamp_fields)}
+    )
+    return tuple(values[key] for key in sorted(values))
+
+
+class ConditionalGetMixin:
+    """View mixin: answers GET with an ETag and returns 304 when If-None-Match still matches."""
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        parts = self.get_etag_parts(request, *args, **kwargs)
+        if parts is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = make_etag(request, parts)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
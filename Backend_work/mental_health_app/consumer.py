@@ -1,16 +1,22 @@
 import json
+import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db import transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from .models import ChatMessage, User, ChatRoom 
+from .unread import mark_messages_read, record_unread_message
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = self.room_name
+        self.joined = False
         
         # --- PRESENCE: On connect ---
         self.user = self.scope['user']
@@ -18,6 +24,25 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        # --- MEMBERSHIP: Resolve the room and partner once; every message reuses them ---
+        parts = self.room_name.split('_')
+        if len(parts) != 3 or parts[0] != 'chat' or not (parts[1].isdigit() and parts[2].isdigit()):
+            logger.warning("Rejected WebSocket for invalid room name %r", self.room_name)
+            await self.close()
+            return
+        user1_id, user2_id = int(parts[1]), int(parts[2])
+        if self.user.id not in (user1_id, user2_id):
+            logger.warning("Rejected user %s: not a member of room %s", self.user.id, self.room_name)
+            await self.close()
+            return
+        self.partner_id = user2_id if self.user.id == user1_id else user1_id
+        self.chat_room_id = await self.get_or_create_chat_room_id(user1_id, user2_id)
+        if self.chat_room_id is None:
+            logger.warning("Rejected room %s: chat partner %s does not exist", self.room_name, self.partner_id)
+            await self.close()
+            return
+        self.joined = True
+
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -39,6 +64,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # --- END PRESENCE ---
 
     async def disconnect(self, close_code):
+        # Connections rejected in connect() never joined the room or went online.
+        if not getattr(self, 'joined', False):
+            return
+
         # --- PRESENCE: On disconnect ---
         if self.user.is_authenticated:
             # Update user status to offline and set last_seen
@@ -85,34 +114,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
         elif message_type == 'chat_message':
             # --- CHAT MESSAGE: Handle sending a new message ---
             message = data_json['message']
-            sender_id = self.user.id
-
-            # ... (existing logic to find user1_id, user2_id, and receiver_id)
-            parts = self.room_name.split('_')
-            if len(parts) == 3 and parts[0] == 'chat':
-                user1_id = int(parts[1])
-                user2_id = int(parts[2])
-            else:
-                print(f"ERROR: Invalid room_name format: {self.room_name}")
-                return
-            
-            if sender_id not in [user1_id, user2_id]:
-                print(f"ERROR: Authenticated user {sender_id} is not part of room {self.room_name}")
-                return
-            receiver_id = user2_id if sender_id == user1_id else user1_id
-            
+
+            # Room, partner and sender were resolved and authorized in connect()
             try:
-                chat_room_obj = await self.get_or_create_chat_room(user1_id, user2_id)
-                
                 # Save message and GET THE NEW MESSAGE OBJECT BACK
-                new_msg = await self.save_message(sender_id, receiver_id, chat_room_obj, message)
-            except Exception as e:
-                print(f"ERROR saving message: {e}")
-                return
-
-            sender_user = await self.get_user(sender_id)
-            if not sender_user:
-                print(f"ERROR: Sender user with ID {sender_id} not found.")
+                new_msg = await self.save_message(message)
+            except Exception:
+                logger.exception("Failed to save message from user %s in room %s", self.user.id, self.room_name)
                 return
 
             # Send message to room group
@@ -121,8 +129,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 {
                     'type': 'chat_message',
                     'message': message,
-                    'sender_id': sender_id,
-                    'sender_email': sender_user.email,
+                    'sender_id': self.user.id,
+                    'sender_email': self.user.email,
                     'timestamp': str(new_msg.timestamp), # Use precise timestamp from DB
                     'message_id': new_msg.id,         # <-- SEND NEW MESSAGE ID
                     'is_read': False                  # <-- SEND READ STATUS
@@ -173,47 +181,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
     # --- NEW DB METHOD for read receipts ---
     @database_sync_to_async
     def mark_messages_as_read(self, message_ids):
-        # Mark messages as read where this user is the receiver
-        ChatMessage.objects.filter(
-            id__in=message_ids, 
-            receiver=self.user
-        ).update(is_read=True)
+        # Mark the messages unread for this user as read, lowering their unread counters
+        mark_messages_read(self.user, message_ids)
 
-    # --- (existing get_or_create_chat_room) ---
+    # --- Resolved once per connection in connect() ---
     @database_sync_to_async
-    def get_or_create_chat_room(self, user1_id, user2_id):
-        # ... (no change)
+    def get_or_create_chat_room_id(self, user1_id, user2_id):
+        """Returns the id of the room for this pair, creating it if both users exist; None otherwise."""
         ordered_ids = sorted([user1_id, user2_id])
         room_name_from_ids = f"chat_{ordered_ids[0]}_{ordered_ids[1]}"
-        user1_obj = User.objects.get(id=ordered_ids[0])
-        user2_obj = User.objects.get(id=ordered_ids[1])
+        room_id = ChatRoom.objects.filter(name=room_name_from_ids).values_list('id', flat=True).first()
+        if room_id is not None:
+            return room_id
+        if User.objects.filter(id__in=ordered_ids).count() != len(set(ordered_ids)):
+            return None
         chat_room, created = ChatRoom.objects.get_or_create(
             name=room_name_from_ids,
-            defaults={'user1': user1_obj, 'user2': user2_obj}
+            defaults={'user1_id': ordered_ids[0], 'user2_id': ordered_ids[1]}
         )
-        return chat_room
+        return chat_room.id
 
 
-    # --- MODIFIED save_message to return the object ---
+    # --- MODIFIED save_message: one INSERT by *_id, plus the receiver's unread counters ---
     @database_sync_to_async
-    def save_message(self, sender_id, receiver_id, chat_room_obj, message_content): 
-        sender_obj = User.objects.get(id=sender_id)
-        receiver_obj = User.objects.get(id=receiver_id)
-
-        # Create and return the new message object
-        new_msg = ChatMessage.objects.create(
-            sender=sender_obj,
-            receiver=receiver_obj,
-            chat_room=chat_room_obj, 
-            message_content=message_content
-        )
+    def save_message(self, message_content):
+        # Create and return the new message object, counted as unread for the receiver
+        with transaction.atomic():
+            new_msg = ChatMessage.objects.create(
+                sender_id=self.user.id,
+                receiver_id=self.partner_id,
+                chat_room_id=self.chat_room_id,
+                message_content=message_content
+            )
+            record_unread_message(new_msg, members=(self.user.id, self.partner_id))
         return new_msg # <-- RETURN THE OBJECT
-
-    # --- (existing get_user) ---
-    @database_sync_to_async
-    def get_user(self, user_id):
-        # ... (no change)
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
\ No newline at end of file
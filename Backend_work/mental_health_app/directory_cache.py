@@ -0,0 +1,101 @@
+# File: Backend_work/mental_health_app/directory_cache.py
+"""
+Versioned cache for the therapist directory, its facet counts and therapist profiles.
+
+Entries are written with the `version` argument of Django's cache. The directory as
+a whole and every therapist profile have their own version number, itself kept in the
+cache; signals.py bumps them when a therapist's public fields, verification or
+application status change. Bumping orphans every entry written under the old number,
+so nothing has to be found and deleted. The versions only reach every worker through a
+shared cache, which is why settings.CACHES points at Redis.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DIRECTORY_VERSION_KEY = 'therapist-directory:version'
+
+# User fields that show up in, or decide membership of, the directory and profiles.
+DIRECTORY_FIELDS = [
+    'first_name', 'last_name', 'email', 'is_therapist', 'is_verified', 'is_available',
+    'hourly_rate', 'profile_picture', 'bio', 'years_of_experience', 'specializations',
+    'license_credentials', 'approach_modalities', 'languages_spoken', 'client_focus',
+    'insurance_accepted', 'video_introduction_url', 'is_free_consultation', 'session_modes',
+    'physical_address', 'latitude', 'longitude',
+]
+
+# Directory filters and sorts whose results change with bookings rather than profile edits.
+UNCACHEABLE_PARAMS = {'free_on'}
+UNCACHEABLE_SORTS = {'availability'}
+
+
+def directory_fields(instance):
+    """Snapshot of the directory fields, read from __dict__ so deferred fields are never loaded."""
+    values = instance.__dict__
+    return tuple(values.get(field) for field in DIRECTORY_FIELDS)
+
+
+def query_signature(query_params, ignore=()):
+    """Stable hash of a query string, independent of parameter order."""
+    signature = sorted(
+        (key, sorted(query_params.getlist(key)))
+        for key in query_params
+        if key not in ignore
+    )
+    return hashlib.sha1(repr(signature).encode()).hexdigest()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seeded from the clock so a version lost to eviction never repeats an old number.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def directory_version():
+    return _get_version(DIRECTORY_VERSION_KEY)
+
+
+def profile_version(therapist_id):
+    return _get_version(f'therapist-profile:{therapist_id}:version')
+
+
+def bump_therapist_versions(therapist_id=None):
+    """Invalidates every cached directory page, plus one therapist's cached profile if given."""
+    _bump_version(DIRECTORY_VERSION_KEY)
+    if therapist_id is not None:
+        _bump_version(f'therapist-profile:{therapist_id}:version')
+
+
+def get_directory_page(query_params):
+    """Returns (cache_key, cached response data or None); the key is None when the query can't be cached."""
+    if UNCACHEABLE_PARAMS & set(query_params) or query_params.get('sort') in UNCACHEABLE_SORTS:
+        return None, None
+    key = 'therapist-directory:' + query_signature(query_params)
+    return key, cache.get(key, version=directory_version())
+
+
+def set_directory_page(key, data):
+    cache.set(key, data, getattr(settings, 'DIRECTORY_CACHE_TTL', 600), version=directory_version())
+
+
+def get_profile(therapist_id):
+    return cache.get(f'therapist-profile:{therapist_id}', version=profile_version(therapist_id))
+
+
+def set_profile(therapist_id, data):
+    cache.set(
+        f'therapist-profile:{therapist_id}', data,
+        getattr(settings, 'DIRECTORY_CACHE_TTL', 600), version=profile_version(therapist_id),
+    )
@@ -0,0 +1,68 @@
+# File: Backend_work/mental_health_app/facets.py
+"""
+Facet counts for the therapist directory sidebar.
+
+For the therapists matching the current filters, counts how many fall under
+each pricing type, session mode, specialization and language. Pricing and
+session mode come from one conditional aggregate and the tag counts from one
+grouped query over the tag links, so a sidebar costs two queries however many
+chips it shows. Results are cached per filter signature under the directory
+version, so profile changes invalidate them too.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .directory_cache import directory_version, query_signature
+from .models import User
+
+FACET_TAG_CATEGORIES = ['specialization', 'language']
+
+# Query parameters that do not change which therapists match: paging, fieldsets, ordering, format.
+NON_FILTER_PARAMS = {'facets', 'format', 'cursor', 'page_size', 'fields', 'omit', 'sort'}
+
+
+def facet_cache_key(query_params):
+    return 'therapist-facets:' + query_signature(query_params, ignore=NON_FILTER_PARAMS)
+
+
+def compute_therapist_facets(queryset):
+    queryset = queryset.order_by()
+    counts = queryset.aggregate(
+        total=Count('id'),
+        free=Count('id', filter=Q(is_free_consultation=True)),
+        paid=Count('id', filter=Q(is_free_consultation=False)),
+        online=Count('id', filter=Q(session_modes__in=['online', 'both'])),
+        physical=Count('id', filter=Q(session_modes__in=['physical', 'both'])),
+        both=Count('id', filter=Q(session_modes='both')),
+    )
+    facets = {
+        "total": counts['total'],
+        "pricing_type": {"free": counts['free'], "paid": counts['paid']},
+        "session_modes": {key: counts[key] for key in ('online', 'physical', 'both')},
+    }
+    for category in FACET_TAG_CATEGORIES:
+        facets[category] = []
+
+    tag_counts = User.tags.through.objects.filter(
+        user_id__in=queryset.values('id'),
+        tag__category__in=FACET_TAG_CATEGORIES,
+    ).values('tag__category', 'tag__slug', 'tag__name').annotate(count=Count('user_id')).order_by('-count', 'tag__name')
+    for row in tag_counts:
+        facets[row['tag__category']].append({
+            "slug": row['tag__slug'],
+            "name": row['tag__name'],
+            "count": row['count'],
+        })
+    return facets
+
+
+def cached_therapist_facets(queryset, query_params):
+    """Facet counts for a filtered directory queryset, cached per set of filter parameters."""
+    key = facet_cache_key(query_params)
+    version = directory_version()
+    facets = cache.get(key, version=version)
+    if facets is None:
+        facets = compute_therapist_facets(queryset)
+        cache.set(key, facets, getattr(settings, 'DIRECTORY_FACETS_CACHE_TTL', 60), version=version)
+    return facets
@@ -0,0 +1,159 @@
+# File: Backend_work/mental_health_app/fieldsets.py
+"""
+Sparse fieldsets for read endpoints.
+
+GET requests may pass `?fields=a,b` (keep only these) or `?omit=c,d` (drop
+these). SparseFieldsetMixin trims the serializer accordingly, and
+SparseFieldsetViewMixin narrows the view's queryset to the columns the
+remaining fields read: `.only()` when every field's source is known,
+otherwise `.defer()` on the columns behind the dropped fields. Relations read
+through dotted sources (e.g. `client.email`) are joined with select_related,
+loading only the related columns read.
+
+SerializerMethodFields can list the model fields they read in
+`Meta.field_sources` so the serializer stays eligible for `.only()`.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from .pagination import ordering_key
+
+
+def _param_names(request, param):
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def sparse_field_names(request, available):
+    """
+    Names to keep out of `available`, or None when the request does not ask for a sparse
+    fieldset. Only GET requests are trimmed, so writes always validate the full serializer.
+    """
+    if request is None or request.method != 'GET':
+        return None
+    fields = _param_names(request, 'fields')
+    omit = _param_names(request, 'omit')
+    if fields is None and omit is None:
+        return None
+    keep = set(available) if fields is None else set(available) & (fields | {'id'})
+    return keep - (omit or set())
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin: honours ?fields= / ?omit= when used as the top-level (or list) serializer."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        keep = sparse_field_names(self.context.get('request'), fields)
+        if keep is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in keep}
+
+
+def _model_columns(model, field, field_sources):
+    """
+    Returns (columns, relations) a serializer field reads, or None if that can't be worked out.
+    `columns` are names usable in only()/defer(), including related paths such as
+    `therapist__email`; `relations` are forward relations to join. A relation joined without
+    any related path is needed whole (e.g. a method on the related object).
+    """
+    if field.field_name in field_sources:
+        columns = set(field_sources[field.field_name])
+        relations = {column.split('__')[0] for column in columns if '__' in column}
+        return columns | relations, relations
+    if field.source == '*':
+        return None
+    path = field.source.split('.')
+    try:
+        model_field = model._meta.get_field(path[0])
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete:
+        return None
+    if len(path) == 1:
+        return {model_field.name}, set()
+    if not (model_field.many_to_one or model_field.one_to_one):
+        return None
+    if len(path) == 2:
+        try:
+            related_field = model_field.related_model._meta.get_field(path[1])
+        except FieldDoesNotExist:
+            related_field = None
+        if related_field is not None and related_field.concrete and not related_field.is_relation:
+            return {model_field.name, f'{model_field.name}__{related_field.name}'}, {model_field.name}
+    return {model_field.name}, {model_field.name}
+
+
+def sparse_queryset(queryset, serializer_class, request):
+    """
+    Restricts `queryset` to the columns the trimmed serializer will read. Requests without
+    ?fields= / ?omit= get the queryset back unchanged.
+    """
+    if sparse_field_names(request, ()) is None:
+        return queryset
+    kept = serializer_class(context={'request': request}).fields
+
+    model = queryset.model
+    field_sources = getattr(getattr(serializer_class, 'Meta', None), 'field_sources', {})
+
+    columns, relations, whole_relations, resolvable = {model._meta.pk.name}, set(), set(), True
+    # Ordering columns stay loaded so keyset pagination can read them off the last row.
+    for ordering in queryset.query.order_by:
+        key = ordering_key(ordering)
+        if key is not None:
+            try:
+                columns.add(model._meta.get_field(key[0]).name)
+            except FieldDoesNotExist:
+                pass
+    for name, field in kept.items():
+        if field.write_only:
+            continue
+        needed = _model_columns(model, field, field_sources)
+        if needed is None:
+            resolvable = False
+            continue
+        columns |= needed[0]
+        relations |= needed[1]
+        whole_relations |= {
+            relation for relation in needed[1]
+            if not any(column.startswith(relation + '__') for column in needed[0])
+        }
+
+    if relations:
+        queryset = queryset.select_related(*relations)
+    if resolvable:
+        # Joined rows are narrowed to the related columns read, unless some field needs the whole row.
+        columns = {
+            column for column in columns
+            if '__' not in column or column.split('__')[0] not in whole_relations
+        }
+        return queryset.only(*columns)
+
+    # Some field reads something we can't see; only leave out columns behind dropped fields.
+    dropped = set()
+    for name, field in serializer_class(context={}).fields.items():
+        if name in kept or field.write_only:
+            continue
+        needed = _model_columns(model, field, field_sources)
+        if needed and not needed[1]:
+            dropped |= needed[0]
+    dropped -= columns
+    return queryset.defer(*dropped) if dropped else queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin for generic views using a SparseFieldsetMixin serializer. Hooks filter_queryset so
+    it also applies to views that override get_queryset().
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return sparse_queryset(queryset, self.get_serializer_class(), self.request)
@@ -0,0 +1,63 @@
+# File: Backend_work/mental_health_app/geo.py
+"""
+Distance search over therapist coordinates.
+
+Coordinates are plain latitude/longitude columns covered by one composite
+B-tree index. A `near` search first narrows to the bounding box around the
+point (an index range scan on latitude, then longitude), and only the rows in
+that box get an exact haversine distance, computed in SQL so results can be
+filtered by radius and ordered by distance in the same query.
+"""
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+
+def parse_point(value):
+    """Parses 'lat,lng' into floats; raises ValueError when malformed or out of range."""
+    lat, lng = (float(part) for part in value.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range.")
+    return lat, lng
+
+
+def bounding_box_filter(lat, lng, radius_km):
+    """Q for the lat/lng box enclosing the circle of `radius_km` around (lat, lng)."""
+    lat_delta = radius_km / KM_PER_DEGREE_LATITUDE
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+    condition = Q(latitude__gte=max(min_lat, -90), latitude__lte=min(max_lat, 90))
+
+    # Near a pole the circle covers every longitude.
+    if min_lat <= -90 or max_lat >= 90:
+        return condition & Q(longitude__isnull=False)
+
+    lng_delta = radius_km / (KM_PER_DEGREE_LATITUDE * math.cos(math.radians(lat)))
+    if lng_delta >= 180:
+        return condition & Q(longitude__isnull=False)
+    min_lng, max_lng = lng - lng_delta, lng + lng_delta
+    # Boxes crossing the antimeridian are split in two.
+    if min_lng < -180:
+        return condition & (Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng))
+    if max_lng > 180:
+        return condition & (Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360))
+    return condition & Q(longitude__gte=min_lng, longitude__lte=max_lng)
+
+
+def haversine_km(lat, lng):
+    """Expression for the great-circle distance in km between each row and (lat, lng)."""
+    lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+    half_dlat = (Radians(F('latitude')) - lat_rad) / 2
+    half_dlng = (Radians(F('longitude')) - lng_rad) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(lat_rad) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlng), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filter_near(queryset, lat, lng, radius_km):
+    """Therapists within `radius_km` of (lat, lng), annotated with `distance_km`."""
+    return queryset.filter(bounding_box_filter(lat, lng, radius_km)).annotate(
+        distance_km=haversine_km(lat, lng)
+    ).filter(distance_km__lte=radius_km)
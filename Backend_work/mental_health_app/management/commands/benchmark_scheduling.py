@@ -0,0 +1,231 @@
+import json
+import random
+import statistics
+import subprocess
+import time as raw_time
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mental_health_app.models import Session, SessionRequest, TherapistAvailability, TherapistSlotCalendar
+from mental_health_app.slot_cache import slot_cache
+from mental_health_app.views import SessionRequestCreateView
+
+User = get_user_model()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies_ms, query_counts):
+    return {
+        "iterations": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(statistics.mean(latencies_ms), 3),
+        "max_ms": round(max(latencies_ms), 3),
+        "queries_p50": percentile(query_counts, 50),
+        "queries_max": max(query_counts),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the scheduling hot paths (available slots, slot checks, session request creation) "
+        "against a throwaway test database seeded with synthetic data, and writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--therapists', type=int, default=20)
+        parser.add_argument('--sessions', type=int, default=3000, help="Scheduled sessions spread across all therapists.")
+        parser.add_argument('--paid-requests', type=int, default=3000, help="Paid pending requests spread across all therapists.")
+        parser.add_argument('--days', type=int, default=90, help="Date range requested from the available-slots endpoint.")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark_scheduling.json', help="Where to write the JSON results.")
+        parser.add_argument('--compare', help="A previous results file to print p50/p95 deltas against.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        for name, summary in results['benchmarks'].items():
+            self.stdout.write(
+                f"{name:<32} p50={summary['p50_ms']:>8}ms p95={summary['p95_ms']:>8}ms "
+                f"p99={summary['p99_ms']:>8}ms queries={summary['queries_p50']}"
+            )
+        if options['compare']:
+            self.print_comparison(options['compare'], results)
+
+    # --- Data seeding ---
+
+    def seed(self, options, rng):
+        today = timezone.localdate()
+        therapists = User.objects.bulk_create([
+            User(
+                email=f"bench-therapist-{i}@example.com", first_name="Bench", last_name=f"Therapist{i}",
+                is_therapist=True, is_verified=True, is_available=True, is_free_consultation=True,
+            )
+            for i in range(options['therapists'])
+        ])
+        clients = User.objects.bulk_create([
+            User(email=f"bench-client-{i}@example.com", first_name="Bench", last_name=f"Client{i}")
+            for i in range(options['iterations'] + 50)
+        ])
+
+        # Dense weekly availability: every day, 07:00-21:00 in 30-minute slots with a lunch break.
+        TherapistAvailability.objects.bulk_create([
+            TherapistAvailability(
+                therapist=therapist, day_of_week=day, start_time=time(7, 0), end_time=time(21, 0),
+                break_start_time=time(12, 0), break_end_time=time(13, 0), slot_duration=30,
+            )
+            for therapist in therapists
+            for day, _ in TherapistAvailability.DAYS_OF_WEEK
+        ])
+
+        def random_booking():
+            day = today + timedelta(days=rng.randint(1, options['days']))
+            start = time(rng.randint(7, 19), rng.choice([0, 30]))
+            return rng.choice(therapists), day, start, rng.choice([30, 60, 90])
+
+        booked_requests = SessionRequest.objects.bulk_create([
+            SessionRequest(
+                client=rng.choice(clients[-50:]), therapist=therapist, requested_date=day,
+                requested_time=start, session_duration=duration, is_paid=True, status='accepted',
+            )
+            for therapist, day, start, duration in (random_booking() for _ in range(options['sessions']))
+        ])
+        Session.objects.bulk_create([
+            Session(
+                session_request=request, client=request.client, therapist=request.therapist,
+                session_date=request.requested_date, session_time=request.requested_time,
+                duration_minutes=request.session_duration,
+            )
+            for request in booked_requests
+        ])
+        SessionRequest.objects.bulk_create([
+            SessionRequest(
+                client=rng.choice(clients[-50:]), therapist=therapist, requested_date=day,
+                requested_time=start, session_duration=duration, is_paid=True, status='pending',
+            )
+            for therapist, day, start, duration in (random_booking() for _ in range(options['paid_requests']))
+        ])
+        return therapists, clients[:options['iterations']]
+
+    # --- Measurement ---
+
+    def measure(self, iterations, call, before_each=None):
+        latencies_ms = []
+        query_counts = []
+        for i in range(iterations):
+            if before_each:
+                before_each(i)
+            with CaptureQueriesContext(connection) as queries:
+                started = raw_time.perf_counter()
+                call(i)
+                latencies_ms.append((raw_time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+        return summarize(latencies_ms, query_counts)
+
+    def run_benchmarks(self, options):
+        rng = random.Random(options['seed'])
+        therapists, clients = self.seed(options, rng)
+        today = timezone.localdate()
+        iterations = options['iterations']
+
+        api = APIClient()
+        api.force_authenticate(clients[0])
+        slot_params = {
+            'start_date': today.isoformat(),
+            'end_date': (today + timedelta(days=options['days'] - 1)).isoformat(),
+        }
+
+        def get_slots(i):
+            therapist = therapists[i % len(therapists)]
+            response = api.get(f'/api/therapists/{therapist.id}/available-slots/', slot_params)
+            assert response.status_code == 200, response.data
+
+        def drop_materialized(i):
+            slot_cache.clear()
+            TherapistSlotCalendar.objects.all().delete()
+
+        view = SessionRequestCreateView()
+        slot_checks = [
+            (rng.choice(therapists), today + timedelta(days=rng.randint(1, options['days'])), time(rng.randint(7, 19), rng.choice([0, 30])))
+            for _ in range(iterations)
+        ]
+
+        def check_slot(i):
+            therapist, day, start = slot_checks[i]
+            view._is_slot_available(therapist, day, start, 30)
+
+        def create_request(i):
+            therapist, day, start = slot_checks[i]
+            booking_client = APIClient()
+            booking_client.force_authenticate(clients[i])
+            response = booking_client.post('/api/session-requests/', {
+                'therapist': therapist.id,
+                'requested_date': day.isoformat(),
+                'requested_time': start.strftime('%H:%M'),
+                'session_duration': 30,
+            }, format='json')
+            assert response.status_code in (201, 400, 409), response.data
+
+        benchmarks = {
+            "available_slots_cold": self.measure(iterations, get_slots, before_each=drop_materialized),
+            "available_slots_warm": self.measure(iterations, get_slots),
+            "is_slot_available": self.measure(iterations, check_slot),
+            "session_request_create": self.measure(iterations, create_request),
+        }
+
+        return {
+            "commit": self.current_commit(),
+            "database": connection.vendor,
+            "recorded_at": timezone.now().isoformat(),
+            "parameters": {
+                key: options[key]
+                for key in ('therapists', 'sessions', 'paid_requests', 'days', 'iterations', 'seed')
+            },
+            "benchmarks": benchmarks,
+        }
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_comparison(self, path, results):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(f"\nCompared with {path} (commit {baseline.get('commit')}):")
+        for name, summary in results['benchmarks'].items():
+            previous = baseline.get('benchmarks', {}).get(name)
+            if not previous:
+                continue
+            deltas = []
+            for key in ('p50_ms', 'p95_ms'):
+                change = (summary[key] - previous[key]) / previous[key] * 100 if previous[key] else 0
+                deltas.append(f"{key} {previous[key]} -> {summary[key]} ({change:+.1f}%)")
+            self.stdout.write(f"{name:<32} " + ", ".join(deltas))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding and blacklisted JWTs in bounded batches. "
+        "Run it from cron, or pass --every to keep it running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Tokens deleted per transaction (default: 5000).")
+        parser.add_argument('--every', type=int, metavar='MINUTES', help="Repeat the purge every MINUTES instead of exiting.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options['batch_size'])
+            if not options['every']:
+                return
+            time.sleep(options['every'] * 60)
+
+    def purge(self, batch_size):
+        started = time.perf_counter()
+        now = aware_utcnow()
+        outstanding = blacklisted = batches = 0
+
+        while True:
+            # Range scan on outstandingtoken_expires_at_idx (migration 0031).
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            batches += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {outstanding} outstanding and {blacklisted} blacklisted tokens "
+            f"in {batches} batches ({time.perf_counter() - started:.2f}s)."
+        ))
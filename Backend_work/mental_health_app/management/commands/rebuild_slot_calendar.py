@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mental_health_app.scheduling import rebuild_slot_calendar, refresh_next_free_slots
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the materialized therapist slot calendar and each therapist's next free slot "
+        "from availability, sessions and paid requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help="How many days ahead to materialize (default: 90).")
+        parser.add_argument('--therapist', type=int, action='append', dest='therapist_ids', help="Only rebuild this therapist id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=100, help="Therapists loaded per batch (default: 100).")
+
+    def handle(self, *args, **options):
+        start_date = timezone.localdate()
+        end_date = start_date + timedelta(days=options['days'] - 1)
+
+        therapists = User.objects.filter(is_therapist=True)
+        if options['therapist_ids']:
+            therapists = therapists.filter(id__in=options['therapist_ids'])
+        therapist_ids = list(therapists.order_by('id').values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        for offset in range(0, len(therapist_ids), batch_size):
+            batch = therapist_ids[offset:offset + batch_size]
+            rebuild_slot_calendar(batch, start_date, end_date)
+            refresh_next_free_slots(batch)
+            self.stdout.write(f"Rebuilt {offset + len(batch)}/{len(therapist_ids)} therapists")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Slot calendar rebuilt for {len(therapist_ids)} therapists from {start_date} to {end_date}."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from mental_health_app.unread import recount_unread
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-user and per-room unread message counters from ChatMessage.is_read."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only recount this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        users, rooms = recount_unread(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Unread counters rebuilt: {users} users and {rooms} rooms with unread messages."
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mental_health_app.scheduling import refresh_stale_next_free_slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes User.next_free_slot for therapists whose next free slot has already started "
+        "or who have none, so ?sort=availability stays accurate between bookings. "
+        "Run it from cron, or pass --every to keep it running as a worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Therapists recomputed per batch (default: 500).")
+        parser.add_argument('--every', type=int, metavar='MINUTES', help="Repeat the refresh every MINUTES instead of exiting.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            refreshed = refresh_stale_next_free_slots(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Refreshed the next free slot of {refreshed} therapists ({time.perf_counter() - started:.2f}s)."
+            ))
+            if not options['every']:
+                return
+            time.sleep(options['every'] * 60)
@@ -1,45 +1,118 @@
 #
 # FILENAME: kabuga-lornah/mental-health/mental-health-5adb6da1f187483339d21664b8dc58ed73a5aa9b/Backend_work/mental_health_app/middleware.py
 #
+import threading
+import time
+from collections import deque
+from statistics import quantiles
+
+from cachetools import TLRUCache
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from urllib.parse import parse_qs
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from .authentication import get_cached_user
+
 User = get_user_model()
 
+
+# --- NEW: Validated tokens -> (token subject, exp), each dropped at its own `exp` ---
+# Reconnects with a token seen before skip signature verification; the user itself comes
+# from get_cached_user(), which save/delete signals keep current.
+def _token_expiry(token_key, value, now):
+    return min(value[1], now + getattr(settings, 'WS_TOKEN_CACHE_TTL', 300))
+
+
+_validated_tokens = TLRUCache(
+    maxsize=getattr(settings, 'WS_TOKEN_CACHE_MAXSIZE', 10000),
+    ttu=_token_expiry,
+    timer=time.time,
+)
+_tokens_lock = threading.Lock()
+
+
+def get_token_subject(token_key):
+    """
+    Returns (USER_ID_CLAIM value, whether the token was already cached) for a valid access
+    token. Raises TokenError/InvalidToken/KeyError for bad, expired or subject-less tokens.
+    """
+    with _tokens_lock:
+        cached = _validated_tokens.get(token_key)
+    if cached is not None:
+        return cached[0], True
+    token = AccessToken(token_key)
+    subject = token[api_settings.USER_ID_CLAIM]
+    with _tokens_lock:
+        _validated_tokens[token_key] = (subject, token['exp'])
+    return subject, False
+
+
+class HandshakeStats:
+    """Counters and recent latencies for WebSocket token authentication."""
+
+    def __init__(self, sample_size=1000):
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=sample_size)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.handshakes = 0
+            self.token_cache_hits = 0
+            self.failures = 0
+            self._latencies_ms.clear()
+
+    def record(self, seconds, token_cached, failed):
+        with self._lock:
+            self.handshakes += 1
+            self.token_cache_hits += token_cached
+            self.failures += failed
+            self._latencies_ms.append(seconds * 1000)
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            result = {
+                "handshakes": self.handshakes,
+                "token_cache_hits": self.token_cache_hits,
+                "failures": self.failures,
+                "token_cache_size": len(_validated_tokens),
+            }
+        if len(latencies) >= 2:
+            cuts = quantiles(latencies, n=100, method='inclusive')
+            result.update({"p50_ms": round(cuts[49], 3), "p95_ms": round(cuts[94], 3), "p99_ms": round(cuts[98], 3)})
+        result["max_ms"] = round(max(latencies), 3) if latencies else None
+        return result
+
+
+handshake_stats = HandshakeStats()
+
+
 @database_sync_to_async
 def get_user_from_token(token_key):
     """
-    Decodes the JWT token using simple-jwt's AccessToken object
-    and retrieves the user.
+    Validates the JWT (or finds it among recently validated tokens) and returns
+    (user, token_was_cached). The user is looked up by the configured USER_ID_CLAIM.
     """
+    token_cached = False
     try:
-        # Use simple-jwt's AccessToken class to validate and decode the token
-        token = AccessToken(token_key)
-        
-        # Get the user ID from the token payload (this is the standard key)
-        user_id = token.get('user_id')
-        
-        if user_id:
-            return User.objects.get(id=user_id)
-
-        # Fallback: if user_id is not present, try 'email' as your token had it
-        user_email = token.get('email')
-        if user_email:
-            return User.objects.get(email=user_email)
-            
-        # If neither key is found, return AnonymousUser
-        print("Token payload contains no 'user_id' or 'email'")
-        return AnonymousUser()
-
-    except (InvalidToken, TokenError, User.DoesNotExist, Exception) as e:
+        user_id, token_cached = get_token_subject(token_key)
+        user = get_cached_user(user_id)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            print(f"WebSocket auth error: user {user_id} is inactive")
+            return AnonymousUser(), token_cached
+        return user, token_cached
+
+    except (InvalidToken, TokenError, KeyError, User.DoesNotExist, Exception) as e:
         # Catch all errors (e.g., token expired, invalid, user not found)
         print(f"WebSocket auth error: {e}")
-        return AnonymousUser()
+        return AnonymousUser(), token_cached
 
 
 class TokenAuthMiddleware(BaseMiddleware):
@@ -57,14 +130,16 @@ class TokenAuthMiddleware(BaseMiddleware):
 
         if token:
             # If token is provided, try to authenticate
-            scope['user'] = await get_user_from_token(token)
+            started = time.perf_counter()
+            scope['user'], token_cached = await get_user_from_token(token)
+            handshake_stats.record(time.perf_counter() - started, token_cached, not scope['user'].is_authenticated)
         else:
             # If no token, set user to AnonymousUser
             scope['user'] = AnonymousUser()
-            
+
         if scope['user'] == AnonymousUser():
              print("WebSocket connection proceeding as AnonymousUser.")
         else:
             print(f"WebSocket connected for user: {scope['user']}")
 
-        return await super().__call__(scope, receive, send)
\ No newline at end of file
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0021_chatmessage_is_read_user_is_online_user_last_seen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TherapistSlotCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('free_intervals', models.JSONField(default=list, help_text='Free slots as [start, end] pairs in minutes since midnight')),
+                ('slot_duration', models.PositiveIntegerField(default=60)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('therapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_calendar', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Therapist Slot Calendars',
+                'ordering': ['date'],
+                'unique_together': {('therapist', 'date')},
+            },
+        ),
+    ]
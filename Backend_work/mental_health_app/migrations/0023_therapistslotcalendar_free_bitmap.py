@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0022_therapistslotcalendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='therapistslotcalendar',
+            name='free_bitmap',
+            field=models.BinaryField(default=b'', help_text='Free time as a bitmap of 15-minute blocks (bit n = minute n*15)'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:48
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Frozen copy of search.SEARCH_DOCUMENT_FIELDS / build_search_document as of this migration,
+# so later changes to the live helpers can't change what this backfill does.
+SEARCH_DOCUMENT_FIELDS = [
+    'first_name',
+    'last_name',
+    'email',
+    'specializations',
+    'approach_modalities',
+    'languages_spoken',
+    'client_focus',
+    'bio',
+]
+
+
+def build_search_document(user):
+    return ' '.join(
+        str(value) for value in (getattr(user, field) for field in SEARCH_DOCUMENT_FIELDS) if value
+    )
+
+
+def populate_search_documents(apps, schema_editor):
+    User = apps.get_model('mental_health_app', 'User')
+    users = list(User.objects.only('id', *SEARCH_DOCUMENT_FIELDS))
+    for user in users:
+        user.search_document = build_search_document(user)
+    User.objects.bulk_update(users, ['search_document'], batch_size=500)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS mental_health_app_user_search_fts "
+        "ON mental_health_app_user USING gin (to_tsvector('english'::regconfig, COALESCE(search_document, '')))"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS mental_health_app_user_search_trgm "
+        "ON mental_health_app_user USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS mental_health_app_user_search_fts")
+    schema_editor.execute("DROP INDEX IF EXISTS mental_health_app_user_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0023_therapistslotcalendar_free_bitmap'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='user',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Searchable profile text, rebuilt on save'),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
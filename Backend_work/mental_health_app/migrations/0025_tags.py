@@ -0,0 +1,78 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:36
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+# Frozen copy of the tags.py parsing rules as of this migration, so later changes to the live
+# helpers can't change what this backfill does.
+TAG_SOURCE_FIELDS = {
+    'specialization': 'specializations',
+    'language': 'languages_spoken',
+    'modality': 'approach_modalities',
+    'client_focus': 'client_focus',
+}
+
+TAG_MAX_LENGTH = 100
+
+
+def parse_tags(value):
+    tags = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())[:TAG_MAX_LENGTH]
+        if name:
+            tags.setdefault((slugify(name) or name.strip().lower())[:TAG_MAX_LENGTH], name)
+    return tags
+
+
+def parse_existing_tags(apps, schema_editor):
+    Tag = apps.get_model('mental_health_app', 'Tag')
+    # The (category, slug) unique index is only created once this migration finishes,
+    # so tags are deduplicated here rather than by the database.
+    tags = {}
+    for model_name in ('User', 'TherapistApplication'):
+        model = apps.get_model('mental_health_app', model_name)
+        for instance in model.objects.only('id', *TAG_SOURCE_FIELDS.values()).iterator():
+            keys = {
+                (category, slug): name
+                for category, field in TAG_SOURCE_FIELDS.items()
+                for slug, name in parse_tags(getattr(instance, field)).items()
+            }
+            for (category, slug), name in keys.items():
+                if (category, slug) not in tags:
+                    tags[(category, slug)] = Tag.objects.create(category=category, slug=slug, name=name)
+            if keys:
+                instance.tags.set([tags[key] for key in keys])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0024_user_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('specialization', 'Specialization'), ('language', 'Language'), ('modality', 'Approach / Modality'), ('client_focus', 'Client Focus')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(db_index=False, max_length=100)),
+            ],
+            options={
+                'ordering': ['category', 'name'],
+                'unique_together': {('category', 'slug')},
+            },
+        ),
+        migrations.AddField(
+            model_name='therapistapplication',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='applications', to='mental_health_app.tag'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tags',
+            field=models.ManyToManyField(blank=True, help_text='Parsed from the comma-separated profile fields', related_name='therapists', to='mental_health_app.tag'),
+        ),
+        migrations.RunPython(parse_existing_tags, migrations.RunPython.noop),
+    ]
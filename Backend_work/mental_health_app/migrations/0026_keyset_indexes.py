@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('mental_health_app', '0025_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat_room', 'timestamp', 'id'], name='chat_room_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['user', '-date', '-id'], name='journal_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['therapist', '-session_date', '-session_time', '-id'], name='session_therapist_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['client', '-session_date', '-session_time', '-id'], name='session_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionrequest',
+            index=models.Index(fields=['therapist', '-created_at', '-id'], name='request_therapist_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionrequest',
+            index=models.Index(fields=['client', '-created_at', '-id'], name='request_client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='user_directory_order_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+# Partial indexes behind the directory ?sort= options, covering only listed therapists.
+# NULLS LAST matches the ORDER BY the view emits; SQLite can't index that, so Postgres only.
+LISTED = "WHERE is_therapist AND is_available AND is_verified"
+SORT_INDEXES = {
+    'user_directory_price_idx': 'hourly_rate ASC NULLS LAST, id ASC',
+    'user_directory_experience_idx': 'years_of_experience DESC NULLS LAST, id DESC',
+    'user_directory_next_free_idx': 'next_free_slot ASC NULLS LAST, id ASC',
+}
+
+
+def create_sort_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, columns in SORT_INDEXES.items():
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON mental_health_app_user ({columns}) {LISTED}")
+
+
+def drop_sort_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SORT_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0028_user_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='next_free_slot',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Start of the soonest free slot, refreshed when bookings or availability change', null=True),
+        ),
+        migrations.RunPython(create_sort_indexes, drop_sort_indexes),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def count_existing_unread(apps, schema_editor):
+    ChatMessage = apps.get_model('mental_health_app', 'ChatMessage')
+    UnreadMessageCounter = apps.get_model('mental_health_app', 'UnreadMessageCounter')
+    RoomUnreadCounter = apps.get_model('mental_health_app', 'RoomUnreadCounter')
+
+    # An unread message counts for each member of its room other than the sender, whatever its
+    # receiver column says, so both sides of every room are counted.
+    per_room = {}
+    for member in ('user1', 'user2'):
+        rows = (
+            ChatMessage.objects.filter(is_read=False, chat_room__isnull=False)
+            .exclude(sender=F(f'chat_room__{member}'))
+            .values(f'chat_room__{member}', 'chat_room').annotate(unread=Count('id')).order_by()
+        )
+        for row in rows:
+            key = (row[f'chat_room__{member}'], row['chat_room'])
+            per_room[key] = per_room.get(key, 0) + row['unread']
+    per_user = {}
+    for (user_id, _), unread in per_room.items():
+        per_user[user_id] = per_user.get(user_id, 0) + unread
+    UnreadMessageCounter.objects.bulk_create(
+        [UnreadMessageCounter(user_id=user_id, count=count) for user_id, count in per_user.items()],
+        batch_size=1000,
+    )
+    RoomUnreadCounter.objects.bulk_create(
+        [RoomUnreadCounter(user_id=user_id, chat_room_id=room_id, count=count)
+         for (user_id, room_id), count in per_room.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0029_user_next_free_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadMessageCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RoomUnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('chat_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='mental_health_app.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'chat_room')},
+            },
+        ),
+        migrations.RunPython(count_existing_unread, migrations.RunPython.noop),
+    ]
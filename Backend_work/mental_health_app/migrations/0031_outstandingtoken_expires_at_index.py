@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:10
+
+from django.db import migrations
+
+# simplejwt's token_blacklist tables have no index on expires_at; purge_expired_tokens
+# walks expired rows in expires_at order, so give it one from here.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mental_health_app', '0030_unread_counters'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS outstandingtoken_expires_at_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            "DROP INDEX IF EXISTS outstandingtoken_expires_at_idx",
+        ),
+    ]
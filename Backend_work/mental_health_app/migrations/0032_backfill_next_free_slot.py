@@ -0,0 +1,15 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # next_free_slot depends on the live scheduling rules, which a migration must not import,
+    # so there is no data step here: every therapist starts at NULL (stale) and
+    # `manage.py refresh_next_free_slots` fills the values in after deploying.
+
+    dependencies = [
+        ('mental_health_app', '0031_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = []
@@ -1,10 +1,13 @@
 # File: Backend_work/mental_health_app/models.py
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.conf import settings
 
+from .search import SEARCH_DOCUMENT_FIELDS, build_search_document
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -66,29 +69,88 @@ class User(AbstractBaseUser, PermissionsMixin):
         null=True
     )
     physical_address = models.TextField(blank=True, null=True, help_text="Physical address for in-person sessions")
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text="Latitude of the physical address, for distance search"
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text="Longitude of the physical address, for distance search"
+    )
     is_online = models.BooleanField(default=False)
     last_seen = models.DateTimeField(null=True, blank=True, help_text="Timestamp of user's last activity")
+    search_document = models.TextField(blank=True, default='', editable=False, help_text="Searchable profile text, rebuilt on save")
+    tags = models.ManyToManyField('Tag', blank=True, related_name='therapists', help_text="Parsed from the comma-separated profile fields")
+    next_free_slot = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="Start of the soonest free slot, refreshed when bookings or availability change"
+    )
 
 
     # Required fields
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    class Meta:
+        indexes = [
+            # Directory keyset: (last_name, first_name, id)
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_directory_order_idx'),
+            # Bounding-box prefilter for ?near= searches
+            models.Index(fields=['latitude', 'longitude'], name='user_location_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            # auto_now fields are only written when listed; keep updated_at honest for ETags.
+            update_fields = {*update_fields, 'updated_at'}
+            if update_fields & set(SEARCH_DOCUMENT_FIELDS):
+                update_fields.add('search_document')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}"
 
     def get_short_name(self):
         return self.first_name
 
+class Tag(models.Model):
+    """
+    A normalized specialization, language, modality or client focus.
+    Kept in sync with the comma-separated profile fields by signals.py.
+    """
+    CATEGORY_CHOICES = [
+        ('specialization', 'Specialization'),
+        ('language', 'Language'),
+        ('modality', 'Approach / Modality'),
+        ('client_focus', 'Client Focus'),
+    ]
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, db_index=False)
+
+    class Meta:
+        unique_together = ('category', 'slug')
+        ordering = ['category', 'name']
+
+    def __str__(self):
+        return f"{self.get_category_display()}: {self.name}"
+
+
 class TherapistApplication(models.Model):
     applicant = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -131,6 +193,7 @@ class TherapistApplication(models.Model):
         null=True
     )
     physical_address = models.TextField(blank=True, null=True)
+    tags = models.ManyToManyField('Tag', blank=True, related_name='applications')
 
 
     # Status of the application
@@ -171,6 +234,9 @@ class JournalEntry(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = 'Journal Entries'
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='journal_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.date.strftime('%Y-%m-%d')}"
@@ -216,6 +282,10 @@ class SessionRequest(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Session Requests'
+        indexes = [
+            models.Index(fields=['therapist', '-created_at', '-id'], name='request_therapist_created_idx'),
+            models.Index(fields=['client', '-created_at', '-id'], name='request_client_created_idx'),
+        ]
 
     def __str__(self):
         return f"Request from {self.client.email} to {self.therapist.email} - Status: {self.status}"
@@ -250,6 +320,12 @@ class Session(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['therapist', '-session_date', '-session_time', '-id'], name='session_therapist_date_idx'),
+            models.Index(fields=['client', '-session_date', '-session_time', '-id'], name='session_client_date_idx'),
+        ]
+
     def __str__(self):
         return f"Session for {self.client.email} with {self.therapist.email} on {self.session_date}"
 
@@ -315,6 +391,30 @@ class TherapistAvailability(models.Model):
     def __str__(self):
         return f"{self.therapist.get_full_name()} - {self.day_of_week}: {self.start_time}-{self.end_time}"
 
+class TherapistSlotCalendar(models.Model):
+    """
+    Materialized free slots for one therapist on one day.
+    Kept current by the signal handlers in signals.py; rebuild with `manage.py rebuild_slot_calendar`.
+    """
+    therapist = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='slot_calendar'
+    )
+    date = models.DateField()
+    free_intervals = models.JSONField(default=list, help_text="Free slots as [start, end] pairs in minutes since midnight")
+    slot_duration = models.PositiveIntegerField(default=60)
+    free_bitmap = models.BinaryField(default=b'', help_text="Free time as a bitmap of 15-minute blocks (bit n = minute n*15)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('therapist', 'date')
+        ordering = ['date']
+        verbose_name_plural = 'Therapist Slot Calendars'
+
+    def __str__(self):
+        return f"{self.therapist_id} - {self.date}: {len(self.free_intervals)} free slots"
+
 # ChatRoom is defined BEFORE ChatMessage to resolve potential circular import issues
 class ChatRoom(models.Model):
     user1 = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_rooms_as_user1')
@@ -354,6 +454,9 @@ class ChatMessage(models.Model):
         ordering = ['timestamp'] # Order messages by time
         verbose_name = "Chat Message"
         verbose_name_plural = "Chat Messages"
+        indexes = [
+            models.Index(fields=['chat_room', 'timestamp', 'id'], name='chat_room_timestamp_idx'),
+        ]
 
     def __str__(self):
         # Improved __str__ method based on whether it's a direct message or part of a room
@@ -362,4 +465,27 @@ class ChatMessage(models.Model):
         elif self.receiver:
             return f"Chat from {self.sender.email} to {self.receiver.email} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
         else:
-            return f"Chat message from {self.sender.email} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+            return f"Chat message from {self.sender.email} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+# --- NEW: Denormalized unread-message counters (maintained by unread.py) ---
+class UnreadMessageCounter(models.Model):
+    """Total unread chat messages for one user; the unread badge is a primary-key read of this row."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
+
+
+class RoomUnreadCounter(models.Model):
+    """Unread chat messages for one user in one chat room."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='room_unread_counters')
+    chat_room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='unread_counters')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'chat_room')
+
+    def __str__(self):
+        return f"{self.user_id} in {self.chat_room_id}: {self.count} unread"
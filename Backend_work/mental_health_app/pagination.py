@@ -0,0 +1,179 @@
+# File: Backend_work/mental_health_app/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+The keyset is the view's own `order_by()` with the primary key appended as a
+tie-breaker, e.g. (-date, -id) or (last_name, first_name, id). The cursor
+carries the ordering values of the last row sent, and the next page is fetched
+with a WHERE on those values instead of an OFFSET, so every page costs the same
+however deep the client has scrolled.
+
+Nullable sort keys are ordered with `F(name).asc(nulls_last=True)` (or
+`.desc(nulls_last=True)`), which the keyset understands as well.
+
+Pagination is opt-in: requests without `cursor` or `page_size` still get the
+full, unwrapped list the current frontend expects.
+"""
+import base64
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import F, OrderBy, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _cursor_value(value):
+    # Full-precision ISO strings; DjangoJSONEncoder would round datetimes to milliseconds.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps([_cursor_value(value) for value in values]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        raise NotFound("Invalid cursor.")
+    if not isinstance(values, list):
+        raise NotFound("Invalid cursor.")
+    return values
+
+
+def ordering_key(field):
+    """
+    (name, descending, nulls_last) for an order_by() entry: a plain field name such as '-date',
+    or an F() ordered with nulls_last. Returns None for anything else.
+    """
+    if isinstance(field, str):
+        return field.lstrip('-'), field.startswith('-'), False
+    if isinstance(field, OrderBy) and isinstance(field.expression, F) and field.nulls_last:
+        return field.expression.name, field.descending, True
+    return None
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows strictly after `values` in `ordering`, expanded as
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    so mixed ascending/descending keys work on every database. For nulls_last keys every
+    NULL comes after any value, and nothing but another NULL comes after a NULL.
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name, descending, nulls_last = ordering_key(field)
+        if value is None and nulls_last:
+            equal &= Q(**{f'{name}__isnull': True})
+            continue
+        after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+        if nulls_last:
+            after |= Q(**{f'{name}__isnull': True})
+        condition |= equal & after
+        equal &= Q(**{name: value})
+    return condition
+
+
+def ordering_field(queryset, name):
+    """The model field or annotation output field behind an ordering name."""
+    if name == 'pk':
+        return queryset.model._meta.pk
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, 'LIST_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'LIST_MAX_PAGE_SIZE', 200)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, page_size))
+        except ValueError:
+            pass
+        return max(1, min(page_size, max_page_size))
+
+    def get_ordering(self, queryset):
+        """The queryset's ordering (or the model's default), ending in the primary key as a tie-breaker."""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys = [ordering_key(field) for field in ordering]
+        if None in keys:
+            raise ImproperlyConfigured(
+                "KeysetPagination needs a queryset ordered by field names or F() expressions with nulls_last."
+            )
+        if not keys or keys[-1][0] not in ('id', 'pk'):
+            ordering.append('-pk' if keys and keys[-1][1] else 'pk')
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        page_size = self.get_page_size(request)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(self.ordering):
+                raise NotFound("Invalid cursor.")
+            try:
+                # Typed values make a tampered cursor fail here rather than inside the query.
+                values = [
+                    None if value is None else ordering_field(queryset, ordering_key(field)[0]).to_python(value)
+                    for field, value in zip(self.ordering, values)
+                ]
+                queryset = queryset.filter(keyset_filter(self.ordering, values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound("Invalid cursor.")
+
+        # One extra row tells us whether there is a next page without a COUNT.
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_cursor(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return encode_cursor([getattr(last, ordering_key(field)[0]) for field in self.ordering])
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "next_cursor": self.get_next_cursor(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
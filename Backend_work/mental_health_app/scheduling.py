@@ -0,0 +1,621 @@
+# File: Backend_work/mental_health_app/scheduling.py
+"""
+Scheduling engine for therapist availability.
+
+Everything a slot computation needs (weekly availability, scheduled sessions
+and paid pending requests) is loaded once per date range and turned into
+integer intervals measured in minutes since midnight. Free slots for a day
+are then produced with a single sweep over that day's sorted busy intervals,
+and single-slot conflict checks for booking are answered by bisecting the
+same intervals. Each materialized day also carries a bitmap of its free time
+in 15-minute blocks for "who is free at X" lookups across therapists.
+"""
+import heapq
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Session, SessionRequest, TherapistAvailability, TherapistSlotCalendar
+from .slot_cache import slot_cache
+
+# Working hours used for any day a therapist has not configured explicitly.
+DEFAULT_START_TIME = time(9, 0)
+DEFAULT_END_TIME = time(17, 0)
+DEFAULT_SLOT_DURATION = 60
+
+# A paid request holds its slot while it waits for the therapist.
+HOLDING_REQUEST_STATUSES = ['pending', 'accepted']
+
+# Weekday names in date.weekday() order, matching TherapistAvailability.day_of_week.
+WEEKDAY_NAMES = [day for day, _ in TherapistAvailability.DAYS_OF_WEEK]
+
+DayWindow = namedtuple('DayWindow', ['start', 'end', 'slot_duration', 'break_start', 'break_end'])
+
+# Result of a single-slot check. `is_conflict` is set when another booking holds the slot.
+SlotCheck = namedtuple('SlotCheck', ['is_available', 'message', 'is_conflict'])
+
+
+def to_minutes(value):
+    """Converts a datetime.time into minutes since midnight."""
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    """Formats minutes since midnight as 'HH:MM'."""
+    return '%02d:%02d' % divmod(minutes, 60)
+
+
+def window_from_availability(availability):
+    """Builds a DayWindow from a TherapistAvailability row."""
+    break_start = break_end = None
+    if availability.break_start_time and availability.break_end_time:
+        break_start = to_minutes(availability.break_start_time)
+        break_end = to_minutes(availability.break_end_time)
+    return DayWindow(
+        start=to_minutes(availability.start_time),
+        end=to_minutes(availability.end_time),
+        slot_duration=availability.slot_duration or DEFAULT_SLOT_DURATION,
+        break_start=break_start,
+        break_end=break_end,
+    )
+
+
+DEFAULT_WINDOW = DayWindow(
+    start=to_minutes(DEFAULT_START_TIME),
+    end=to_minutes(DEFAULT_END_TIME),
+    slot_duration=DEFAULT_SLOT_DURATION,
+    break_start=None,
+    break_end=None,
+)
+
+# Default working hours only apply on weekdays; weekends must be configured explicitly.
+DEFAULT_WORKING_WEEKDAYS = range(0, 5)
+
+
+def merge_intervals(intervals):
+    """Sorts and coalesces (start, end) pairs into disjoint intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class IntervalIndex:
+    """
+    Sorted, disjoint busy intervals for one day.
+    `overlaps(start, end)` answers whether [start, end) touches any of them in O(log n).
+    """
+
+    def __init__(self, intervals=()):
+        merged = merge_intervals(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def overlaps(self, start, end):
+        # First interval that ends after `start` is the only one that can overlap.
+        index = bisect_right(self.ends, start)
+        return index < len(self.starts) and self.starts[index] < end
+
+
+EMPTY_INDEX = IntervalIndex()
+
+
+def sweep_free_slots(window, busy, not_before=None):
+    """
+    Walks the slot grid of a working window against an IntervalIndex of busy
+    time and returns the free (start, end) slots in order.
+    Slots starting at or before `not_before` are skipped.
+    """
+    duration = window.slot_duration
+    has_break = window.break_start is not None
+    starts, ends = busy.starts, busy.ends
+
+    free = []
+    index = 0
+    start = window.start
+    while start + duration <= window.end:
+        end = start + duration
+        # Busy intervals that finished before this slot can never block a later one.
+        while index < len(ends) and ends[index] <= start:
+            index += 1
+        blocked = index < len(starts) and starts[index] < end
+        if has_break and start < window.break_end and window.break_start < end:
+            blocked = True
+        if not blocked and (not_before is None or start > not_before):
+            free.append((start, end))
+        start = end
+    return free
+
+
+# --- Free-time bitmaps ---
+# A day is 96 blocks of 15 minutes; bit n is set when minutes [n*15, n*15+15) are free.
+BITMAP_BLOCK_MINUTES = 15
+BITMAP_BYTES = 24 * 60 // BITMAP_BLOCK_MINUTES // 8
+
+
+def block_mask(start, end, inner=False):
+    """
+    Bitmask of the 15-minute blocks touching [start, end), or only the blocks
+    fully inside it when `inner` is True.
+    """
+    if inner:
+        first, last = -(-start // BITMAP_BLOCK_MINUTES), end // BITMAP_BLOCK_MINUTES
+    else:
+        first, last = start // BITMAP_BLOCK_MINUTES, -(-end // BITMAP_BLOCK_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def free_time_bitmap(window, busy):
+    """Bitmap of the blocks inside a working window that are clear of its break and of `busy`."""
+    if window is None:
+        return 0
+    bitmap = block_mask(window.start, window.end, inner=True)
+    if window.break_start is not None:
+        bitmap &= ~block_mask(window.break_start, window.break_end)
+    for start, end in busy:
+        bitmap &= ~block_mask(start, end)
+    return bitmap
+
+
+def bitmap_to_bytes(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def bitmap_from_bytes(value):
+    return int.from_bytes(bytes(value or b''), 'little')
+
+
+class TherapistSchedule:
+    """
+    A therapist's working windows and busy intervals over a date range.
+    Build one with `TherapistSchedule.load()` (or many with `load_many()`); either costs three queries.
+    Both the slot listing and booking validation read from the same indexes.
+    """
+
+    def __init__(self, windows, sessions_by_date, requests_by_date, start_date, end_date):
+        self.windows = windows
+        self.start_date = start_date
+        self.end_date = end_date
+        # Kept apart so a conflict can be reported with the right reason.
+        self.sessions_by_date = {day: IntervalIndex(intervals) for day, intervals in sessions_by_date.items()}
+        self.requests_by_date = {day: IntervalIndex(intervals) for day, intervals in requests_by_date.items()}
+        self.busy_by_date = {
+            day: IntervalIndex(sessions_by_date.get(day, []) + requests_by_date.get(day, []))
+            for day in set(sessions_by_date) | set(requests_by_date)
+        }
+
+    @classmethod
+    def load(cls, therapist, start_date, end_date):
+        therapist_id = getattr(therapist, 'pk', therapist)
+        return cls.load_many([therapist_id], start_date, end_date)[therapist_id]
+
+    @classmethod
+    def load_many(cls, therapist_ids, start_date, end_date):
+        """
+        Loads schedules for several therapists at once.
+        Returns {therapist_id: TherapistSchedule}; always three queries regardless of how many ids.
+        """
+        therapist_ids = list(therapist_ids)
+        windows = defaultdict(dict)
+        for availability in TherapistAvailability.objects.filter(therapist__in=therapist_ids):
+            weekday = WEEKDAY_NAMES.index(availability.day_of_week)
+            windows[availability.therapist_id][weekday] = window_from_availability(availability)
+
+        scheduled_sessions = Session.objects.filter(
+            therapist__in=therapist_ids,
+            session_date__range=[start_date, end_date]
+        ).values_list('therapist_id', 'session_date', 'session_time', 'duration_minutes')
+        paid_pending_requests = SessionRequest.objects.filter(
+            therapist__in=therapist_ids,
+            status__in=HOLDING_REQUEST_STATUSES,
+            is_paid=True,
+            requested_date__range=[start_date, end_date]
+        ).values_list('therapist_id', 'requested_date', 'requested_time', 'session_duration')
+
+        sessions_by_therapist = defaultdict(list)
+        for therapist_id, *row in scheduled_sessions:
+            sessions_by_therapist[therapist_id].append(row)
+        requests_by_therapist = defaultdict(list)
+        for therapist_id, *row in paid_pending_requests:
+            requests_by_therapist[therapist_id].append(row)
+
+        return {
+            therapist_id: cls(
+                windows[therapist_id],
+                group_intervals(sessions_by_therapist[therapist_id]),
+                group_intervals(requests_by_therapist[therapist_id]),
+                start_date,
+                end_date,
+            )
+            for therapist_id in therapist_ids
+        }
+
+    def window_for(self, day):
+        """Returns the DayWindow for a date, or None if the therapist does not work that day."""
+        weekday = day.weekday()
+        if weekday in self.windows:
+            return self.windows[weekday]
+        if weekday in DEFAULT_WORKING_WEEKDAYS:
+            return DEFAULT_WINDOW
+        return None
+
+    def free_slots(self, day, now=None):
+        """Returns the free (start, end) minute pairs for a single day."""
+        window = self.window_for(day)
+        if window is None:
+            return []
+        not_before = None
+        if now is not None:
+            if day < now.date():
+                return []
+            if day == now.date():
+                not_before = now.hour * 60 + now.minute
+        return sweep_free_slots(window, self.busy_by_date.get(day, EMPTY_INDEX), not_before)
+
+    def available_slots(self, now=None):
+        """
+        Returns {'YYYY-MM-DD': [{'start_time', 'end_time', 'duration_minutes'}, ...]}
+        for every day in range that has at least one free slot in the future.
+        """
+        if now is None:
+            now = timezone.localtime()
+        result = {}
+        day = self.start_date
+        while day <= self.end_date:
+            slots = self.free_slots(day, now)
+            if slots:
+                result[day.isoformat()] = format_slots(slots, self.window_for(day).slot_duration)
+            day += timedelta(days=1)
+        return result
+
+    def check_slot(self, day, start_time, duration_minutes, now=None):
+        """
+        Validates a single booking of `duration_minutes` starting at `start_time` on `day`.
+        Returns a SlotCheck(is_available, message, is_conflict).
+        """
+        window = self.window_for(day)
+        if window is None:
+            return SlotCheck(False, "Therapist is not available on weekends by default.", False)
+
+        start = to_minutes(start_time)
+        end = start + duration_minutes
+        if not (window.start <= start and end <= window.end):
+            return SlotCheck(False, "Requested slot is outside therapist's working hours.", False)
+
+        if window.break_start is not None and start < window.break_end and window.break_start < end:
+            return SlotCheck(False, "Requested slot overlaps with therapist's break.", False)
+
+        if self.sessions_by_date.get(day, EMPTY_INDEX).overlaps(start, end):
+            return SlotCheck(False, "Requested slot is already booked.", True)
+
+        if self.requests_by_date.get(day, EMPTY_INDEX).overlaps(start, end):
+            return SlotCheck(False, "Requested slot is currently pending payment confirmation for another user.", True)
+
+        if now is None:
+            now = timezone.localtime()
+        if day < now.date() or (day == now.date() and start <= now.hour * 60 + now.minute):
+            return SlotCheck(False, "Cannot book a session in the past or current time.", False)
+
+        return SlotCheck(True, "Slot is available.", False)
+
+
+def lock_therapist_schedule(therapist_id):
+    """
+    Takes the row lock on the therapist that serializes bookings for that therapist only.
+    Must be called inside transaction.atomic(); bookings for other therapists are not blocked.
+    """
+    return get_user_model().objects.select_for_update().only('id').get(pk=therapist_id)
+
+
+def format_slots(slots, duration):
+    """Turns (start, end) minute pairs into the slot dicts returned by the API."""
+    return [
+        {
+            "start_time": format_minutes(start),
+            "end_time": format_minutes(end),
+            "duration_minutes": duration,
+        }
+        for start, end in slots
+    ]
+
+
+def group_intervals(rows):
+    """Groups (date, start_time, duration) rows into {date: [(start, end), ...]} in minutes."""
+    intervals = defaultdict(list)
+    for day, start_time, duration in rows:
+        if start_time is None:
+            continue
+        start = to_minutes(start_time)
+        intervals[day].append((start, start + (duration or 120)))
+    return intervals
+
+
+def find_earliest_slots(therapist_ids, start_date, end_date, limit, now=None, chunk_days=7):
+    """
+    Finds the soonest free slot for each therapist and returns the `limit` earliest openings as
+    [(therapist_id, date, start_minutes, end_minutes, slot_duration), ...] sorted by time.
+
+    The range is scanned in chunks of `chunk_days` (three queries each, whatever the number of
+    therapists). Within a chunk each therapist stops at its first free slot, and the scan stops as
+    soon as `limit` openings are found, so nobody's full calendar is ever computed.
+    """
+    if now is None:
+        now = timezone.localtime()
+    remaining = list(dict.fromkeys(therapist_ids))
+    found = []
+
+    chunk_start = start_date
+    while chunk_start <= end_date and remaining and len(found) < limit:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        schedules = TherapistSchedule.load_many(remaining, chunk_start, chunk_end)
+
+        # Openings in an earlier chunk always beat those in a later one, so a heap per chunk is enough.
+        heap = []
+        for therapist_id in remaining:
+            schedule = schedules[therapist_id]
+            for day in date_range(chunk_start, chunk_end):
+                slots = schedule.free_slots(day, now)
+                if slots:
+                    start, end = slots[0]
+                    heapq.heappush(heap, (day, start, therapist_id, end, schedule.window_for(day).slot_duration))
+                    break
+
+        while heap and len(found) < limit:
+            day, start, therapist_id, end, slot_duration = heapq.heappop(heap)
+            found.append((therapist_id, day, start, end, slot_duration))
+
+        matched = {therapist_id for therapist_id, *_ in found}
+        remaining = [therapist_id for therapist_id in remaining if therapist_id not in matched]
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return found
+
+
+def refresh_next_free_slots(therapist_ids, now=None):
+    """
+    Recomputes User.next_free_slot (the start of the soonest free slot within
+    EARLIEST_AVAILABLE_HORIZON_DAYS, or None) for the given therapists, so the directory can
+    sort by availability with an index scan. Written with bulk_update, so no save signals fire.
+    """
+    therapist_ids = list(dict.fromkeys(therapist_ids))
+    if not therapist_ids:
+        return {}
+    if now is None:
+        now = timezone.localtime()
+    start_date = now.date()
+    end_date = start_date + timedelta(days=getattr(settings, 'EARLIEST_AVAILABLE_HORIZON_DAYS', 30) - 1)
+
+    next_free = dict.fromkeys(therapist_ids)
+    for therapist_id, day, start, *_ in find_earliest_slots(therapist_ids, start_date, end_date, len(therapist_ids), now):
+        next_free[therapist_id] = timezone.make_aware(datetime.combine(day, time(start // 60, start % 60)))
+
+    User = get_user_model()
+    User.objects.bulk_update(
+        [User(id=therapist_id, next_free_slot=value) for therapist_id, value in next_free.items()],
+        ['next_free_slot'], batch_size=500,
+    )
+    return next_free
+
+
+def refresh_stale_next_free_slots(now=None, batch_size=500):
+    """
+    Refreshes next_free_slot for therapists whose value has already started or is None (never
+    computed, or nothing free within the horizon last time). Returns how many were refreshed.
+    """
+    if now is None:
+        now = timezone.localtime()
+    User = get_user_model()
+    therapist_ids = list(
+        User.objects.filter(is_therapist=True)
+        .filter(Q(next_free_slot__isnull=True) | Q(next_free_slot__lt=now))
+        .order_by('id').values_list('id', flat=True)
+    )
+    for offset in range(0, len(therapist_ids), batch_size):
+        refresh_next_free_slots(therapist_ids[offset:offset + batch_size], now)
+    return len(therapist_ids)
+
+
+def mark_next_free_slots_stale(therapist_dates):
+    """
+    Clears next_free_slot (NULL means stale) where a change may have moved it, leaving the
+    recomputation to refresh_stale_next_free_slots() and `manage.py refresh_next_free_slots`.
+    `therapist_dates` maps therapist_id -> the dates that changed, or None when any day may
+    have. A change on a date can only move a next free slot that falls on or after that date.
+    """
+    condition = Q()
+    for therapist_id, dates in therapist_dates.items():
+        if dates is None:
+            condition |= Q(id=therapist_id)
+        elif dates:
+            first_day = timezone.make_aware(datetime.combine(min(dates), time()))
+            condition |= Q(id=therapist_id, next_free_slot__gte=first_day)
+    if condition:
+        get_user_model().objects.filter(condition, next_free_slot__isnull=False).update(next_free_slot=None)
+
+
+# --- Materialized slot calendar ---
+
+def date_range(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def refresh_slot_calendar(therapist_dates, overwrite=True):
+    """
+    Recomputes and stores TherapistSlotCalendar rows.
+    `therapist_dates` maps therapist_id -> iterable of dates. Returns {therapist_id: {date: row}}.
+    Past slots are kept in the rows; reads filter them against the current time.
+
+    Writers (the booking/availability signals and rebuilds) run after their change committed and
+    upsert. Reads filling in missing days pass overwrite=False: a reader may have computed a day
+    before a booking committed, so it only inserts rows that don't exist yet and never replaces
+    the row the booking's own refresh wrote.
+    """
+    therapist_dates = {therapist_id: set(dates) for therapist_id, dates in therapist_dates.items() if dates}
+    if not therapist_dates:
+        return {}
+
+    all_dates = set().union(*therapist_dates.values())
+    schedules = TherapistSchedule.load_many(therapist_dates, min(all_dates), max(all_dates))
+
+    rows = []
+    for therapist_id, dates in therapist_dates.items():
+        schedule = schedules[therapist_id]
+        for day in dates:
+            window = schedule.window_for(day)
+            rows.append(TherapistSlotCalendar(
+                therapist_id=therapist_id,
+                date=day,
+                free_intervals=[list(slot) for slot in schedule.free_slots(day)],
+                slot_duration=window.slot_duration if window else DEFAULT_SLOT_DURATION,
+                free_bitmap=bitmap_to_bytes(free_time_bitmap(window, schedule.busy_by_date.get(day, EMPTY_INDEX))),
+                updated_at=timezone.now(),
+            ))
+
+    if overwrite:
+        TherapistSlotCalendar.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['therapist', 'date'],
+            update_fields=['free_intervals', 'slot_duration', 'free_bitmap', 'updated_at'],
+        )
+    else:
+        TherapistSlotCalendar.objects.bulk_create(rows, ignore_conflicts=True)
+
+    refreshed = defaultdict(dict)
+    for row in rows:
+        refreshed[row.therapist_id][row.date] = row
+    if overwrite:
+        # Read fills only add days nobody has cached yet, so there is nothing to invalidate.
+        for therapist_id in therapist_dates:
+            slot_cache.invalidate(therapist_id)
+    return refreshed
+
+
+def load_slot_calendar(therapist_ids, days):
+    """
+    Returns {therapist_id: {date: (free_intervals, slot_duration)}} for the given days,
+    from the slot cache first and the materialized calendar for cache misses.
+    Days that have not been materialized yet are computed and stored on the way.
+    """
+    generations = slot_cache.generations(therapist_ids)
+    entries = {}
+    missing = {}
+    for therapist_id in therapist_ids:
+        entries[therapist_id], missing[therapist_id] = slot_cache.get_many(therapist_id, generations[therapist_id], days)
+
+    loaded = defaultdict(dict)
+    missing_ids = [therapist_id for therapist_id in therapist_ids if missing[therapist_id]]
+    if missing_ids:
+        missing_days = {therapist_id: set(missing[therapist_id]) for therapist_id in missing_ids}
+        for row in TherapistSlotCalendar.objects.filter(
+            therapist__in=missing_ids, date__range=[min(days), max(days)]
+        ).only('therapist_id', 'date', 'free_intervals', 'slot_duration'):
+            if row.date in missing_days[row.therapist_id]:
+                loaded[row.therapist_id][row.date] = (row.free_intervals, row.slot_duration)
+
+        not_materialized = {
+            therapist_id: [day for day in missing[therapist_id] if day not in loaded[therapist_id]]
+            for therapist_id in missing_ids
+        }
+        for therapist_id, refreshed in refresh_slot_calendar(not_materialized, overwrite=False).items():
+            for day, row in refreshed.items():
+                loaded[therapist_id][day] = (row.free_intervals, row.slot_duration)
+
+        for therapist_id, values in loaded.items():
+            slot_cache.set_many(therapist_id, generations[therapist_id], values)
+            entries[therapist_id].update(values)
+
+    return entries
+
+
+def iter_calendar_days(entries, days, now):
+    """
+    Yields ('YYYY-MM-DD', [slots]) in date order for days that still have a free slot after `now`.
+    `entries` is one therapist's {date: (free_intervals, slot_duration)}.
+    """
+    today = now.date()
+    not_before = now.hour * 60 + now.minute
+    for day in days:
+        if day < today:
+            continue
+        slots, slot_duration = entries[day]
+        if day == today:
+            slots = [slot for slot in slots if slot[0] > not_before]
+        if slots:
+            yield day.isoformat(), format_slots(slots, slot_duration)
+
+
+def read_slot_calendar(therapist_ids, start_date, end_date, now=None):
+    """
+    Reads available slots for several therapists from the cached, materialized calendar.
+    Returns {therapist_id: {'YYYY-MM-DD': [slots]}} in the same shape as
+    TherapistSchedule.available_slots().
+    """
+    if now is None:
+        now = timezone.localtime()
+    therapist_ids = list(therapist_ids)
+    days = list(date_range(start_date, end_date))
+    entries = load_slot_calendar(therapist_ids, days)
+    return {
+        therapist_id: dict(iter_calendar_days(entries[therapist_id], days, now))
+        for therapist_id in therapist_ids
+    }
+
+
+def find_free_therapists(therapist_ids, day, start_time, end_time, now=None):
+    """
+    Returns the ids of the therapists who are free for all of [start_time, end_time) on `day`.
+
+    Each therapist's day is read from the calendar as a free-time bitmap, so the check is one
+    AND against the requested blocks per therapist rather than an interval walk. Blocks are
+    15 minutes; a range that does not fall on the grid is widened to the blocks it touches.
+    """
+    if now is None:
+        now = timezone.localtime()
+    start, end = to_minutes(start_time), to_minutes(end_time)
+    if end <= start or day < now.date() or (day == now.date() and start <= now.hour * 60 + now.minute):
+        return []
+
+    therapist_ids = list(dict.fromkeys(therapist_ids))
+    bitmaps = {
+        therapist_id: bitmap_from_bytes(free_bitmap)
+        for therapist_id, free_bitmap in TherapistSlotCalendar.objects.filter(
+            therapist__in=therapist_ids, date=day
+        ).exclude(free_bitmap=b'').values_list('therapist_id', 'free_bitmap')
+    }
+    missing = [therapist_id for therapist_id in therapist_ids if therapist_id not in bitmaps]
+    for therapist_id, refreshed in refresh_slot_calendar({therapist_id: [day] for therapist_id in missing}, overwrite=False).items():
+        bitmaps[therapist_id] = bitmap_from_bytes(refreshed[day].free_bitmap)
+
+    wanted = block_mask(start, end)
+    return [therapist_id for therapist_id in therapist_ids if bitmaps[therapist_id] & wanted == wanted]
+
+
+def rebuild_slot_calendar(therapist_ids, start_date, end_date):
+    """
+    Drops and recomputes the calendar rows for the given therapists in [start_date, end_date].
+    Rows outside the range are left alone; refreshing the range also invalidates its cached days.
+    """
+    days = list(date_range(start_date, end_date))
+    TherapistSlotCalendar.objects.filter(therapist__in=therapist_ids, date__range=(start_date, end_date)).delete()
+    refresh_slot_calendar({therapist_id: days for therapist_id in therapist_ids})
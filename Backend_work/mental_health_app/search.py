@@ -0,0 +1,56 @@
+# File: Backend_work/mental_health_app/search.py
+"""
+Therapist directory search.
+
+Every user carries a `search_document`: the text of the profile fields people
+search on, rebuilt in User.save(). On PostgreSQL the document is matched with
+full-text search plus trigram word similarity (for partial names and typos),
+both served by GIN indexes created in migration 0024, and results are ranked
+by relevance. Other databases fall back to a case-insensitive substring match.
+"""
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+# Profile fields that make up User.search_document, in order.
+SEARCH_DOCUMENT_FIELDS = [
+    'first_name',
+    'last_name',
+    'email',
+    'specializations',
+    'approach_modalities',
+    'languages_spoken',
+    'client_focus',
+    'bio',
+]
+
+SEARCH_CONFIG = 'english'
+
+
+def build_search_document(user):
+    """Joins the searchable profile fields of a user into one string."""
+    return ' '.join(
+        str(value) for value in (getattr(user, field) for field in SEARCH_DOCUMENT_FIELDS) if value
+    )
+
+
+def search_therapists(queryset, search_query):
+    """
+    Filters `queryset` down to users matching `search_query` and annotates each with a
+    `search_rank`; callers order by '-search_rank' to get the most relevant first.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+
+        vector = SearchVector('search_document', config=SEARCH_CONFIG)
+        query = SearchQuery(search_query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.alias(search_vector=vector).annotate(
+            search_rank=SearchRank(vector, query) + TrigramWordSimilarity(search_query, 'search_document'),
+        ).filter(
+            Q(search_vector=query) | Q(search_document__trigram_word_similar=search_query)
+        )
+
+    # Fallback: substring match, with name matches ranked above matches elsewhere in the profile.
+    name_match = Q(first_name__icontains=search_query) | Q(last_name__icontains=search_query)
+    return queryset.filter(search_document__icontains=search_query).annotate(
+        search_rank=Case(When(name_match, then=Value(1)), default=Value(0), output_field=IntegerField())
+    )
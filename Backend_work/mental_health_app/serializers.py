@@ -3,6 +3,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import ChatMessage, ChatRoom, JournalEntry, TherapistApplication, SessionRequest, Session, Payment, TherapistAvailability
+from .fieldsets import SparseFieldsetMixin
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
@@ -39,7 +40,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'sender', 'sender_email', 'receiver', 'receiver_email', 'chat_room', 'message_content', 'timestamp', 'is_read'] 
         read_only_fields = ['sender', 'timestamp', 'is_read']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for creating and updating user accounts. Handles password
     validation and hashing.
@@ -85,6 +86,8 @@ class UserSerializer(serializers.ModelSerializer):
     ]
     session_modes = serializers.ChoiceField(choices=User.SESSION_MODES_CHOICES, required=False, allow_null=True)
     physical_address = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    latitude = serializers.FloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, allow_null=True, min_value=-180, max_value=180)
 
 
     class Meta:
@@ -97,7 +100,8 @@ class UserSerializer(serializers.ModelSerializer):
             'profile_picture',
             'license_credentials', 'approach_modalities', 'languages_spoken',
             'client_focus', 'insurance_accepted', 'video_introduction_url',
-            'is_free_consultation', 'session_modes', 'physical_address'
+            'is_free_consultation', 'session_modes', 'physical_address',
+            'latitude', 'longitude'
         ]
         extra_kwargs = {
             'email': {'required': True},
@@ -131,7 +135,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields_to_normalize_to_none = [
             'bio', 'years_of_experience', 'license_credentials', 'approach_modalities',
             'languages_spoken', 'client_focus', 'video_introduction_url',
-            'physical_address', 'phone'
+            'physical_address', 'phone', 'latitude', 'longitude'
         ]
         for field_name in fields_to_normalize_to_none:
             value = mutable_data.get(field_name)
@@ -265,7 +269,7 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError("Unable to log in with provided credentials.")
         raise serializers.ValidationError("Must include 'email' and 'password'.")
 
-class TherapistSerializer(serializers.ModelSerializer):
+class TherapistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Read-only serializer for public therapist profiles.
     """
@@ -273,6 +277,8 @@ class TherapistSerializer(serializers.ModelSerializer):
     # FIX: Change to SerializerMethodField to correctly return the URL
     profile_picture = serializers.SerializerMethodField()
     hourly_rate = serializers.DecimalField(max_digits=6, decimal_places=2, read_only=True)
+    # Only set when the directory was searched with ?near=
+    distance_km = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -283,9 +289,16 @@ class TherapistSerializer(serializers.ModelSerializer):
             'bio', 'years_of_experience', 'specializations',
             'license_credentials', 'approach_modalities', 'languages_spoken',
             'client_focus', 'insurance_accepted', 'video_introduction_url',
-            'is_free_consultation', 'session_modes', 'physical_address'
+            'is_free_consultation', 'session_modes', 'physical_address',
+            'latitude', 'longitude', 'distance_km'
         ]
         read_only_fields = fields
+        # Model fields read by the SerializerMethodFields, for sparse fieldsets
+        field_sources = {
+            'full_name': ['first_name', 'last_name'],
+            'profile_picture': ['profile_picture'],
+            'distance_km': [],
+        }
 
     def get_full_name(self, obj):
         return f"{obj.first_name} {obj.last_name}"
@@ -296,7 +309,11 @@ class TherapistSerializer(serializers.ModelSerializer):
             return obj.profile_picture
         return None
 
-class JournalEntrySerializer(serializers.ModelSerializer):
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return None if distance is None else round(distance, 2)
+
+class JournalEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     attachment_file = serializers.FileField(
         required=False,
         allow_null=True,
@@ -336,7 +353,7 @@ class JournalEntrySerializer(serializers.ModelSerializer):
                 })
         return super().to_internal_value(data)
 
-class JournalListSerializer(serializers.ModelSerializer):
+class JournalListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     A lightweight serializer for listing journal entries.
     """
@@ -403,7 +420,7 @@ class SessionRequestUpdateSerializer(serializers.ModelSerializer):
             )
         return value
 
-class SessionSerializer(serializers.ModelSerializer):
+class SessionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     client_name = serializers.CharField(source='client.get_full_name', read_only=True)
     client_email = serializers.EmailField(source='client.email', read_only=True)
     therapist_name = serializers.CharField(source='therapist.get_full_name', read_only=True)
@@ -428,6 +445,11 @@ class SessionSerializer(serializers.ModelSerializer):
             'id', 'client_name', 'client_email', 'therapist_name', 'therapist_email',
             'created_at', 'updated_at', 'therapist_is_free_consultation'
         ]
+        # Related columns read through get_full_name(), for sparse fieldsets
+        field_sources = {
+            'client_name': ['client__first_name', 'client__last_name'],
+            'therapist_name': ['therapist__first_name', 'therapist__last_name'],
+        }
 
 
 class TherapistApplicationSerializer(serializers.ModelSerializer):
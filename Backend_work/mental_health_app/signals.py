@@ -0,0 +1,217 @@
+# File: Backend_work/mental_health_app/signals.py
+"""
+Signal handlers that keep derived data (the slot calendar and next free slot, profile tags,
+the versioned directory cache, the autocomplete index, unread counters and cached JWT users)
+in sync with the rows it is built from. Connected in MentalHealthAppConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import forget_cached_user
+from .autocomplete import autocomplete_index
+from .directory_cache import DIRECTORY_FIELDS, bump_therapist_versions, directory_fields
+from .models import ChatMessage, Session, SessionRequest, TherapistApplication, TherapistAvailability, TherapistSlotCalendar, User
+from .scheduling import HOLDING_REQUEST_STATUSES, WEEKDAY_NAMES, mark_next_free_slots_stale, refresh_slot_calendar
+from .tags import sync_tags, tag_sources
+from .unread import forget_unread_message
+
+
+def _session_key(instance):
+    # Read straight from __dict__ so deferred fields never trigger a query.
+    values = instance.__dict__
+    return values.get('therapist_id'), values.get('session_date')
+
+
+def _session_request_key(instance):
+    values = instance.__dict__
+    if not values.get('is_paid') or values.get('status') not in HOLDING_REQUEST_STATUSES:
+        return None, None
+    return values.get('therapist_id'), values.get('requested_date')
+
+
+def _availability_key(instance):
+    values = instance.__dict__
+    return values.get('therapist_id'), values.get('day_of_week')
+
+
+SLOT_KEY_FUNCTIONS = {
+    Session: _session_key,
+    SessionRequest: _session_request_key,
+    TherapistAvailability: _availability_key,
+}
+
+
+@receiver(post_init, sender=Session)
+@receiver(post_init, sender=SessionRequest)
+@receiver(post_init, sender=TherapistAvailability)
+def remember_slot_key(sender, instance, **kwargs):
+    """Remembers which therapist/day a row affected when it was loaded, so moves can be detected."""
+    instance._original_slot_key = SLOT_KEY_FUNCTIONS[sender](instance)
+
+
+def _schedule_refresh(therapist_dates, next_free_ids=()):
+    """
+    Once the transaction commits, refreshes the calendar for the future dates given and marks
+    stale the next free slot of every therapist those dates may affect, plus those in
+    `next_free_ids` whatever the dates.
+    """
+    today = timezone.localdate()
+    therapist_dates = {
+        therapist_id: {day for day in dates if day >= today}
+        for therapist_id, dates in therapist_dates.items()
+    }
+    if any(therapist_dates.values()):
+        # The few changed days are upserted right away so readers never fill them from stale data.
+        transaction.on_commit(lambda: refresh_slot_calendar(therapist_dates))
+    stale = {therapist_id: dates for therapist_id, dates in therapist_dates.items() if dates}
+    stale.update(dict.fromkeys(next_free_ids))
+    if stale:
+        transaction.on_commit(lambda: mark_next_free_slots_stale(stale))
+
+
+def _booking_changed(sender, instance, deleted=False):
+    keys = {instance._original_slot_key}
+    if not deleted:
+        keys.add(SLOT_KEY_FUNCTIONS[sender](instance))
+    therapist_dates = {}
+    for therapist_id, day in keys:
+        if therapist_id and day:
+            therapist_dates.setdefault(therapist_id, set()).add(day)
+    _schedule_refresh(therapist_dates)
+    instance._original_slot_key = SLOT_KEY_FUNCTIONS[sender](instance)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_save, sender=SessionRequest)
+def booking_saved(sender, instance, **kwargs):
+    _booking_changed(sender, instance)
+
+
+@receiver(post_delete, sender=Session)
+@receiver(post_delete, sender=SessionRequest)
+def booking_deleted(sender, instance, **kwargs):
+    _booking_changed(sender, instance, deleted=True)
+
+
+def _availability_changed(instance, deleted=False):
+    therapist_id, _ = _availability_key(instance)
+    weekdays = {instance._original_slot_key[1]}
+    if not deleted:
+        weekdays.add(instance.day_of_week)
+    weekday_numbers = {WEEKDAY_NAMES.index(day) for day in weekdays if day in WEEKDAY_NAMES}
+
+    # Only days that are already materialized need recomputing; others are filled on first read.
+    stored_dates = TherapistSlotCalendar.objects.filter(
+        therapist_id=therapist_id, date__gte=timezone.localdate()
+    ).values_list('date', flat=True)
+    # The next free slot may move even when none of the changed weekdays is materialized yet.
+    _schedule_refresh(
+        {therapist_id: {day for day in stored_dates if day.weekday() in weekday_numbers}},
+        next_free_ids=[therapist_id],
+    )
+    instance._original_slot_key = _availability_key(instance)
+
+
+@receiver(post_save, sender=TherapistAvailability)
+def availability_saved(sender, instance, **kwargs):
+    _availability_changed(instance)
+
+
+@receiver(post_delete, sender=TherapistAvailability)
+def availability_deleted(sender, instance, **kwargs):
+    _availability_changed(instance, deleted=True)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=TherapistApplication)
+def remember_tag_sources(sender, instance, **kwargs):
+    instance._original_tag_sources = tag_sources(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TherapistApplication)
+def profile_tags_saved(sender, instance, created, **kwargs):
+    """Re-parses the tag links only when one of the comma-separated source fields changed."""
+    sources = tag_sources(instance)
+    if (created and any(sources)) or (not created and sources != instance._original_tag_sources):
+        sync_tags(instance)
+        instance._original_tag_sources = sources
+
+
+LISTING_FIELD_POSITIONS = [DIRECTORY_FIELDS.index(field) for field in ('is_therapist', 'is_available', 'is_verified')]
+
+
+def _is_listed(fields):
+    """Whether a directory_fields() snapshot belongs to a therapist shown in the directory."""
+    return all(fields[position] for position in LISTING_FIELD_POSITIONS)
+
+
+@receiver(post_init, sender=User)
+def remember_directory_fields(sender, instance, **kwargs):
+    instance._original_directory_fields = directory_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def directory_user_saved(sender, instance, created, **kwargs):
+    """Bumps the cached directory/profile versions and re-indexes autocomplete when a therapist's public fields change."""
+    fields = directory_fields(instance)
+    was_therapist = instance._original_directory_fields[DIRECTORY_FIELDS.index('is_therapist')]
+    if (instance.is_therapist or was_therapist) and (created or fields != instance._original_directory_fields):
+        transaction.on_commit(lambda: bump_therapist_versions(instance.pk))
+        transaction.on_commit(lambda: autocomplete_index.update_therapist(instance))
+        # A relisted therapist's old next free slot is stale; new ones start out NULL already.
+        if not created and _is_listed(fields) and not _is_listed(instance._original_directory_fields):
+            transaction.on_commit(lambda: mark_next_free_slots_stale({instance.pk: None}))
+    instance._original_directory_fields = fields
+
+
+@receiver(post_delete, sender=User)
+def directory_user_deleted(sender, instance, **kwargs):
+    if instance.is_therapist:
+        therapist_id = instance.pk
+        transaction.on_commit(lambda: bump_therapist_versions(therapist_id))
+        transaction.on_commit(lambda: autocomplete_index.remove_therapist(therapist_id))
+
+
+@receiver(post_init, sender=User)
+def remember_token_subject(sender, instance, **kwargs):
+    instance._original_email = instance.__dict__.get('email')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_authenticated_user(sender, instance, **kwargs):
+    """Drops the cached user behind JWTs for this account (under its old email too, if it changed)."""
+    emails = {instance._original_email, instance.__dict__.get('email')} - {None}
+
+    def forget():
+        for email in emails:
+            forget_cached_user(email)
+    transaction.on_commit(forget)
+    instance._original_email = instance.__dict__.get('email')
+
+
+@receiver(post_init, sender=TherapistApplication)
+def remember_application_status(sender, instance, **kwargs):
+    instance._original_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=TherapistApplication)
+def application_status_saved(sender, instance, created, **kwargs):
+    if not created and instance.status != instance._original_status:
+        applicant_id = instance.applicant_id
+        transaction.on_commit(lambda: bump_therapist_versions(applicant_id))
+    instance._original_status = instance.status
+
+
+@receiver(pre_delete, sender=ChatMessage)
+def chat_message_deleted(sender, instance, **kwargs):
+    """
+    Takes unread messages deleted outside the chat flow (admin, room deletion) off the counters.
+    Runs before the delete, inside its transaction, while a cascading room still exists to say
+    who the message was unread for.
+    """
+    if not instance.is_read:
+        forget_unread_message(instance)
@@ -0,0 +1,108 @@
+# File: Backend_work/mental_health_app/slot_cache.py
+"""
+In-process cache of per-(therapist, date) free slots, sitting in front of the
+materialized slot calendar.
+
+Entries expire after SLOT_CACHE_TTL seconds and the least recently used ones
+are evicted once SLOT_CACHE_MAXSIZE is reached. Each therapist's entries are
+keyed by a generation kept in the shared Django cache, so `invalidate()` in
+one worker process orphans the therapist's entries in every other one; the
+next read there misses and goes back to the calendar.
+"""
+import threading
+import time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _generation_key(therapist_id):
+    return f'slot-cache:{therapist_id}:generation'
+
+
+def _new_generation():
+    # Seeded from the clock so a generation lost to eviction never repeats an old number.
+    return int(time.time() * 1000)
+
+
+class SlotCache:
+    def __init__(self, maxsize, ttl):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generations(self, therapist_ids):
+        """Returns {therapist_id: generation} with one round trip to the shared cache."""
+        keys = {therapist_id: _generation_key(therapist_id) for therapist_id in therapist_ids}
+        stored = cache.get_many(keys.values())
+        generations = {}
+        for therapist_id, key in keys.items():
+            if key not in stored:
+                cache.add(key, _new_generation(), None)
+                stored[key] = cache.get(key, _new_generation())
+            generations[therapist_id] = stored[key]
+        return generations
+
+    def get_many(self, therapist_id, generation, days):
+        """Returns ({day: (free_intervals, slot_duration)}, [missing days])."""
+        found = {}
+        missing = []
+        with self._lock:
+            for day in days:
+                value = self._entries.get((therapist_id, generation, day))
+                if value is None:
+                    missing.append(day)
+                else:
+                    found[day] = value
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, therapist_id, generation, values):
+        """
+        Stores days under the generation they were read with, so values computed before a
+        concurrent invalidate() land under the old generation and are never served.
+        """
+        with self._lock:
+            for day, value in values.items():
+                self._entries[(therapist_id, generation, day)] = value
+
+    def invalidate(self, therapist_id):
+        """Drops every cached day of a therapist, in all worker processes."""
+        key = _generation_key(therapist_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), None)
+
+    def clear(self):
+        """Empties this process's entries; the shared generations are left alone."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "size": len(self._entries),
+                "maxsize": self._entries.maxsize,
+                "ttl_seconds": self._entries.ttl,
+            }
+
+
+slot_cache = SlotCache(
+    maxsize=getattr(settings, 'SLOT_CACHE_MAXSIZE', 50000),
+    ttl=getattr(settings, 'SLOT_CACHE_TTL', 300),
+)
+
+
+def invalidate_therapist_slots(therapist_id):
+    """Hook for views that change a therapist's bookings or availability."""
+    slot_cache.invalidate(therapist_id)
@@ -0,0 +1,82 @@
+# File: Backend_work/mental_health_app/tags.py
+"""
+Normalized profile tags.
+
+Specializations, languages, modalities and client focus are still edited as
+comma-separated strings on User and TherapistApplication. Each string is
+parsed into Tag rows (one per category and slug) linked through the `tags`
+many-to-many, so directory filters become indexed joins instead of substring
+scans. The links are re-synced by signals.py whenever a source string changes.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Tag category -> the comma-separated field it is parsed from.
+TAG_SOURCE_FIELDS = {
+    'specialization': 'specializations',
+    'language': 'languages_spoken',
+    'modality': 'approach_modalities',
+    'client_focus': 'client_focus',
+}
+
+TAG_MAX_LENGTH = 100
+
+
+def tag_slug(name):
+    return (slugify(name) or name.strip().lower())[:TAG_MAX_LENGTH]
+
+
+def parse_tags(value):
+    """Splits a comma-separated string into {slug: name}, dropping blanks and duplicates."""
+    tags = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())[:TAG_MAX_LENGTH]
+        if name:
+            tags.setdefault(tag_slug(name), name)
+    return tags
+
+
+def tag_sources(instance):
+    """The raw source strings of an instance, read from __dict__ so deferred fields are never loaded."""
+    values = instance.__dict__
+    return tuple(values.get(field) for field in TAG_SOURCE_FIELDS.values())
+
+
+def tag_keys(instance):
+    """Returns {(category, slug): name} for every tag in the instance's source fields."""
+    keys = {}
+    for category, field in TAG_SOURCE_FIELDS.items():
+        for slug, name in parse_tags(getattr(instance, field)).items():
+            keys[(category, slug)] = name
+    return keys
+
+
+def sync_tags(instance):
+    """Creates any missing Tag rows and points `instance.tags` at exactly the parsed set."""
+    Tag = instance.tags.model
+    keys = tag_keys(instance)
+    if not keys:
+        instance.tags.clear()
+        return
+
+    Tag.objects.bulk_create(
+        [Tag(category=category, slug=slug, name=name) for (category, slug), name in keys.items()],
+        ignore_conflicts=True,
+    )
+    slugs_by_category = {}
+    for category, slug in keys:
+        slugs_by_category.setdefault(category, []).append(slug)
+    instance.tags.set(Tag.objects.filter(reduce(or_, (
+        Q(category=category, slug__in=slugs) for category, slugs in slugs_by_category.items()
+    ))))
+
+
+def requested_tag_slugs(query_params, param):
+    """Slugs asked for by a filter parameter; accepts repeated parameters and comma-separated values."""
+    slugs = []
+    for value in query_params.getlist(param):
+        slugs.extend(parse_tags(value))
+    return slugs
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mental_health_app.models import User
+from mental_health_app.slot_cache import slot_cache
+
+
+# The test runner is one process and shouldn't need a Redis server.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_user(email, **fields):
+    # objects.create skips password hashing, which would dominate the run time.
+    fields.setdefault('first_name', 'First')
+    fields.setdefault('last_name', 'Last')
+    return User.objects.create(email=email, **fields)
+
+
+def make_therapist(email, **fields):
+    """A therapist listed in the directory unless the fields say otherwise."""
+    return make_user(email, **{'is_therapist': True, 'is_verified': True, 'is_available': True, **fields})
+
+
+def next_monday():
+    """The first Monday after today, so every slot in the tests lies in the future."""
+    today = timezone.localdate()
+    return today + timedelta(days=7 - today.weekday())
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class APITestBase(TestCase):
+    def setUp(self):
+        cache.clear()
+        slot_cache.clear()
+        self.client_user = make_user('client@example.com')
+        self.api = api_client(self.client_user)
+
+    def committed(self):
+        """Runs the on_commit hooks (cache bumps, calendar refreshes) of the block as if it had committed."""
+        return self.captureOnCommitCallbacks(execute=True)
@@ -0,0 +1,153 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from cachetools import TLRUCache
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from mental_health_app import middleware
+from mental_health_app.authentication import _cache_key, get_cached_user
+from mental_health_app.models import User
+
+from .base import APITestBase, make_user
+
+
+def bearer_client(user):
+    api = APIClient()
+    api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return api
+
+
+class CachedJWTAuthenticationTests(APITestBase):
+    def test_cache_holds_fields_not_the_password(self):
+        self.client_user.set_password('secret-password')
+        with self.committed():
+            self.client_user.save()
+        user = get_cached_user(self.client_user.email)
+        self.assertEqual(user.id, self.client_user.id)
+
+        cached = cache.get(_cache_key(self.client_user.email))
+        self.assertNotIn('password', cached)
+        self.assertNotIn(self.client_user.password, cached.values())
+        self.assertNotIn('password', user.__dict__)
+
+    def test_second_lookup_skips_the_database(self):
+        get_cached_user(self.client_user.email)
+        with self.assertNumQueries(0):
+            user = get_cached_user(self.client_user.email)
+        self.assertEqual(user.email, self.client_user.email)
+
+    def test_deactivation_is_seen_on_the_next_request(self):
+        api = bearer_client(self.client_user)
+        self.assertEqual(api.get('/api/journal/').status_code, 200)
+
+        user = User.objects.get(pk=self.client_user.pk)
+        user.is_active = False
+        with self.committed():
+            user.save()
+        self.assertEqual(api.get('/api/journal/').status_code, 401)
+
+    def test_demotion_is_seen_on_the_next_request(self):
+        admin = make_user('admin@example.com', is_staff=True, is_superuser=True)
+        api = bearer_client(admin)
+        self.assertEqual(api.get('/api/admin/users/').status_code, 200)
+
+        admin.is_superuser = False
+        with self.committed():
+            admin.save(update_fields=['is_superuser'])
+        self.assertEqual(api.get('/api/admin/users/').status_code, 403)
+
+    def test_email_change_forgets_the_old_subject(self):
+        old_email = self.client_user.email
+        get_cached_user(old_email)
+        self.client_user.email = 'renamed@example.com'
+        with self.committed():
+            self.client_user.save()
+        with self.assertRaises(User.DoesNotExist):
+            get_cached_user(old_email)
+
+    def test_deleted_user_is_not_found(self):
+        api = bearer_client(self.client_user)
+        self.assertEqual(api.get('/api/journal/').status_code, 200)
+        with self.committed():
+            User.objects.get(pk=self.client_user.pk).delete()
+        self.assertEqual(api.get('/api/journal/').status_code, 401)
+
+
+class WebSocketTokenCacheTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        # A fresh cache on a clock the test moves by hand.
+        self.now = time.time()
+        tokens = TLRUCache(maxsize=100, ttu=middleware._token_expiry, timer=lambda: self.now)
+        patcher = mock.patch.object(middleware, '_validated_tokens', tokens)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = AccessToken.for_user(self.client_user)
+
+    def test_reconnect_skips_validation_until_exp(self):
+        self.token.set_exp(lifetime=timedelta(seconds=60))
+        token = str(self.token)
+        self.assertEqual(middleware.get_token_subject(token), (self.client_user.email, False))
+        self.now += 30
+        self.assertEqual(middleware.get_token_subject(token), (self.client_user.email, True))
+        self.now += 31
+        self.assertEqual(middleware.get_token_subject(token), (self.client_user.email, False))
+
+    @override_settings(WS_TOKEN_CACHE_TTL=10)
+    def test_entries_live_at_most_ws_token_cache_ttl(self):
+        token = str(self.token)
+        middleware.get_token_subject(token)
+        self.now += 9
+        self.assertTrue(middleware.get_token_subject(token)[1])
+        self.now += 2
+        self.assertFalse(middleware.get_token_subject(token)[1])
+
+    def test_expired_token_is_rejected_and_not_cached(self):
+        self.token.set_exp(from_time=timezone.now() - timedelta(hours=1))
+        token = str(self.token)
+        with self.assertRaises(TokenError):
+            middleware.get_token_subject(token)
+        self.assertNotIn(token, middleware._validated_tokens)
+
+
+class PurgeExpiredTokensTests(TestCase):
+    def setUp(self):
+        user = make_user('tokens@example.com')
+        now = timezone.now()
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(
+                user=user, jti=str(i), token='token', created_at=now,
+                expires_at=now + timedelta(hours=-1 if i % 3 else 1),
+            )
+            for i in range(12)
+        ])
+        # Every other token is blacklisted, expired or not.
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens[::2]])
+        self.live_ids = {token.id for i, token in enumerate(tokens) if i % 3 == 0}
+        self.live_blacklisted_ids = {token.id for i, token in enumerate(tokens) if i % 6 == 0}
+
+    def test_deletes_only_expired_tokens_in_batches(self):
+        out = StringIO()
+        call_command('purge_expired_tokens', batch_size=3, stdout=out)
+        self.assertEqual(set(OutstandingToken.objects.values_list('id', flat=True)), self.live_ids)
+        self.assertEqual(set(BlacklistedToken.objects.values_list('token_id', flat=True)), self.live_blacklisted_ids)
+        self.assertIn("Purged 8 outstanding and 4 blacklisted tokens in 3 batches", out.getvalue())
+
+    def test_every_repeats_the_purge(self):
+        out = StringIO()
+        with mock.patch('mental_health_app.management.commands.purge_expired_tokens.time.sleep',
+                        side_effect=[None, KeyboardInterrupt]) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('purge_expired_tokens', every=5, stdout=out)
+        sleep.assert_called_with(300)
+        self.assertEqual(out.getvalue().count("Purged"), 2)
+        self.assertIn("Purged 0 outstanding", out.getvalue())
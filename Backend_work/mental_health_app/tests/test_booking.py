@@ -0,0 +1,97 @@
+from decimal import Decimal
+from unittest import mock
+
+from mental_health_app.models import Payment, SessionRequest
+from mental_health_app.scheduling import lock_therapist_schedule
+
+from .base import APITestBase, api_client, make_therapist, make_user, next_monday
+
+
+class BookingTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.monday = next_monday()
+        self.free_therapist = make_therapist('free@example.com', is_free_consultation=True)
+        self.paid_therapist = make_therapist('paid@example.com', hourly_rate=Decimal('1500'))
+        self.other_client = make_user('other@example.com')
+        self.other_api = api_client(self.other_client)
+
+    def book(self, api, therapist, at, duration=60):
+        with self.committed():
+            return api.post('/api/session-requests/', {
+                'therapist': therapist.id, 'requested_date': self.monday.isoformat(),
+                'requested_time': at, 'session_duration': duration,
+            }, format='json')
+
+    def listed_starts(self, therapist):
+        response = self.api.get(f'/api/therapists/{therapist.id}/available-slots/',
+                                {'start_date': self.monday.isoformat(), 'end_date': self.monday.isoformat()})
+        return [slot['start_time'] for slot in response.data['slots'].get(self.monday.isoformat(), [])]
+
+    def test_conflicting_booking_gets_409_under_the_therapist_lock(self):
+        with mock.patch('mental_health_app.views.lock_therapist_schedule', wraps=lock_therapist_schedule) as lock:
+            self.assertEqual(self.book(self.api, self.free_therapist, '10:00').status_code, 201)
+            lock.assert_called_once_with(self.free_therapist.id)
+
+            # Same slot and an overlapping one are conflicts; outside working hours is a bad request.
+            self.assertEqual(self.book(self.other_api, self.free_therapist, '10:00').status_code, 409)
+            self.assertEqual(self.book(self.other_api, self.free_therapist, '10:30').status_code, 409)
+            self.assertEqual(self.book(self.other_api, self.free_therapist, '18:00').status_code, 400)
+            self.assertEqual(lock.call_count, 4)
+
+        self.assertEqual(SessionRequest.objects.filter(therapist=self.free_therapist).count(), 1)
+        self.assertNotIn('10:00', self.listed_starts(self.free_therapist))
+        self.assertEqual(self.book(self.other_api, self.free_therapist, '11:00').status_code, 201)
+
+    def test_unpaid_request_does_not_hold_the_slot_until_payment(self):
+        self.assertEqual(self.book(self.api, self.paid_therapist, '10:00').status_code, 201)
+        self.assertEqual(self.book(self.other_api, self.paid_therapist, '10:00').status_code, 201)
+        first, second = SessionRequest.objects.filter(therapist=self.paid_therapist).order_by('id')
+
+        success = {"success": True, "checkout_request_id": "checkout-1", "merchant_request_id": "merchant-1"}
+        with mock.patch('mental_health_app.views.initiate_stk_push', return_value=success), self.committed():
+            response = self.api.post('/api/payments/initiate/', {
+                'session_request_id': first.id, 'mpesa_phone_number': '254712345678'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        with mock.patch('mental_health_app.views.initiate_stk_push') as stk_push, self.committed():
+            response = self.other_api.post('/api/payments/initiate/', {
+                'session_request_id': second.id, 'mpesa_phone_number': '254712345679'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        stk_push.assert_not_called()
+        second.refresh_from_db()
+        self.assertFalse(second.is_paid)
+
+    def test_failed_stk_push_releases_the_held_slot(self):
+        self.assertEqual(self.book(self.api, self.paid_therapist, '10:00').status_code, 201)
+        session_request = SessionRequest.objects.get(therapist=self.paid_therapist)
+        self.assertIn('10:00', self.listed_starts(self.paid_therapist))
+
+        failure = {"success": False, "message": "Failed to get M-Pesa access token."}
+        with mock.patch('mental_health_app.views.initiate_stk_push', return_value=failure), self.committed():
+            response = self.api.post('/api/payments/initiate/', {
+                'session_request_id': session_request.id, 'mpesa_phone_number': '254712345678'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        session_request.refresh_from_db()
+        self.assertFalse(session_request.is_paid)
+        self.assertFalse(Payment.objects.exists())
+        self.assertIn('10:00', self.listed_starts(self.paid_therapist))
+        self.assertEqual(self.book(self.other_api, self.paid_therapist, '10:00').status_code, 201)
+
+    def test_failed_payment_record_releases_the_held_slot(self):
+        self.assertEqual(self.book(self.api, self.paid_therapist, '10:00').status_code, 201)
+        session_request = SessionRequest.objects.get(therapist=self.paid_therapist)
+
+        # M-Pesa accepted the push, but its CheckoutRequestID doesn't fit the Payment row.
+        success = {"success": True, "checkout_request_id": "x" * 101, "merchant_request_id": "merchant-1"}
+        with mock.patch('mental_health_app.views.initiate_stk_push', return_value=success), self.committed(), \
+                self.assertLogs('mental_health_app.views', 'ERROR'):
+            response = self.api.post('/api/payments/initiate/', {
+                'session_request_id': session_request.id, 'mpesa_phone_number': '254712345678'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        session_request.refresh_from_db()
+        self.assertFalse(session_request.is_paid)
+        self.assertFalse(Payment.objects.exists())
+        self.assertIn('10:00', self.listed_starts(self.paid_therapist))
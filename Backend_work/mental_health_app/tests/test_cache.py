@@ -0,0 +1,81 @@
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from mental_health_app.cache_backends import FailSafeRedisCache
+
+from .base import APITestBase, api_client, make_therapist, next_monday
+
+# Nothing listens on port 1, so every operation fails to connect.
+UNREACHABLE_REDIS = {
+    'BACKEND': 'mental_health_app.cache_backends.FailSafeRedisCache',
+    'LOCATION': 'redis://127.0.0.1:1/0',
+    'OPTIONS': {'socket_connect_timeout': 0.2, 'socket_timeout': 0.2},
+}
+
+
+class FailSafeCacheTests(APITestBase):
+    def test_operations_behave_like_misses(self):
+        cache = FailSafeRedisCache(UNREACHABLE_REDIS['LOCATION'], {'OPTIONS': UNREACHABLE_REDIS['OPTIONS']})
+        with self.assertLogs('mental_health_app.cache_backends', 'WARNING'):
+            self.assertEqual(cache.get('key', 'default'), 'default')
+            self.assertFalse(cache.add('key', 1))
+            cache.set('key', 1)
+            self.assertEqual(cache.get_many(['key']), {})
+            self.assertIsNone(cache.incr('key'))
+            self.assertEqual(cache.set_many({'key': 1}), ['key'])
+            cache.delete_many(['key'])
+
+    def test_api_keeps_working_without_redis(self):
+        therapist = make_therapist('therapist@example.com')
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.client_user).access_token}')
+        monday = next_monday().isoformat()
+        with override_settings(CACHES={'default': UNREACHABLE_REDIS}), self.assertLogs('mental_health_app.cache_backends', 'WARNING'):
+            self.assertEqual(api.get('/api/user/').status_code, 200)
+            self.assertEqual(api.get('/api/therapists/', {'facets': 'true'}).status_code, 200)
+            self.assertEqual(api.get(f'/api/therapists/{therapist.id}/').status_code, 200)
+            response = api.get(f'/api/therapists/{therapist.id}/available-slots/', {'start_date': monday, 'end_date': monday})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data['slots'])
+            with self.committed():
+                therapist.bio = 'Changed'
+                therapist.save()
+
+
+class CacheInvalidationTests(APITestBase):
+    def test_profile_change_reaches_cached_directory_and_profile(self):
+        therapist = make_therapist('therapist@example.com', bio='Before')
+        self.assertEqual(self.api.get('/api/therapists/').data[0]['bio'], 'Before')
+        self.assertEqual(self.api.get(f'/api/therapists/{therapist.id}/').data['bio'], 'Before')
+
+        with self.committed():
+            therapist.bio = 'After'
+            therapist.save()
+        self.assertEqual(self.api.get('/api/therapists/').data[0]['bio'], 'After')
+        self.assertEqual(self.api.get(f'/api/therapists/{therapist.id}/').data['bio'], 'After')
+
+        with self.committed():
+            therapist.is_available = False
+            therapist.save()
+        self.assertEqual(self.api.get('/api/therapists/').data, [])
+
+    def test_availability_change_reaches_cached_slots(self):
+        therapist = make_therapist('therapist@example.com')
+        monday = next_monday()
+        url = f'/api/therapists/{therapist.id}/available-slots/'
+        params = {'start_date': monday.isoformat(), 'end_date': monday.isoformat()}
+        self.assertEqual(self.api.get(url, params).data['slots'][monday.isoformat()][0]['start_time'], '09:00')
+
+        therapist_api = api_client(therapist)
+        with self.committed():
+            response = therapist_api.post('/api/therapists/me/availability/', {
+                'day_of_week': 'Monday', 'start_time': '13:00', 'end_time': '15:00', 'slot_duration': 30,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        slots = self.api.get(url, params).data['slots'][monday.isoformat()]
+        self.assertEqual([slot['start_time'] for slot in slots], ['13:00', '13:30', '14:00', '14:30'])
+
+        with self.committed():
+            therapist_api.delete(f"/api/therapists/me/availability/{response.data['id']}/")
+        self.assertEqual(self.api.get(url, params).data['slots'][monday.isoformat()][0]['start_time'], '09:00')
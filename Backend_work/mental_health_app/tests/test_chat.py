@@ -0,0 +1,137 @@
+import random
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from mental_health_app.models import ChatMessage, ChatRoom, RoomUnreadCounter
+from mental_health_app.routing import websocket_urlpatterns
+from mental_health_app.unread import mark_messages_read, record_unread_message, unread_count, unread_per_room
+
+from .base import LOCMEM_CACHES, APITestBase, make_therapist, make_user
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class UnreadCounterTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = make_therapist('therapist@example.com')
+        self.other = make_user('other@example.com')
+        self.room = ChatRoom.objects.create(user1=self.client_user, user2=self.therapist)
+        self.other_room = ChatRoom.objects.create(user1=self.other, user2=self.therapist)
+
+    def send(self, sender, room, receiver=None):
+        message = ChatMessage.objects.create(sender=sender, receiver=receiver, chat_room=room, message_content='Hi')
+        record_unread_message(message)
+        return message
+
+    def counters(self):
+        return {
+            (counter.user_id, counter.chat_room_id): counter.count
+            for counter in RoomUnreadCounter.objects.all() if counter.count
+        }
+
+    def test_counts_for_the_other_room_member_whatever_the_receiver_column_says(self):
+        self.send(self.client_user, self.room, receiver=self.therapist)
+        self.send(self.client_user, self.room)
+        self.send(self.client_user, self.room, receiver=self.client_user)
+        self.assertEqual(unread_count(self.therapist), 3)
+        self.assertEqual(unread_count(self.client_user), 0)
+        self.assertEqual(self.api.get('/api/unread-messages/').data['unread_message_count'], 0)
+
+    def test_only_room_members_other_than_the_sender_can_mark_read(self):
+        first, second = self.send(self.client_user, self.room), self.send(self.client_user, self.room)
+        self.assertEqual(mark_messages_read(self.client_user, [first.id]), 0)
+        self.assertEqual(mark_messages_read(self.other, [first.id]), 0)
+        self.assertEqual(mark_messages_read(self.therapist, [first.id, second.id]), 2)
+        self.assertEqual(mark_messages_read(self.therapist, [first.id]), 0)
+        self.assertEqual(unread_count(self.therapist), 0)
+
+    def test_deleting_unread_messages_lowers_the_counters(self):
+        read, unread = self.send(self.client_user, self.room), self.send(self.client_user, self.room)
+        self.send(self.therapist, self.other_room)
+        mark_messages_read(self.therapist, [read.id])
+        read.refresh_from_db()
+        read.delete()
+        self.assertEqual(unread_count(self.therapist), 1)
+        unread.delete()
+        self.assertEqual(unread_count(self.therapist), 0)
+
+        self.other_room.delete()
+        self.assertEqual(unread_count(self.other), 0)
+
+    def test_counters_match_a_recount(self):
+        rng = random.Random(1)
+        users, rooms = [self.client_user, self.therapist, self.other], [self.room, self.other_room]
+        messages = []
+        for _ in range(60):
+            room = rng.choice(rooms)
+            messages.append(self.send(rng.choice([room.user1, room.user2]), room, receiver=rng.choice(users + [None])))
+            if rng.random() < 0.3:
+                reader = rng.choice(users)
+                mark_messages_read(reader, [message.id for message in rng.sample(messages, min(5, len(messages)))])
+            if rng.random() < 0.1:
+                ChatMessage.objects.get(id=messages.pop(rng.randrange(len(messages))).id).delete()
+
+        counted = self.counters()
+        self.assertEqual(counted, dict(unread_per_room(ChatMessage.objects.all())))
+        call_command('recount_unread_messages', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.counters(), counted)
+        for user in users:
+            self.assertEqual(unread_count(user), sum(count for (user_id, _), count in counted.items() if user_id == user.id))
+
+
+# The consumer runs its queries in a worker thread, outside the test's transaction.
+@override_settings(CACHES=LOCMEM_CACHES, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.client_user = make_user('client@example.com')
+        self.therapist = make_therapist('therapist@example.com')
+        self.outsider = make_user('outsider@example.com')
+        low, high = sorted([self.client_user.id, self.therapist.id])
+        self.room_name = f'chat_{low}_{high}'
+
+    def connect(self, user, room_name):
+        """Opens a socket as `user`; returns whether it was accepted and the frames received."""
+        async def run():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{room_name}/')
+            communicator.scope['user'] = user
+            accepted, _ = await communicator.connect()
+            frames = []
+            if accepted:
+                frames.append(await communicator.receive_json_from())
+                await communicator.send_json_to({'type': 'chat_message', 'message': 'Hello'})
+                frames.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return accepted, frames
+        return async_to_sync(run)()
+
+    def test_member_can_send_messages(self):
+        accepted, frames = self.connect(self.client_user, self.room_name)
+        self.assertTrue(accepted)
+        self.assertEqual(frames[1]['message'], 'Hello')
+        message = ChatMessage.objects.get()
+        self.assertEqual((message.sender_id, message.receiver_id), (self.client_user.id, self.therapist.id))
+        self.assertEqual(unread_count(self.therapist), 1)
+
+    def test_non_member_is_rejected(self):
+        with self.assertLogs('mental_health_app.consumer', 'WARNING') as logs:
+            accepted, _ = self.connect(self.outsider, self.room_name)
+        self.assertFalse(accepted)
+        self.assertIn('not a member', logs.output[0])
+        self.assertFalse(ChatRoom.objects.exists())
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_room_with_a_missing_partner_is_rejected(self):
+        with self.assertLogs('mental_health_app.consumer', 'WARNING'):
+            accepted, _ = self.connect(self.client_user, f'chat_{self.client_user.id}_999999')
+        self.assertFalse(accepted)
+        self.assertFalse(ChatRoom.objects.exists())
+
+    def test_malformed_room_name_is_rejected(self):
+        with self.assertLogs('mental_health_app.consumer', 'WARNING'):
+            accepted, _ = self.connect(self.client_user, 'lobby')
+        self.assertFalse(accepted)
@@ -0,0 +1,54 @@
+from datetime import time
+
+from django.utils import timezone
+
+from mental_health_app.models import Session, SessionRequest, User
+
+from .base import APITestBase, make_therapist, next_monday
+
+
+class ConditionalGetTests(APITestBase):
+    def assert_revalidates(self, url, change):
+        first = self.api.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        with self.committed():
+            change()
+        changed = self.api.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        return changed
+
+    def test_therapist_profile(self):
+        therapist = make_therapist('therapist@example.com', bio='Before')
+
+        def change():
+            therapist.bio = 'After'
+            therapist.save()
+        self.assertEqual(self.assert_revalidates(f'/api/therapists/{therapist.id}/', change).data['bio'], 'After')
+
+    def test_own_profile_reads_the_row_not_the_authenticated_copy(self):
+        # Another worker's write: request.user (possibly cached) still has the old values.
+        def change():
+            User.objects.filter(pk=self.client_user.pk).update(first_name='Changed', updated_at=timezone.now())
+        self.assertEqual(self.assert_revalidates('/api/user/', change).data['first_name'], 'Changed')
+
+    def test_session_list(self):
+        therapist = make_therapist('therapist@example.com')
+        request = SessionRequest.objects.create(client=self.client_user, therapist=therapist,
+                                                requested_date=next_monday(), requested_time=time(10))
+        session = Session.objects.create(session_request=request, client=self.client_user, therapist=therapist,
+                                         session_date=next_monday(), session_time=time(10))
+
+        def change():
+            session.notes = 'Bring the worksheet'
+            session.save()
+        self.assert_revalidates('/api/client/sessions/', change)
+
+        # A therapist rename changes therapist_name, so it must invalidate the client's ETag as well.
+        def rename():
+            therapist.first_name = 'Renamed'
+            therapist.save()
+        self.assertEqual(self.assert_revalidates('/api/client/sessions/', rename).data[0]['therapist_name'], 'Renamed Last')
+
+
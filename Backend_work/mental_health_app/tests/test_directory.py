@@ -0,0 +1,283 @@
+import math
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from mental_health_app.autocomplete import autocomplete_index
+from mental_health_app.fieldsets import sparse_queryset
+from mental_health_app.geo import EARTH_RADIUS_KM, filter_near
+from mental_health_app.models import Session, SessionRequest, Tag, User
+from mental_health_app.pagination import encode_cursor
+from mental_health_app.scheduling import find_free_therapists
+from mental_health_app.serializers import SessionSerializer
+
+from .base import APITestBase, make_therapist, next_monday
+
+
+class SearchTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.by_bio = make_therapist('bio@example.com', first_name='Ann', last_name='Baker', bio='Works with anxiety and grief.')
+        self.by_name = make_therapist('name@example.com', first_name='Griffin', last_name='Cole')
+        self.by_specialization = make_therapist('spec@example.com', first_name='Ben', last_name='Adams', specializations='Anxiety, Trauma')
+        make_therapist('other@example.com', first_name='Carl', last_name='Dunn', bio='Couples work.')
+
+    def search(self, query):
+        response = self.api.get('/api/therapists/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_matches_any_searchable_field(self):
+        self.assertEqual(sorted(self.search('anxiety')), sorted([self.by_bio.id, self.by_specialization.id]))
+        self.assertEqual(self.search('trauma'), [self.by_specialization.id])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search('gri'), [self.by_name.id, self.by_bio.id])
+
+    def test_document_follows_partial_saves(self):
+        self.by_name.bio = 'Specialises in insomnia.'
+        self.by_name.save(update_fields=['bio'])
+        self.assertIn('insomnia', User.objects.get(id=self.by_name.id).search_document)
+        self.assertEqual(self.search('insomnia'), [self.by_name.id])
+
+
+class TagFilterTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.anxiety = make_therapist('anxiety@example.com', specializations='Anxiety, Grief', languages_spoken='English')
+        self.trauma = make_therapist('trauma@example.com', specializations=' trauma ,ANXIETY', languages_spoken='Swahili, English')
+        self.grief = make_therapist('grief@example.com', specializations='Grief counselling', languages_spoken='Swahili')
+
+    def filter(self, **params):
+        response = self.api.get('/api/therapists/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.data)
+
+    def test_any_tag_within_a_category(self):
+        self.assertEqual(self.filter(specialization='anxiety'), sorted([self.anxiety.id, self.trauma.id]))
+        self.assertEqual(self.filter(specialization='Grief, Trauma'), sorted([self.anxiety.id, self.trauma.id]))
+        self.assertEqual(self.filter(specialization='grief-counselling'), [self.grief.id])
+
+    def test_all_categories_at_once(self):
+        self.assertEqual(self.filter(specialization='anxiety', language='swahili'), [self.trauma.id])
+
+    def test_links_follow_profile_edits(self):
+        self.grief.specializations = 'Anxiety'
+        self.grief.save()
+        self.assertEqual(self.filter(specialization='anxiety'), sorted([self.anxiety.id, self.trauma.id, self.grief.id]))
+        self.assertEqual(self.filter(specialization='grief-counselling'), [])
+        self.assertEqual(Tag.objects.filter(category='specialization', slug='anxiety').count(), 1)
+
+
+class FacetTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        make_therapist('a@example.com', is_free_consultation=True, session_modes='online', specializations='Anxiety')
+        make_therapist('b@example.com', session_modes='both', specializations='Anxiety, Grief', languages_spoken='Swahili')
+        make_therapist('c@example.com', session_modes='physical', specializations='Grief')
+        make_therapist('hidden@example.com', is_available=False, specializations='Anxiety')
+
+    def facets(self, **params):
+        response = self.api.get('/api/therapists/', {'facets': 'true', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+
+    def test_counts_follow_the_filters(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(facets['pricing_type'], {'free': 1, 'paid': 2})
+        self.assertEqual(facets['session_modes'], {'online': 2, 'physical': 2, 'both': 1})
+        self.assertEqual([(tag['slug'], tag['count']) for tag in facets['specialization']], [('anxiety', 2), ('grief', 2)])
+        self.assertEqual(facets['language'], [{'slug': 'swahili', 'name': 'Swahili', 'count': 1}])
+
+        facets = self.facets(specialization='grief')
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['pricing_type'], {'free': 0, 'paid': 2})
+
+    def test_filters_run_once_for_the_page_and_the_facets(self):
+        monday = next_monday().isoformat()
+        with mock.patch('mental_health_app.views.find_free_therapists', wraps=find_free_therapists) as find_free:
+            facets = self.facets(free_on=monday, free_from='10:00', free_to='11:00')
+        self.assertEqual(find_free.call_count, 1)
+        self.assertEqual(facets['total'], 3)
+
+
+class DirectoryPaginationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        # Ties and NULLs in every sort key, so the id tie-breaker and nulls_last handling are exercised.
+        for index in range(9):
+            make_therapist(
+                f'therapist{index}@example.com', first_name=f'Name{index % 3}', last_name=f'Family{index % 2}',
+                hourly_rate=None if index % 4 == 0 else Decimal(1000 + 500 * (index % 3)),
+                years_of_experience=None if index % 5 == 0 else index % 3,
+                next_free_slot=None if index % 3 == 0 else timezone.now() + timedelta(days=index % 2 + 1),
+            )
+
+    def walk(self, params):
+        ids, url = [], '/api/therapists/'
+        params = {**params, 'page_size': 2}
+        while url:
+            response = self.api.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        return ids
+
+    def test_pages_match_the_unpaged_list_for_every_sort(self):
+        for params in [{}, {'sort': 'price'}, {'sort': 'experience'}, {'sort': 'availability'}, {'search': 'Name1'}]:
+            with self.subTest(**params):
+                full = [row['id'] for row in self.api.get('/api/therapists/', params).data]
+                self.assertTrue(full)
+                self.assertEqual(self.walk(params), full)
+
+    def test_malformed_cursor_is_not_found(self):
+        for sort, length in [(None, 4), ('price', 2), ('availability', 2)]:
+            params = {'cursor': encode_cursor(['zzz'] * length)}
+            if sort:
+                params['sort'] = sort
+            self.assertEqual(self.api.get('/api/therapists/', params).status_code, 404)
+        self.assertEqual(self.api.get('/api/therapists/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class SparseFieldsetTests(APITestBase):
+    def test_trimmed_profile_is_not_served_from_the_profile_cache(self):
+        therapist = make_therapist('therapist@example.com')
+        trimmed = self.api.get(f'/api/therapists/{therapist.id}/', {'fields': 'id,full_name'})
+        self.assertEqual(set(trimmed.data), {'id', 'full_name'})
+
+        full = self.api.get(f'/api/therapists/{therapist.id}/')
+        self.assertIn('bio', full.data)
+        self.assertEqual(set(self.api.get(f'/api/therapists/{therapist.id}/').data), set(full.data))
+
+    def test_trimmed_directory_page_does_not_leak_into_the_full_one(self):
+        make_therapist('therapist@example.com')
+        self.assertEqual(set(self.api.get('/api/therapists/', {'fields': 'id'}).data[0]), {'id'})
+        self.assertIn('full_name', self.api.get('/api/therapists/').data[0])
+
+    def test_session_list_only_loads_the_related_columns_requested(self):
+        therapist = make_therapist('therapist@example.com')
+        request = SessionRequest.objects.create(client=self.client_user, therapist=therapist,
+                                                requested_date=next_monday(), requested_time=time(10))
+        Session.objects.create(session_request=request, client=self.client_user, therapist=therapist,
+                               session_date=next_monday(), session_time=time(10))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get('/api/client/sessions/', {'fields': 'therapist_name,session_date'})
+        self.assertEqual(response.data[0], {'id': response.data[0]['id'], 'session_date': next_monday().isoformat(),
+                                            'therapist_name': 'First Last'})
+        # The ETag aggregate plus one listing query that joins the therapist's name columns only.
+        self.assertEqual(len(queries.captured_queries), 2)
+        listing = queries.captured_queries[-1]['sql']
+        self.assertIn('"first_name"', listing)
+        self.assertNotIn('password', listing)
+        self.assertNotIn('"bio"', listing)
+
+
+    def test_queryset_is_untouched_without_a_fieldset(self):
+        queryset = Session.objects.all()
+        for params in ({}, {'fields': ''}):
+            request = Request(APIRequestFactory().get('/api/client/sessions/', params))
+            self.assertIs(sparse_queryset(queryset, SessionSerializer, request), queryset)
+        request = Request(APIRequestFactory().get('/api/client/sessions/', {'omit': 'notes'}))
+        self.assertIsNot(sparse_queryset(queryset, SessionSerializer, request), queryset)
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GeoSearchTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(3)
+        # Clusters around Nairobi, either side of the antimeridian (Fiji) and near the north pole.
+        centres = [(-1.29, 36.82), (-17.7, 179.9), (-17.7, -179.9), (89.5, 10.0)]
+        self.therapists = []
+        for index in range(60):
+            lat, lng = centres[index % len(centres)]
+            lat = max(-90, min(90, lat + rng.uniform(-1.5, 1.5)))
+            lng = (lng + rng.uniform(-1.5, 1.5) + 180) % 360 - 180
+            self.therapists.append(make_therapist(f'therapist{index}@example.com', session_modes='physical',
+                                                  latitude=lat, longitude=lng))
+
+    def test_matches_a_full_haversine_scan(self):
+        for lat, lng, radius_km in [(-1.29, 36.82, 50), (-17.7, 179.95, 120), (-17.7, -179.95, 120), (89.9, -170, 150), (0, 0, 100)]:
+            with self.subTest(lat=lat, lng=lng, radius_km=radius_km):
+                found = filter_near(User.objects.filter(is_therapist=True), lat, lng, radius_km)
+                expected = {t.id for t in self.therapists if haversine(lat, lng, t.latitude, t.longitude) <= radius_km}
+                self.assertEqual({t.id for t in found}, expected)
+                for therapist in found:
+                    self.assertAlmostEqual(therapist.distance_km, haversine(lat, lng, therapist.latitude, therapist.longitude), places=3)
+
+    def test_antimeridian_box_covers_both_sides(self):
+        found = {t.longitude > 0 for t in filter_near(User.objects.all(), -17.7, 180, 150)}
+        self.assertEqual(found, {True, False})
+
+    def test_directory_orders_in_person_therapists_by_distance(self):
+        online = make_therapist('online@example.com', session_modes='online', latitude=-1.29, longitude=36.82)
+        response = self.api.get('/api/therapists/', {'near': '-1.29,36.82', 'radius_km': 100})
+        self.assertEqual(response.status_code, 200)
+        ids = [row['id'] for row in response.data]
+        self.assertTrue(ids)
+        self.assertNotIn(online.id, ids)
+        by_id = {t.id: t for t in self.therapists}
+        distances = [haversine(-1.29, 36.82, by_id[i].latitude, by_id[i].longitude) for i in ids]
+        self.assertEqual(distances, sorted(distances))
+
+        for params in [{'near': '91,0'}, {'near': 'x'}, {'near': '0,0', 'radius_km': 0}, {'near': '0,0', 'radius_km': 'far'}]:
+            self.assertEqual(self.api.get('/api/therapists/', params).status_code, 400)
+
+
+class AutocompleteTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.jane = make_therapist('jane@example.com', first_name='Jane', last_name='Doe', specializations='Anxiety, Grief')
+        self.john = make_therapist('john@example.com', first_name='John', last_name='Anderson', specializations='Anxiety')
+        make_therapist('hidden@example.com', first_name='Janet', last_name='Hidden', is_verified=False)
+        autocomplete_index.rebuild()
+
+    def suggest(self, q, **params):
+        response = self.api.get('/api/therapists/autocomplete/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['type'], row['label']) for row in response.data]
+
+    def test_specializations_then_names_by_any_word(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete_index.suggest('an', 10), [
+                {'type': 'specialization', 'label': 'Anxiety', 'slug': 'anxiety', 'therapist_count': 2},
+                {'type': 'therapist', 'label': 'John Anderson', 'id': self.john.id},
+            ])
+        self.assertEqual(self.suggest('doe'), [('therapist', 'Jane Doe')])
+        self.assertEqual(self.suggest('JANE  d'), [('therapist', 'Jane Doe')])
+        self.assertEqual(self.suggest('jan'), [('therapist', 'Jane Doe')])
+        self.assertEqual(self.suggest('an', limit=1), [('specialization', 'Anxiety')])
+        self.assertEqual(self.suggest(''), [])
+        self.assertEqual(self.api.get('/api/therapists/autocomplete/', {'q': 'a', 'limit': 0}).status_code, 400)
+
+    def test_follows_profile_changes(self):
+        with self.committed():
+            self.jane.last_name = 'Smith'
+            self.jane.specializations = 'Grief'
+            self.jane.save()
+        self.assertEqual(self.suggest('doe'), [])
+        self.assertEqual(self.suggest('smi'), [('therapist', 'Jane Smith')])
+        self.assertEqual(self.suggest('anx'), [('specialization', 'Anxiety')])
+        self.assertEqual(autocomplete_index.suggest('anx', 1)[0]['therapist_count'], 1)
+
+        with self.committed():
+            self.john.is_available = False
+            self.john.save()
+        self.assertEqual(self.suggest('anx'), [])
+        with self.committed():
+            self.jane.delete()
+        self.assertEqual(self.suggest('j'), [])
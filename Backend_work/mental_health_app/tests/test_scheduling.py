@@ -0,0 +1,443 @@
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from mental_health_app.models import Session, SessionRequest, TherapistAvailability, TherapistSlotCalendar, User
+from mental_health_app.scheduling import (
+    TherapistSchedule, find_earliest_slots, find_free_therapists, load_slot_calendar, rebuild_slot_calendar,
+    refresh_next_free_slots, refresh_slot_calendar,
+)
+from mental_health_app.slot_cache import SlotCache, slot_cache
+
+from .base import APITestBase, make_therapist, next_monday
+
+
+def legacy_available_slots(therapist, start_date, end_date, now):
+    """
+    The per-slot listing loop TherapistAvailableSlotsView ran before the interval engine, kept as
+    the reference. The one intended difference: unconfigured weekends get no default hours.
+    """
+    default = {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60,
+               'break_start_time': None, 'break_end_time': None}
+    availabilities = {a.day_of_week: a for a in TherapistAvailability.objects.filter(therapist=therapist)}
+
+    unavailable = defaultdict(list)
+    sessions = Session.objects.filter(therapist=therapist, session_date__range=[start_date, end_date])
+    for session in sessions.values('session_date', 'session_time', 'duration_minutes'):
+        start = timezone.make_aware(datetime.combine(session['session_date'], session['session_time']))
+        unavailable[session['session_date']].append((start, start + timedelta(minutes=session['duration_minutes'])))
+    requests = SessionRequest.objects.filter(
+        therapist=therapist, status__in=['pending', 'accepted'], is_paid=True,
+        requested_date__range=[start_date, end_date],
+    )
+    for request in requests.values('requested_date', 'requested_time', 'session_duration'):
+        start = timezone.make_aware(datetime.combine(request['requested_date'], request['requested_time']))
+        unavailable[request['requested_date']].append((start, start + timedelta(minutes=request['session_duration'])))
+
+    result = {}
+    day = start_date
+    while day <= end_date:
+        name = day.strftime('%A')
+        if name in availabilities:
+            a = availabilities[name]
+            window = {'start_time': a.start_time, 'end_time': a.end_time, 'slot_duration': a.slot_duration,
+                      'break_start_time': a.break_start_time, 'break_end_time': a.break_end_time}
+        elif day.weekday() < 5:
+            window = default
+        else:
+            day += timedelta(days=1)
+            continue
+
+        duration = timedelta(minutes=window['slot_duration'] or 60)
+        working_end = timezone.make_aware(datetime.combine(day, window['end_time']))
+        slot_start = timezone.make_aware(datetime.combine(day, window['start_time']))
+        slots = []
+        while slot_start + duration <= working_end:
+            slot_end = slot_start + duration
+            blocked = False
+            if window['break_start_time'] and window['break_end_time']:
+                break_start = timezone.make_aware(datetime.combine(day, window['break_start_time']))
+                break_end = timezone.make_aware(datetime.combine(day, window['break_end_time']))
+                blocked = not (slot_end <= break_start or slot_start >= break_end)
+            if not blocked:
+                blocked = any(not (slot_end <= busy_start or slot_start >= busy_end)
+                              for busy_start, busy_end in unavailable[day])
+            if not blocked and slot_start > now:
+                slots.append({"start_time": slot_start.strftime('%H:%M'), "end_time": slot_end.strftime('%H:%M'),
+                              "duration_minutes": window['slot_duration'] or 60})
+            slot_start = slot_end
+        if slots:
+            result[day.isoformat()] = slots
+        day += timedelta(days=1)
+    return result
+
+
+class SlotEngineParityTests(APITestBase):
+    def test_matches_legacy_listing(self):
+        rng = random.Random(7)
+        start_date = next_monday()
+        end_date = start_date + timedelta(days=20)
+        for index in range(4):
+            therapist = make_therapist(f'therapist{index}@example.com')
+            for day_name in rng.sample(['Monday', 'Tuesday', 'Thursday', 'Saturday', 'Sunday'], 3):
+                has_break = rng.random() < 0.5
+                TherapistAvailability.objects.create(
+                    therapist=therapist, day_of_week=day_name,
+                    start_time=time(rng.choice([7, 8, 9]), rng.choice([0, 30])), end_time=time(rng.choice([15, 17, 19])),
+                    break_start_time=time(12) if has_break else None, break_end_time=time(13, 15) if has_break else None,
+                    slot_duration=rng.choice([30, 45, 60, 90]),
+                )
+            for booking in range(25):
+                day = start_date + timedelta(days=rng.randrange(21))
+                at = time(rng.randrange(7, 18), rng.choice([0, 15, 30, 45]))
+                duration = rng.choice([30, 60, 90, 120])
+                request = SessionRequest.objects.create(
+                    client=self.client_user, therapist=therapist, requested_date=day, requested_time=at,
+                    session_duration=duration, is_paid=rng.random() < 0.6,
+                    status=rng.choice(['pending', 'accepted', 'rejected', 'cancelled']),
+                )
+                if rng.random() < 0.3:
+                    Session.objects.create(session_request=request, client=self.client_user, therapist=therapist,
+                                           session_date=day, session_time=at, duration_minutes=duration)
+
+            now = timezone.localtime()
+            expected = legacy_available_slots(therapist, start_date, end_date, now)
+            self.assertEqual(TherapistSchedule.load(therapist, start_date, end_date).available_slots(now), expected)
+
+            response = self.api.get(f'/api/therapists/{therapist.id}/available-slots/',
+                                    {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['slots'], expected)
+
+
+class BatchAvailableSlotsTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.monday = next_monday()
+        self.range = {'start_date': self.monday.isoformat(), 'end_date': (self.monday + timedelta(days=6)).isoformat()}
+        self.therapists = [make_therapist(f'therapist{index}@example.com') for index in range(6)]
+        for therapist in self.therapists[::2]:
+            TherapistAvailability.objects.create(therapist=therapist, day_of_week='Saturday',
+                                                 start_time=time(10), end_time=time(12), slot_duration=30)
+
+    def batch(self, therapists, **params):
+        ids = ','.join(str(therapist.id) for therapist in therapists)
+        return self.api.get('/api/therapists/available-slots/', {'therapist_ids': ids, **self.range, **params})
+
+    def test_matches_the_single_therapist_endpoint(self):
+        response = self.batch(self.therapists)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data), [str(therapist.id) for therapist in self.therapists])
+        for therapist in self.therapists:
+            single = self.api.get(f'/api/therapists/{therapist.id}/available-slots/', self.range)
+            self.assertEqual(response.data[str(therapist.id)], single.data['slots'])
+
+    def test_query_count_does_not_grow_with_the_number_of_therapists(self):
+        with CaptureQueriesContext(connection) as few:
+            self.batch(self.therapists[:2])
+        cache.clear()
+        slot_cache.clear()
+        TherapistSlotCalendar.objects.all().delete()
+        with CaptureQueriesContext(connection) as many:
+            self.batch(self.therapists)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_unverified_and_unknown_ids_are_left_out(self):
+        unverified = make_therapist('unverified@example.com', is_verified=False)
+        response = self.api.get('/api/therapists/available-slots/',
+                                {'therapist_ids': f'{self.therapists[0].id},{unverified.id},999999', **self.range})
+        self.assertEqual(list(response.data), [str(self.therapists[0].id)])
+
+    def test_rejects_bad_ids_and_ranges(self):
+        self.assertEqual(self.api.get('/api/therapists/available-slots/', self.range).status_code, 400)
+        self.assertEqual(self.batch([], therapist_ids='1,x').status_code, 400)
+        too_long = {'end_date': (self.monday + timedelta(days=400)).isoformat()}
+        self.assertEqual(self.batch(self.therapists, **too_long).status_code, 400)
+
+
+class SlotCalendarMaintenanceTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.monday = next_monday()
+        self.tuesday = self.monday + timedelta(days=1)
+        self.therapist = make_therapist('therapist@example.com')
+        load_slot_calendar([self.therapist.id], [self.monday, self.tuesday])
+
+    def free_starts(self, day):
+        row = TherapistSlotCalendar.objects.get(therapist=self.therapist, date=day)
+        return {start for start, _ in row.free_intervals}
+
+    def book(self, day, at, **fields):
+        with self.committed():
+            return SessionRequest.objects.create(
+                client=self.client_user, therapist=self.therapist, requested_date=day, requested_time=at,
+                session_duration=60, is_paid=True, **fields,
+            )
+
+    def test_booking_created(self):
+        self.assertIn(600, self.free_starts(self.monday))
+        self.book(self.monday, time(10))
+        self.assertNotIn(600, self.free_starts(self.monday))
+
+    def test_booking_moved(self):
+        request = self.book(self.monday, time(10))
+        request.requested_date, request.requested_time = self.tuesday, time(11)
+        with self.committed():
+            request.save()
+        self.assertIn(600, self.free_starts(self.monday))
+        self.assertNotIn(660, self.free_starts(self.tuesday))
+
+    def test_booking_cancelled(self):
+        request = self.book(self.monday, time(10))
+        request.status = 'cancelled'
+        with self.committed():
+            request.save()
+        self.assertIn(600, self.free_starts(self.monday))
+
+    def test_availability_edited(self):
+        with self.committed():
+            availability = TherapistAvailability.objects.create(
+                therapist=self.therapist, day_of_week='Monday', start_time=time(13), end_time=time(15), slot_duration=60,
+            )
+        self.assertEqual(self.free_starts(self.monday), {780, 840})
+        availability.day_of_week = 'Tuesday'
+        with self.committed():
+            availability.save()
+        self.assertIn(600, self.free_starts(self.monday))
+        self.assertEqual(self.free_starts(self.tuesday), {780, 840})
+
+    def test_stale_read_fill_does_not_replace_the_writers_row(self):
+        TherapistSlotCalendar.objects.all().delete()
+        before_booking = TherapistSchedule.load_many([self.therapist.id], self.monday, self.monday)
+        self.book(self.monday, time(10))
+        with mock.patch.object(TherapistSchedule, 'load_many', return_value=before_booking):
+            refresh_slot_calendar({self.therapist.id: [self.monday]}, overwrite=False)
+        self.assertNotIn(600, self.free_starts(self.monday))
+
+    def test_rebuild_only_touches_its_date_range(self):
+        TherapistSlotCalendar.objects.filter(date=self.tuesday).update(free_intervals=[])
+        TherapistSlotCalendar.objects.filter(date=self.monday).update(free_intervals=[])
+        rebuild_slot_calendar([self.therapist.id], self.monday, self.monday)
+        self.assertIn(600, self.free_starts(self.monday))
+        self.assertEqual(self.free_starts(self.tuesday), set())
+
+
+class SlotCacheTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.day = next_monday()
+        self.value = ([[540, 600]], 60)
+
+    def test_invalidation_reaches_other_processes(self):
+        worker, other_worker = SlotCache(maxsize=10, ttl=60), SlotCache(maxsize=10, ttl=60)
+        generation = worker.generations([1])[1]
+        worker.set_many(1, generation, {self.day: self.value})
+        self.assertEqual(worker.get_many(1, worker.generations([1])[1], [self.day]), ({self.day: self.value}, []))
+
+        other_worker.invalidate(1)
+        self.assertEqual(worker.get_many(1, worker.generations([1])[1], [self.day]), ({}, [self.day]))
+
+    def test_values_read_before_an_invalidation_are_never_served(self):
+        worker = SlotCache(maxsize=10, ttl=60)
+        generation = worker.generations([1])[1]
+        worker.invalidate(1)
+        worker.set_many(1, generation, {self.day: self.value})
+        self.assertEqual(worker.get_many(1, worker.generations([1])[1], [self.day]), ({}, [self.day]))
+
+
+class EarliestAvailableTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(11)
+        self.monday = next_monday()
+        self.therapists = [make_therapist(f'therapist{index}@example.com') for index in range(8)]
+        for therapist in self.therapists:
+            # Whole days booked out first, then a few single hours, so openings land on different days and times.
+            for offset in range(rng.randrange(5)):
+                self.book(therapist, self.monday + timedelta(days=offset), time(9), 480)
+            for _ in range(rng.randrange(6)):
+                self.book(therapist, self.monday + timedelta(days=rng.randrange(5)), time(rng.randrange(9, 17)), 60)
+
+    def book(self, therapist, day, at, duration):
+        SessionRequest.objects.create(client=self.client_user, therapist=therapist, requested_date=day,
+                                      requested_time=at, session_duration=duration, is_paid=True, status='accepted')
+
+    def brute_force(self, therapists, start_date, end_date, limit, now):
+        openings = []
+        for therapist in therapists:
+            schedule = TherapistSchedule.load(therapist, start_date, end_date)
+            for day in (start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)):
+                slots = schedule.free_slots(day, now)
+                if slots:
+                    openings.append((day, slots[0][0], therapist.id, slots[0][1], schedule.window_for(day).slot_duration))
+                    break
+        return [(therapist_id, day, start, end, duration) for day, start, therapist_id, end, duration in sorted(openings)[:limit]]
+
+    def test_matches_a_full_scan(self):
+        now = timezone.make_aware(datetime.combine(self.monday, time(11)))
+        end_date = self.monday + timedelta(days=13)
+        for limit, chunk_days in [(1, 7), (3, 2), (8, 1), (20, 30)]:
+            with self.subTest(limit=limit, chunk_days=chunk_days):
+                self.assertEqual(
+                    find_earliest_slots([t.id for t in self.therapists], self.monday, end_date, limit, now=now, chunk_days=chunk_days),
+                    self.brute_force(self.therapists, self.monday, end_date, limit, now),
+                )
+
+    def test_endpoint_lists_each_listed_therapist_once(self):
+        make_therapist('unverified@example.com', is_verified=False)
+        response = self.api.get('/api/therapists/earliest-available/', {'limit': 20})
+        self.assertEqual(response.status_code, 200)
+        ids = [row['therapist']['id'] for row in response.data]
+        self.assertEqual(sorted(ids), sorted(t.id for t in self.therapists))
+        self.assertEqual([(row['date'], row['start_time']) for row in response.data],
+                         sorted((row['date'], row['start_time']) for row in response.data))
+        self.assertEqual(len(self.api.get('/api/therapists/earliest-available/', {'limit': 3}).data), 3)
+
+    def test_rejects_bad_limits(self):
+        for params in [{'limit': 'x'}, {'limit': 0}, {'horizon_days': -1}]:
+            self.assertEqual(self.api.get('/api/therapists/earliest-available/', params).status_code, 400)
+
+
+@override_settings(SLOT_LISTING_MAX_DAYS=5)
+class SlotPagingTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = make_therapist('therapist@example.com')
+        self.start_date = next_monday()
+        self.end_date = self.start_date + timedelta(days=12)
+        self.url = f'/api/therapists/{self.therapist.id}/available-slots/'
+        self.range = {'start_date': self.start_date.isoformat(), 'end_date': self.end_date.isoformat()}
+
+    def test_pages_cover_the_range_once(self):
+        slots, cursors, params = {}, [], dict(self.range)
+        while True:
+            response = self.api.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['slots']), 5)
+            self.assertFalse(set(slots) & set(response.data['slots']))
+            slots.update(response.data['slots'])
+            if response.data['next_cursor'] is None:
+                break
+            cursors.append(response.data['next_cursor'])
+            params = {**self.range, 'cursor': response.data['next_cursor']}
+
+        self.assertEqual(cursors, [(self.start_date + timedelta(days=days)).isoformat() for days in (5, 10)])
+        expected = TherapistSchedule.load(self.therapist, self.start_date, self.end_date).available_slots(timezone.localtime())
+        self.assertEqual(slots, expected)
+
+    def test_rejects_bad_cursors(self):
+        self.assertEqual(self.api.get(self.url, {**self.range, 'cursor': 'soon'}).status_code, 400)
+        after_end = (self.end_date + timedelta(days=1)).isoformat()
+        self.assertEqual(self.api.get(self.url, {**self.range, 'cursor': after_end}).status_code, 400)
+
+
+class FreeTherapistFilterTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(5)
+        self.monday = next_monday()
+        self.therapists = [make_therapist(f'therapist{index}@example.com') for index in range(6)]
+        for therapist in self.therapists[:4]:
+            has_break = rng.random() < 0.5
+            TherapistAvailability.objects.create(
+                therapist=therapist, day_of_week='Monday', start_time=time(rng.choice([7, 8, 9]), rng.choice([0, 30])),
+                end_time=time(rng.choice([15, 17, 19])), slot_duration=60,
+                break_start_time=time(12) if has_break else None, break_end_time=time(13, 15) if has_break else None,
+            )
+        for therapist in self.therapists:
+            for _ in range(rng.randrange(4)):
+                SessionRequest.objects.create(
+                    client=self.client_user, therapist=therapist, requested_date=self.monday,
+                    requested_time=time(rng.randrange(8, 18), rng.choice([0, 15, 30, 45])),
+                    session_duration=rng.choice([30, 45, 60, 90]), is_paid=True,
+                )
+
+    def test_matches_slot_checks_on_the_block_grid(self):
+        rng = random.Random(9)
+        ids = [therapist.id for therapist in self.therapists]
+        schedule = TherapistSchedule.load_many(ids, self.monday, self.monday)
+        now = timezone.make_aware(datetime.combine(self.monday - timedelta(days=1), time(12)))
+        for _ in range(40):
+            start = rng.randrange(7 * 4, 19 * 4) * 15
+            duration = rng.choice([15, 30, 60, 120])
+            start_time, end_time = time(start // 60, start % 60), time((start + duration) // 60, (start + duration) % 60)
+            with self.subTest(start=start_time, duration=duration):
+                expected = [therapist_id for therapist_id in ids
+                            if schedule[therapist_id].check_slot(self.monday, start_time, duration).is_available]
+                self.assertEqual(find_free_therapists(ids, self.monday, start_time, end_time, now=now), expected)
+
+    def test_off_grid_ranges_are_widened_to_whole_blocks(self):
+        therapist = make_therapist('grid@example.com')
+        SessionRequest.objects.create(client=self.client_user, therapist=therapist, requested_date=self.monday,
+                                      requested_time=time(10), session_duration=50, is_paid=True)
+        self.assertEqual(find_free_therapists([therapist.id], self.monday, time(10, 50), time(11, 30)), [])
+        self.assertEqual(find_free_therapists([therapist.id], self.monday, time(11), time(11, 30)), [therapist.id])
+
+    def test_directory_filter(self):
+        SessionRequest.objects.create(client=self.client_user, therapist=self.therapists[0], requested_date=self.monday,
+                                      requested_time=time(14, 30), session_duration=30, is_paid=True)
+        params = {'free_on': self.monday.isoformat(), 'free_from': '14:00', 'free_to': '15:00'}
+        response = self.api.get('/api/therapists/', params)
+        self.assertEqual(response.status_code, 200)
+        ids = [therapist.id for therapist in self.therapists]
+        self.assertNotIn(self.therapists[0].id, [row['id'] for row in response.data])
+        self.assertEqual(sorted(row['id'] for row in response.data), find_free_therapists(ids, self.monday, time(14), time(15)))
+
+        self.assertEqual(self.api.get('/api/therapists/', {'free_on': self.monday.isoformat()}).status_code, 400)
+        self.assertEqual(self.api.get('/api/therapists/', {**params, 'free_to': '13:00'}).status_code, 400)
+
+
+class NextFreeSlotTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.therapist = make_therapist('therapist@example.com')
+        refresh_next_free_slots([self.therapist.id])
+        self.therapist.refresh_from_db()
+        self.next_free = timezone.localtime(self.therapist.next_free_slot)
+
+    def book(self, day, at):
+        with self.committed():
+            return SessionRequest.objects.create(client=self.client_user, therapist=self.therapist, requested_date=day,
+                                                 requested_time=at, session_duration=60, is_paid=True)
+
+    def stored(self):
+        return User.objects.values_list('next_free_slot', flat=True).get(id=self.therapist.id)
+
+    def test_bookings_after_the_next_free_slot_leave_it_alone(self):
+        with mock.patch('mental_health_app.scheduling.find_earliest_slots') as search:
+            self.book(self.next_free.date() + timedelta(days=7), self.next_free.time())
+        search.assert_not_called()
+        self.assertEqual(self.stored(), self.therapist.next_free_slot)
+
+    def test_booking_the_next_free_slot_marks_it_stale_until_the_refresh(self):
+        with mock.patch('mental_health_app.scheduling.find_earliest_slots') as search:
+            self.book(self.next_free.date(), self.next_free.time())
+        search.assert_not_called()
+        self.assertIsNone(self.stored())
+
+        call_command('refresh_next_free_slots', stdout=StringIO())
+        self.assertGreater(self.stored(), self.therapist.next_free_slot)
+
+    def test_cancelling_an_earlier_booking_marks_it_stale(self):
+        request = self.book(self.next_free.date(), self.next_free.time())
+        refresh_next_free_slots([self.therapist.id])
+        self.assertGreater(self.stored(), self.therapist.next_free_slot)
+        request.status = 'cancelled'
+        with self.committed():
+            request.save()
+        self.assertIsNone(self.stored())
+
+    def test_availability_changes_mark_it_stale(self):
+        with self.committed():
+            TherapistAvailability.objects.create(therapist=self.therapist, day_of_week='Sunday',
+                                                 start_time=time(10), end_time=time(12), slot_duration=60)
+        self.assertIsNone(self.stored())
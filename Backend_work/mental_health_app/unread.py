@@ -0,0 +1,137 @@
+# File: Backend_work/mental_health_app/unread.py
+"""
+Denormalized unread chat-message counters.
+
+A message is unread for every member of its chat room other than its sender
+until it is marked read, the same rule the unread badge always used; the
+`receiver` column is not consulted. Each user has an UnreadMessageCounter row
+with their total, and a RoomUnreadCounter row per chat room. ChatConsumer
+raises both when it stores a message and lowers them when a member marks
+messages as read. Every change is a single UPDATE with an F() expression, so
+concurrent writers never lose a count. Reading the unread badge is then one
+primary-key lookup, however many messages exist. `manage.py
+recount_unread_messages` rebuilds the counters from ChatMessage.is_read if
+they ever drift.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import ChatMessage, ChatRoom, RoomUnreadCounter, UnreadMessageCounter
+
+
+def _add(model, lookup, delta):
+    """Adds `delta` to the counter row matching `lookup`, creating the row on first increment."""
+    if delta > 0:
+        if not model.objects.filter(**lookup).update(count=F('count') + delta):
+            model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+            model.objects.filter(**lookup).update(count=F('count') + delta)
+    elif delta < 0:
+        model.objects.filter(**lookup).update(count=Greatest(F('count') + delta, 0))
+
+
+def _unread_for(message, members=None):
+    """Ids of the room members a message counts as unread for: everyone in the room but its sender."""
+    if message.chat_room_id is None:
+        return set()
+    if members is None:
+        if ChatMessage.chat_room.is_cached(message):
+            members = (message.chat_room.user1_id, message.chat_room.user2_id)
+        else:
+            members = ChatRoom.objects.values_list('user1_id', 'user2_id').get(pk=message.chat_room_id)
+    return set(members) - {message.sender_id}
+
+
+def _add_for(message, delta, members=None):
+    for user_id in _unread_for(message, members):
+        _add(UnreadMessageCounter, {'user_id': user_id}, delta)
+        _add(RoomUnreadCounter, {'user_id': user_id, 'chat_room_id': message.chat_room_id}, delta)
+
+
+def record_unread_message(message, members=None):
+    """
+    Counts a newly stored message as unread for the other members of its room. Call in the
+    transaction that created it; `members` (the room's two user ids) saves looking the room up.
+    """
+    _add_for(message, 1, members)
+
+
+def forget_unread_message(message):
+    """Reverses record_unread_message() for an unread message that is being deleted."""
+    _add_for(message, -1)
+
+
+def mark_messages_read(user, message_ids):
+    """
+    Marks the messages in `message_ids` that are unread for `user` (in one of their rooms, sent by
+    someone else) as read, and lowers the user's counters by as many. Returns the number marked.
+    """
+    with transaction.atomic():
+        # Locking the rows makes a concurrent call for the same ids wait, then find them already read.
+        unread = list(
+            ChatMessage.objects.select_for_update()
+            .filter(Q(chat_room__user1=user) | Q(chat_room__user2=user), id__in=message_ids, is_read=False)
+            .exclude(sender=user)
+            .values_list('id', 'chat_room_id')
+        )
+        if not unread:
+            return 0
+        ChatMessage.objects.filter(id__in=[message_id for message_id, _ in unread]).update(is_read=True)
+
+        per_room = Counter(room_id for _, room_id in unread)
+        for room_id, read in per_room.items():
+            _add(RoomUnreadCounter, {'user_id': user.pk, 'chat_room_id': room_id}, -read)
+        _add(UnreadMessageCounter, {'user_id': user.pk}, -len(unread))
+    return len(unread)
+
+
+def unread_count(user):
+    return UnreadMessageCounter.objects.filter(pk=user.pk).values_list('count', flat=True).first() or 0
+
+
+def unread_per_room(messages, user_ids=None):
+    """
+    Counts the unread messages in `messages` per (member, room), for both sides of each room.
+    Returns a Counter keyed by (user_id, chat_room_id), limited to `user_ids` when given.
+    """
+    per_room = Counter()
+    for member in ('user1', 'user2'):
+        member_messages = messages.filter(is_read=False).exclude(sender=F(f'chat_room__{member}'))
+        if user_ids is not None:
+            member_messages = member_messages.filter(**{f'chat_room__{member}__in': user_ids})
+        for row in member_messages.values(f'chat_room__{member}', 'chat_room').annotate(unread=Count('id')).order_by():
+            per_room[(row[f'chat_room__{member}'], row['chat_room'])] += row['unread']
+    return per_room
+
+
+def recount_unread(user_ids=None):
+    """
+    Rebuilds the counters from the messages themselves, for the given users or everyone.
+    Returns (users with unread messages, rooms with unread messages).
+    """
+    totals = UnreadMessageCounter.objects.all()
+    rooms = RoomUnreadCounter.objects.all()
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+        rooms = rooms.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        per_room = unread_per_room(ChatMessage.objects.filter(chat_room__isnull=False), user_ids)
+        per_user = Counter()
+        for (user_id, _), unread in per_room.items():
+            per_user[user_id] += unread
+
+        totals.delete()
+        rooms.delete()
+        UnreadMessageCounter.objects.bulk_create(
+            [UnreadMessageCounter(user_id=user_id, count=count) for user_id, count in per_user.items()],
+            batch_size=1000,
+        )
+        RoomUnreadCounter.objects.bulk_create(
+            [RoomUnreadCounter(user_id=user_id, chat_room_id=room_id, count=count)
+             for (user_id, room_id), count in per_room.items()],
+            batch_size=1000,
+        )
+    return len(per_user), len(per_room)
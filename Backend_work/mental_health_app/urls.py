@@ -13,11 +13,14 @@ from .views import (
     SessionDetailUpdateView,
     ClientSessionListView,
     TherapistDetailView,
+    EarliestAvailableTherapistsView,
+    TherapistAutocompleteView,
     PaymentCreateView,
     ClientPaymentStatusView,
     TherapistAvailabilityListCreateView,
     TherapistAvailabilityDetailView,
     TherapistAvailableSlotsView,
+    BatchTherapistAvailableSlotsView,
     MpesaCallbackView,
     AiRecommendationView,
     ChatWithGeminiView,
@@ -26,6 +29,8 @@ from .views import (
     AdminSessionListView,
     AdminJournalEntryListView,
     AdminPaymentListView,
+    AdminSlotCacheStatsView,
+    AdminWebSocketAuthStatsView,
     TherapistChatRoomListView,
     GetChatPartnerDetailView,
     # --- NEW IMPORT ADDED HERE ---
@@ -59,11 +64,15 @@ urlpatterns = [
     path('admin/sessions/', AdminSessionListView.as_view(), name='admin-session-list'),
     path('admin/journal-entries/', AdminJournalEntryListView.as_view(), name='admin-journal-entry-list'),
     path('admin/payments/', AdminPaymentListView.as_view(), name='admin-payment-list'), 
+    path('admin/slot-cache-stats/', AdminSlotCacheStatsView.as_view(), name='admin-slot-cache-stats'),
+    path('admin/websocket-auth-stats/', AdminWebSocketAuthStatsView.as_view(), name='admin-websocket-auth-stats'),
 
 
     # THERAPIST & SESSION RELATED ENDPOINTS
     path('therapists/', TherapistListView.as_view(), name='therapist-list'),
     path('therapists/<int:pk>/', TherapistDetailView.as_view(), name='therapist-detail'),
+    path('therapists/earliest-available/', EarliestAvailableTherapistsView.as_view(), name='therapist-earliest-available'),
+    path('therapists/autocomplete/', TherapistAutocompleteView.as_view(), name='therapist-autocomplete'),
 
     # NEW: Therapist Availability Management (for therapists to set their schedule)
     path('therapists/me/availability/', TherapistAvailabilityListCreateView.as_view(), name='therapist-availability-list-create'),
@@ -72,6 +81,9 @@ urlpatterns = [
     # NEW: Client-facing endpoint to get available slots for a therapist
     path('therapists/<int:therapist_id>/available-slots/', TherapistAvailableSlotsView.as_view(), name='therapist-available-slots'),
 
+    # NEW: Batch available slots for the directory page (one call for many therapists)
+    path('therapists/available-slots/', BatchTherapistAvailableSlotsView.as_view(), name='therapist-available-slots-batch'),
+
     # SESSION REQUESTS (from clients to therapists)
     path('session-requests/', SessionRequestCreateView.as_view(), name='session-request-create'),
     path('therapist/session-requests/', TherapistSessionRequestListView.as_view(), name='therapist-session-requests'),
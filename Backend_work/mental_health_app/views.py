@@ -3,7 +3,7 @@ from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import F, Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
@@ -12,8 +12,8 @@ import requests
 import base64
 from datetime import datetime
 import json
+import logging
 from datetime import time, timedelta
-from collections import defaultdict
 import time as raw_time
 from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
@@ -24,6 +24,18 @@ import google.generativeai as genai
 from googleapiclient.discovery import build # For YouTube Data API
 
 from .models import JournalEntry, SessionRequest, TherapistApplication, User, Session, Payment, TherapistAvailability, ChatMessage, ChatRoom
+from .scheduling import TherapistSchedule, find_earliest_slots, find_free_therapists, format_minutes, lock_therapist_schedule, read_slot_calendar
+from .directory_cache import get_directory_page, get_profile, set_directory_page, set_profile
+from .facets import cached_therapist_facets
+from .autocomplete import autocomplete_index
+from .conditional import ConditionalGetMixin, aggregate_etag_parts
+from .fieldsets import SparseFieldsetViewMixin
+from .geo import filter_near, parse_point
+from .middleware import handshake_stats
+from .search import search_therapists
+from .slot_cache import invalidate_therapist_slots, slot_cache
+from .tags import TAG_SOURCE_FIELDS, requested_tag_slugs
+from .unread import unread_count
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 
@@ -33,6 +45,8 @@ from rest_framework.views import APIView # Import APIView
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer, TherapistSerializer,
     JournalEntrySerializer, JournalListSerializer, SessionRequestSerializer,
@@ -169,13 +183,7 @@ class RegisterView(generics.CreateAPIView):
             user = serializer.save()
 
             # --- MODIFICATION: Calculate unread chat messages on registration (should be 0) ---
-            unread_message_count = ChatMessage.objects.filter(
-                Q(chat_room__user1=user) | Q(chat_room__user2=user)
-            ).exclude(
-                sender=user
-            ).filter(
-                is_read=False
-            ).count()
+            unread_message_count = unread_count(user)
             # -------------------------------------------------------------
             
             refresh = RefreshToken.for_user(user)
@@ -231,14 +239,8 @@ class LoginView(generics.GenericAPIView):
             user = serializer.validated_data['user']
             
             # --- MODIFICATION: Calculate unread chat messages on login ---
-            # Count unread messages in any chat room the user belongs to, where the user is NOT the sender.
-            unread_message_count = ChatMessage.objects.filter(
-                Q(chat_room__user1=user) | Q(chat_room__user2=user)
-            ).exclude(
-                sender=user
-            ).filter(
-                is_read=False
-            ).count()
+            # Read from the denormalized counter (see unread.py) instead of counting messages.
+            unread_message_count = unread_count(user)
             # -------------------------------------------------------------
 
             refresh = RefreshToken.for_user(user)
@@ -283,13 +285,19 @@ class LoginView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class UserView(generics.RetrieveUpdateAPIView):
+class UserView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
 # ... (rest of UserView) ...
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user may come from the authentication cache; reads and saves use the current row.
+        return User.objects.get(pk=self.request.user.pk)
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        # Read from the row, not request.user, which may come from the authentication cache.
+        updated_at = User.objects.filter(pk=request.user.pk).values_list('updated_at', flat=True).first()
+        return None if updated_at is None else (updated_at,)
 
     def get_serializer_context(self):
         return {'request': self.request}
@@ -301,7 +309,7 @@ class UserView(generics.RetrieveUpdateAPIView):
             serializer.save()
 
 # New Admin Views
-class AdminUserListView(generics.ListAPIView):
+class AdminUserListView(SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of AdminUserListView) ...
     serializer_class = UserSerializer  # Using UserSerializer for full user details
     permission_classes = [IsAdminUser]
@@ -309,25 +317,25 @@ class AdminUserListView(generics.ListAPIView):
     def get_serializer_context(self):
         return {'request': self.request}
 
-class AdminSessionListView(generics.ListAPIView):
+class AdminSessionListView(SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of AdminSessionListView) ...
     serializer_class = SessionSerializer
     permission_classes = [IsAdminUser]
-    queryset = Session.objects.all().order_by('-session_date', '-session_time')
+    queryset = Session.objects.all().order_by('-session_date', '-session_time', '-id')
 
-class AdminJournalEntryListView(generics.ListAPIView):
+class AdminJournalEntryListView(SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of AdminJournalEntryListView) ...
     serializer_class = JournalEntrySerializer
     permission_classes = [IsAdminUser]
-    queryset = JournalEntry.objects.all().order_by('-date')
+    queryset = JournalEntry.objects.all().order_by('-date', '-id')
 
 class AdminPaymentListView(generics.ListAPIView):
 # ... (rest of AdminPaymentListView) ...
     serializer_class = PaymentSerializer
     permission_classes = [IsAdminUser]
-    queryset = Payment.objects.all().order_by('-payment_date')
+    queryset = Payment.objects.all().order_by('-payment_date', '-id')
 
-class JournalEntryView(generics.ListCreateAPIView):
+class JournalEntryView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
 # ... (rest of JournalEntryView) ...
     serializer_class = JournalEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -344,7 +352,13 @@ class JournalEntryView(generics.ListCreateAPIView):
         if mood:
             queryset = queryset.filter(mood__iexact=mood)
 
-        return queryset.order_by('-date')
+        return queryset.order_by('-date', '-id')
+
+    def get_serializer_class(self):
+        # ?summary=true lists entries as cards, without the entry text
+        if self.request.method == 'GET' and self.request.query_params.get('summary', '').lower() in ('1', 'true'):
+            return JournalListSerializer
+        return JournalEntrySerializer
 
     def perform_create(self, serializer):
         attachment_file = self.request.FILES.get('attachment_file')
@@ -385,8 +399,9 @@ class TherapistApplicationCreateView(generics.CreateAPIView):
             raise serializers.ValidationError({"detail": "You have already submitted a therapist application."})
         user = self.request.user
         if not user.is_therapist:
+            # Only this column: request.user may be a cached copy whose other fields are stale.
             user.is_therapist = True
-            user.save()
+            user.save(update_fields=['is_therapist'])
 
         application = serializer.save(applicant=self.request.user)
 
@@ -404,7 +419,7 @@ class AdminTherapistApplicationListView(generics.ListAPIView):
     permission_classes = [IsAdminUser]
 
     def get_queryset(self):
-        return TherapistApplication.objects.all().order_by('-submitted_at')
+        return TherapistApplication.objects.all().order_by('-submitted_at', '-id')
 
 class AdminTherapistApplicationDetailView(generics.RetrieveUpdateAPIView):
 # ... (rest of AdminTherapistApplicationDetailView) ...
@@ -449,53 +464,202 @@ class AdminTherapistApplicationDetailView(generics.RetrieveUpdateAPIView):
                 user_applicant.is_available = False
                 user_applicant.save()
 
-class TherapistListView(generics.ListAPIView):
+def apply_therapist_filters(queryset, query_params):
+    """
+    Applies the directory filters (search, specialization/language/modality/client_focus tags,
+    pricing_type, hourly rate range, session_modes, near/radius_km, free_on/free_from/free_to)
+    from the query string. Shared by the directory and the earliest-available search.
+    """
+    search_query = query_params.get('search')
+    if search_query:
+        queryset = search_therapists(queryset, search_query)
+
+    # Tag filters: any of the given tags within a category, all categories at once.
+    for category in TAG_SOURCE_FIELDS:
+        slugs = requested_tag_slugs(query_params, category)
+        if slugs:
+            queryset = queryset.filter(id__in=User.tags.through.objects.filter(
+                tag__category=category, tag__slug__in=slugs
+            ).values('user_id'))
+
+    pricing_type = query_params.get('pricing_type')
+    if pricing_type == 'free':
+        queryset = queryset.filter(is_free_consultation=True)
+    elif pricing_type == 'paid':
+        queryset = queryset.filter(is_free_consultation=False)
+        min_hourly_rate = query_params.get('min_hourly_rate')
+        max_hourly_rate = query_params.get('max_hourly_rate')
+        if min_hourly_rate:
+            queryset = queryset.filter(hourly_rate__gte=float(min_hourly_rate))
+        if max_hourly_rate:
+            queryset = queryset.filter(hourly_rate__lte=float(max_hourly_rate))
+
+    session_mode_filter = query_params.get('session_modes')
+    if session_mode_filter:
+        if session_mode_filter == 'online':
+            queryset = queryset.filter(Q(session_modes='online') | Q(session_modes='both'))
+        elif session_mode_filter == 'physical':
+            queryset = queryset.filter(Q(session_modes='physical') | Q(session_modes='both'))
+        elif session_mode_filter == 'both':
+            queryset = queryset.filter(session_modes='both') # If 'both' is chosen, only show those explicitly marked 'both'
+
+    # --- NEW: In-person therapists within radius_km of near=lat,lng, annotated with distance_km ---
+    near = query_params.get('near')
+    if near:
+        try:
+            lat, lng = parse_point(near)
+        except ValueError:
+            raise serializers.ValidationError({"near": "Use near=lat,lng with valid coordinates."})
+        try:
+            radius_km = float(query_params.get('radius_km', settings.GEO_DEFAULT_RADIUS_KM))
+        except ValueError:
+            raise serializers.ValidationError({"radius_km": "radius_km must be a number."})
+        if not 0 < radius_km <= settings.GEO_MAX_RADIUS_KM:
+            raise serializers.ValidationError(
+                {"radius_km": f"radius_km must be between 0 and {settings.GEO_MAX_RADIUS_KM}."}
+            )
+        queryset = filter_near(queryset.filter(session_modes__in=['physical', 'both']), lat, lng, radius_km)
+
+    # --- NEW: "Book now" filter: therapists free for the whole range on a given day ---
+    free_on = query_params.get('free_on')
+    if free_on:
+        try:
+            day = datetime.strptime(free_on, '%Y-%m-%d').date()
+            free_from = datetime.strptime(query_params.get('free_from', ''), '%H:%M').time()
+            free_to = datetime.strptime(query_params.get('free_to', ''), '%H:%M').time()
+        except ValueError:
+            raise serializers.ValidationError(
+                {"free_on": "Use free_on=YYYY-MM-DD together with free_from=HH:MM and free_to=HH:MM."}
+            )
+        if free_to <= free_from:
+            raise serializers.ValidationError({"free_to": "free_to must be after free_from."})
+        free_ids = find_free_therapists(queryset.values_list('id', flat=True), day, free_from, free_to)
+        queryset = queryset.filter(id__in=free_ids)
+
+    return queryset
+
+
+# --- NEW: ?sort= orders for the directory, each backed by a partial index (migration 0029) ---
+# Booking and availability signals mark next_free_slot stale (NULL, sorted last) and
+# `manage.py refresh_next_free_slots --every` recomputes it.
+DIRECTORY_SORTS = {
+    'price': (F('hourly_rate').asc(nulls_last=True), 'id'),
+    'experience': (F('years_of_experience').desc(nulls_last=True), '-id'),
+    'availability': (F('next_free_slot').asc(nulls_last=True), 'id'),
+}
+
+
+class TherapistListView(SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of TherapistListView) ...
     serializer_class = TherapistSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         queryset = User.objects.filter(is_therapist=True, is_available=True, is_verified=True)
+        sort = self.request.query_params.get('sort')
+        if sort is not None and sort not in DIRECTORY_SORTS:
+            raise serializers.ValidationError({"sort": f"Use one of: {', '.join(DIRECTORY_SORTS)}."})
+        queryset = apply_therapist_filters(queryset, self.request.query_params)
+        if sort:
+            return queryset.order_by(*DIRECTORY_SORTS[sort])
+        if self.request.query_params.get('near'):
+            return queryset.order_by('distance_km', 'id')
+        if self.request.query_params.get('search'):
+            return queryset.order_by('-search_rank', 'last_name', 'first_name', 'id')
+        return queryset.order_by('last_name', 'first_name', 'id')
 
-        search_query = self.request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query)
-            )
+    def get_serializer_context(self):
+        return {'request': self.request}
 
-        specialization_filter = self.request.query_params.get('specialization')
-        if specialization_filter:
-            queryset = queryset.filter(specializations__icontains=specialization_filter)
-
-        pricing_type = self.request.query_params.get('pricing_type')
-        if pricing_type == 'free':
-            queryset = queryset.filter(is_free_consultation=True)
-        elif pricing_type == 'paid':
-            queryset = queryset.filter(is_free_consultation=False)
-            min_hourly_rate = self.request.query_params.get('min_hourly_rate')
-            max_hourly_rate = self.request.query_params.get('max_hourly_rate')
-            if min_hourly_rate:
-                queryset = queryset.filter(hourly_rate__gte=float(min_hourly_rate))
-            if max_hourly_rate:
-                queryset = queryset.filter(hourly_rate__lte=float(max_hourly_rate))
-        
-        session_mode_filter = self.request.query_params.get('session_modes')
-        if session_mode_filter:
-            if session_mode_filter == 'online':
-                queryset = queryset.filter(Q(session_modes='online') | Q(session_modes='both'))
-            elif session_mode_filter == 'physical':
-                queryset = queryset.filter(Q(session_modes='physical') | Q(session_modes='both'))
-            elif session_mode_filter == 'both':
-                queryset = queryset.filter(session_modes='both') # If 'both' is chosen, only show those explicitly marked 'both'
+    # --- NEW: ?facets=true wraps the list as {"results": [...], "facets": {...}} ---
+    # Whole responses are cached per query string under the directory version (see directory_cache.py).
+    def list(self, request, *args, **kwargs):
+        cache_key, cached = get_directory_page(request.query_params)
+        if cached is not None:
+            return Response(cached)
+
+        # Filtered once for both the page and the facets; free_on alone reads every therapist's calendar.
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+        if request.query_params.get('facets', '').lower() in ('1', 'true'):
+            facets = cached_therapist_facets(queryset, request.query_params)
+            if isinstance(response.data, dict):  # Already paginated into {"next", "results"}
+                response.data['facets'] = facets
+            else:
+                response.data = {"results": response.data, "facets": facets}
+        if cache_key:
+            set_directory_page(cache_key, response.data)
+        return response
 
-        return queryset.order_by('last_name', 'first_name')
 
-    def get_serializer_context(self):
-        return {'request': self.request}
+# --- NEW: Earliest Available Therapists View ---
+class EarliestAvailableTherapistsView(APIView):
+    """
+    Returns the K soonest openings across every therapist matching the directory filters:
+    GET /therapists/earliest-available/?specialization=...&session_modes=...&limit=5&horizon_days=14
+    Each therapist appears at most once, with their first free slot.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 5
+    max_limit = 20
 
-class TherapistDetailView(generics.RetrieveAPIView):
+    def get(self, request, *args, **kwargs):
+        max_horizon = getattr(settings, 'EARLIEST_AVAILABLE_HORIZON_DAYS', 30)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            horizon_days = min(int(request.query_params.get('horizon_days', max_horizon)), max_horizon)
+        except ValueError:
+            return Response({"error": "limit and horizon_days must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or horizon_days < 1:
+            return Response({"error": "limit and horizon_days must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = User.objects.filter(is_therapist=True, is_available=True, is_verified=True)
+        queryset = apply_therapist_filters(queryset, request.query_params)
+        therapist_ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+        start_date = timezone.localdate()
+        end_date = start_date + timedelta(days=horizon_days - 1)
+        openings = find_earliest_slots(therapist_ids, start_date, end_date, limit)
+
+        therapists = User.objects.in_bulk([therapist_id for therapist_id, *_ in openings])
+        context = {'request': request}
+        results = []
+        for therapist_id, day, start, end, slot_duration in openings:
+            results.append({
+                "therapist": TherapistSerializer(therapists[therapist_id], context=context).data,
+                "date": day.isoformat(),
+                "start_time": format_minutes(start),
+                "end_time": format_minutes(end),
+                "duration_minutes": slot_duration,
+            })
+        return Response(results, status=status.HTTP_200_OK)
+
+# --- NEW: Search box autocomplete ---
+class TherapistAutocompleteView(APIView):
+    """
+    Name and specialization suggestions for the directory search box:
+    GET /therapists/autocomplete/?q=anx&limit=8
+    Served from the in-process prefix index in autocomplete.py, without a database query.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 8
+    max_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+        suggestions = autocomplete_index.suggest(request.query_params.get('q', ''), limit)
+        return Response(suggestions, status=status.HTTP_200_OK)
+
+class TherapistDetailView(ConditionalGetMixin, SparseFieldsetViewMixin, generics.RetrieveAPIView):
 # ... (rest of TherapistDetailView) ...
     serializer_class = TherapistSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -503,112 +667,31 @@ class TherapistDetailView(generics.RetrieveAPIView):
     def get_serializer_context(self):
         return {'request': self.request}
 
+    def get_etag_parts(self, request, *args, **kwargs):
+        updated_at = self.queryset.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        return None if updated_at is None else (updated_at,)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Only the full, parameterless profile is cached; ?fields=/?omit= responses are built fresh.
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        therapist_id = self.kwargs['pk']
+        cached = get_profile(therapist_id)
+        if cached is not None:
+            return Response(cached)
+        response = super().retrieve(request, *args, **kwargs)
+        set_profile(therapist_id, response.data)
+        return response
+
 class SessionRequestCreateView(generics.CreateAPIView):
 # ... (rest of SessionRequestCreateView) ...
     serializer_class = SessionRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def _is_slot_available(self, therapist, requested_date, requested_time, session_duration_minutes):
-        day_of_week = requested_date.strftime('%A')
-        availability = TherapistAvailability.objects.filter(
-            therapist=therapist, day_of_week=day_of_week
-        ).first()
-
-        scheduled_sessions_on_date = Session.objects.none()
-        paid_pending_requests_on_date = SessionRequest.objects.none()
-
-        if not availability:
-            print(f"DEBUG: Slot check - No specific availability found for {day_of_week}. Using default.")
-            default_start_time = time(9, 0)
-            default_end_time = time(17, 0)
-            default_slot_duration = 60
-
-            class DefaultAvailability:
-                def __init__(self, start, end, duration):
-                    self.start_time = start
-                    self.end_time = end
-                    self.slot_duration = duration
-                    self.break_start_time = None
-                    self.break_end_time = None
-            availability = DefaultAvailability(default_start_time, default_end_time, default_slot_duration)
-
-            if day_of_week in ['Saturday', 'Sunday']:
-                print(f"DEBUG: Slot check - Default availability for weekend day {day_of_week} is not allowed.")
-                return False, "Therapist is not available on weekends by default."
-
-
-        slot_start_dt = timezone.make_aware(datetime.combine(requested_date, requested_time))
-        slot_end_dt = slot_start_dt + timedelta(minutes=session_duration_minutes)
-        working_start_dt = timezone.make_aware(datetime.combine(requested_date, availability.start_time))
-        working_end_dt = timezone.make_aware(datetime.combine(requested_date, availability.end_time))
-
-        if not (working_start_dt <= slot_start_dt and slot_end_dt <= working_end_dt):
-            print(f"DEBUG: Slot check - Slot {slot_start_dt.time()}-{slot_end_dt.time()} outside working hours {working_start_dt.time()}-{working_end_dt.time()}")
-            return False, "Requested slot is outside therapist's working hours."
-
-        if availability.break_start_time and availability.break_end_time:
-            break_start_dt = timezone.make_aware(datetime.combine(requested_date, availability.break_start_time))
-            break_end_dt = timezone.make_aware(datetime.combine(requested_date, availability.break_end_time))
-            if not (slot_end_dt <= break_start_dt or slot_start_dt >= break_end_dt):
-                print(f"DEBUG: Slot check - Slot {slot_start_dt.time()}-{slot_end_dt.time()} overlaps with break {break_start_dt.time()}-{break_end_dt.time()}")
-                return False, "Requested slot overlaps with therapist's break."
-
-        scheduled_sessions_on_date = Session.objects.filter(
-            therapist=therapist,
-            session_date=requested_date
-        ).values('session_date', 'session_time', 'duration_minutes')
-
-        paid_pending_requests_on_date = SessionRequest.objects.filter(
-            therapist=therapist,
-            status__in=['pending', 'accepted'],
-            is_paid=True,
-            requested_date=requested_date
-        ).values('requested_date', 'requested_time', 'session_duration')
-
-        for session in scheduled_sessions_on_date: # FIX: Change 'scheduled_sessions' to 'scheduled_sessions_on_date'
-            session_date_obj = session['session_date']
-            # Ensure session_date_obj is a date object, converting if it's a string
-            if isinstance(session_date_obj, str):
-                try:
-                    session_date_obj = datetime.strptime(session_date_obj, '%Y-%m-%d').date()
-                except ValueError:
-                    print(f"WARNING: Could not parse session_date '{session_date_obj}'. Skipping session.")
-                    continue # Skip this session if date format is unexpected
-
-            booked_start_time = session['session_time']
-            booked_duration = session.get('duration_minutes', 120)
-            booked_start_dt = timezone.make_aware(datetime.combine(session_date_obj, booked_start_time))
-            booked_end_dt = booked_start_dt + timedelta(minutes=booked_duration)
-            if not (slot_end_dt <= booked_start_dt or slot_start_dt >= booked_end_dt):
-                print(f"DEBUG: Slot check - Slot {slot_start_dt.time()}-{slot_end_dt.time()} conflicts with scheduled session {booked_start_dt.time()}-{booked_end_dt.time()}")
-                return False, "Requested slot is already booked."
-
-        for req in paid_pending_requests_on_date: # FIX: Change 'paid_pending_requests' to 'paid_pending_requests_on_date'
-            req_date_obj = req['requested_date']
-            # Ensure req_date_obj is a date object, converting if it's a string
-            if isinstance(req_date_obj, str):
-                try:
-                    req_date_obj = datetime.strptime(req_date_obj, '%Y-%m-%d').date()
-                except ValueError:
-                    print(f"WARNING: Could not parse requested_date '{req_date_obj}'. Skipping request.")
-                    continue # Skip this request if date format is unexpected
-
-            booked_start_time = req['requested_time']
-            booked_duration = req.get('session_duration', 120)
-            booked_start_dt = timezone.make_aware(datetime.combine(req_date_obj, booked_start_time))
-            booked_end_dt = booked_start_dt + timedelta(minutes=booked_duration)
-
-            if not (slot_end_dt <= booked_start_dt or slot_start_dt >= booked_end_dt):
-                print(f"DEBUG: Slot check - Slot {slot_start_dt.time()}-{slot_end_dt.time()} conflicts with paid pending request {booked_start_dt.time()}-{booked_end_dt.time()}")
-                return False, "Requested slot is currently pending payment confirmation for another user."
-
-
-        if slot_start_dt <= timezone.now():
-            print(f"DEBUG: Slot check - Slot {slot_start_dt} is in the past compared to {timezone.now()}") # Corrected variable name here
-            return False, "Cannot book a session in the past or current time."
-
-        print(f"DEBUG: Slot check - Slot {slot_start_dt.time()}-{slot_end_dt.time()} is AVAILABLE.")
-        return True, "Slot is available."
+        # Same schedule indexes as TherapistAvailableSlotsView, so listing and booking can't disagree.
+        schedule = TherapistSchedule.load(therapist, requested_date, requested_date)
+        return schedule.check_slot(requested_date, requested_time, session_duration_minutes)
 
 
     def create(self, request, *args, **kwargs):
@@ -636,55 +719,61 @@ class SessionRequestCreateView(generics.CreateAPIView):
                 {"therapist": "You cannot request a session with yourself."}
             )
 
-        is_available, availability_message = self._is_slot_available(therapist, requested_date, requested_time, session_duration)
-        if not is_available:
-            return Response({"detail": availability_message}, status=status.HTTP_400_BAD_REQUEST)
-
-        existing_request = SessionRequest.objects.filter(
-            client=self.request.user,
-            status__in=['pending', 'accepted']
-        ).exists()
-
-        existing_session = Session.objects.filter(
-            client=self.request.user,
-            status='scheduled'
-        ).exists()
+        # The slot check and the insert run under a lock on this therapist's row, so two clients
+        # can't both take the same slot, while bookings for other therapists proceed in parallel.
+        with transaction.atomic():
+            lock_therapist_schedule(therapist.id)
+
+            slot_check = self._is_slot_available(therapist, requested_date, requested_time, session_duration)
+            if not slot_check.is_available:
+                # A clash with another booking is a conflict; anything else is a bad request.
+                return Response(
+                    {"detail": slot_check.message},
+                    status=status.HTTP_409_CONFLICT if slot_check.is_conflict else status.HTTP_400_BAD_REQUEST
+                )
+
+            existing_request = SessionRequest.objects.filter(
+                client=self.request.user,
+                status__in=['pending', 'accepted']
+            ).exists()
 
-        if existing_request:
-            requests_found = SessionRequest.objects.filter(client=self.request.user, status__in=['pending', 'accepted'])
-            print(f"DEBUG: SessionRequestCreateView - Actual pending/accepted requests: {[f'ID: {r.id}, Status: {r.status}, Date: {r.requested_date}' for r in requests_found]}")
+            existing_session = Session.objects.filter(
+                client=self.request.user,
+                status='scheduled'
+            ).exists()
 
-        if existing_session:
-            sessions_found = Session.objects.filter(client=self.request.user, status='scheduled')
-            print(f"DEBUG: SessionRequestCreateView - Actual scheduled sessions: {[f'ID: {s.id}, Status: {s.status}, Date: {s.session_date}' for s in sessions_found]}")
+            if existing_request or existing_session:
+                logger.debug(
+                    "Session request by user %s refused: pending/accepted request=%s, scheduled session=%s",
+                    self.request.user.id, existing_request, existing_session
+                )
+                return Response(
+                    {"detail": "You already have a pending request or an active scheduled session. Please complete it before requesting a new one."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            serializer = self.get_serializer(data={
+                'therapist': therapist_id,
+                'requested_date': requested_date_str,
+                'requested_time': requested_time_str,
+                'message': request.data.get('message'),
+                'session_duration': session_duration
+            })
+            serializer.is_valid(raise_exception=True)
 
+            # --- MODIFICATION START ---
+            # Set is_paid to True if it's a free consultation
+            is_paid_status_for_request = therapist.is_free_consultation
 
-        if existing_request or existing_session:
-            return Response(
-                {"detail": "You already have a pending request or an active scheduled session. Please complete it before requesting a new one."},
-                status=status.HTTP_400_BAD_REQUEST
+            session_request_instance = serializer.save(
+                client=self.request.user,
+                therapist=therapist,
+                is_paid=is_paid_status_for_request, # is_paid=True if free consultation, else False
+                status='pending' # Always pending initially
             )
+            # --- MODIFICATION END ---
 
-        serializer = self.get_serializer(data={
-            'therapist': therapist_id,
-            'requested_date': requested_date_str,
-            'requested_time': requested_time_str,
-            'message': request.data.get('message'),
-            'session_duration': session_duration
-        })
-        serializer.is_valid(raise_exception=True)
-
-        # --- MODIFICATION START ---
-        # Set is_paid to True if it's a free consultation
-        is_paid_status_for_request = therapist.is_free_consultation
-
-        session_request_instance = serializer.save(
-            client=self.request.user,
-            therapist=therapist,
-            is_paid=is_paid_status_for_request, # is_paid=True if free consultation, else False
-            status='pending' # Always pending initially
-        )
-        # --- MODIFICATION END ---
+        invalidate_therapist_slots(therapist.id)
 
         return Response({
             "message": "Session request created successfully. Proceed to payment to confirm your booking." if not is_paid_status_for_request else "Session request submitted for free consultation. Therapist will review.",
@@ -744,6 +833,7 @@ class TherapistSessionCreateView(generics.CreateAPIView):
         # Set session request status to accepted
         session_request.status = 'accepted'
         session_request.save()
+        invalidate_therapist_slots(session_request.therapist_id)
 
         session_data = {
             'session_request': session_request.id,
@@ -792,7 +882,7 @@ class TherapistSessionRequestListView(generics.ListAPIView):
             queryset = queryset.filter(status='pending')
         # --- MODIFICATION END ---
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 class ClientSessionRequestListView(generics.ListAPIView):
 # ... (rest of ClientSessionRequestListView) ...
@@ -813,7 +903,7 @@ class ClientSessionRequestListView(generics.ListAPIView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 class SessionRequestDetailView(generics.RetrieveAPIView):
 # ... (rest of SessionRequestDetailView) ...
@@ -847,7 +937,11 @@ class SessionRequestUpdateView(generics.RetrieveUpdateDestroyAPIView):
                 "You can only cancel pending requests that you have created."
             )
 
-class TherapistSessionListView(generics.ListAPIView):
+# Every row SessionSerializer reads from, so names and payment flags also refresh the ETag.
+SESSION_ETAG_TIMESTAMPS = ['updated_at', 'client__updated_at', 'therapist__updated_at', 'session_request__updated_at']
+
+
+class TherapistSessionListView(ConditionalGetMixin, SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of TherapistSessionListView) ...
     serializer_class = SessionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -864,7 +958,10 @@ class TherapistSessionListView(generics.ListAPIView):
             queryset = queryset.filter(status=status_filter)
 
         # Order the results
-        return queryset.order_by('-session_date', '-session_time')
+        return queryset.order_by('-session_date', '-session_time', '-id')
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        return aggregate_etag_parts(self.get_queryset(), *SESSION_ETAG_TIMESTAMPS)
 
 class SessionDetailUpdateView(generics.UpdateAPIView):
 # ... (rest of SessionDetailUpdateView) ...
@@ -906,7 +1003,7 @@ class SessionDetailUpdateView(generics.UpdateAPIView):
 
         return Response(serializer.data)
 
-class ClientSessionListView(generics.ListAPIView):
+class ClientSessionListView(ConditionalGetMixin, SparseFieldsetViewMixin, generics.ListAPIView):
 # ... (rest of ClientSessionListView) ...
     serializer_class = SessionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -918,7 +1015,10 @@ class ClientSessionListView(generics.ListAPIView):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
-        return queryset.order_by('-session_date', '-session_time')
+        return queryset.order_by('-session_date', '-session_time', '-id')
+
+    def get_etag_parts(self, request, *args, **kwargs):
+        return aggregate_etag_parts(self.get_queryset(), *SESSION_ETAG_TIMESTAMPS)
 
 class PaymentCreateView(generics.CreateAPIView):
 # ... (rest of PaymentCreateView) ...
@@ -957,6 +1057,26 @@ class PaymentCreateView(generics.CreateAPIView):
         if Payment.objects.filter(session_request=session_request_obj).exists():
             return Response({"error": "A payment for this session request has already been initiated or completed."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # A paid request holds its slot, so re-check the slot and flip is_paid under the therapist lock
+        # before contacting M-Pesa. Two clients paying for the same slot can't both end up holding it.
+        with transaction.atomic():
+            lock_therapist_schedule(therapist.id)
+            if session_request_obj.requested_date and session_request_obj.requested_time:
+                schedule = TherapistSchedule.load(therapist, session_request_obj.requested_date, session_request_obj.requested_date)
+                slot_check = schedule.check_slot(
+                    session_request_obj.requested_date,
+                    session_request_obj.requested_time,
+                    session_request_obj.session_duration
+                )
+                if not slot_check.is_available:
+                    return Response(
+                        {"error": slot_check.message},
+                        status=status.HTTP_409_CONFLICT if slot_check.is_conflict else status.HTTP_400_BAD_REQUEST
+                    )
+            session_request_obj.is_paid = True
+            session_request_obj.save()
+        invalidate_therapist_slots(therapist.id)
+
         callback_url = f"{settings.MPESA_STK_CALLBACK_URL}"
         account_reference = f"TherapySession_{request.user.id}_{therapist.id}_{session_request_obj.id}_{timezone.now().timestamp()}"
         transaction_desc = f"Payment for session request {session_request_obj.id} with {therapist.first_name} {therapist.last_name}"
@@ -970,14 +1090,10 @@ class PaymentCreateView(generics.CreateAPIView):
         )
 
         if stk_response["success"]:
-            # --- MODIFICATION START ---
-            # Mark the session request as paid immediately upon successful STK push initiation
+            # The session request was already marked as paid when the slot was reserved above.
             # This is correct if is_paid means "payment handled/not required".
             # The actual payment status is in the Payment model.
-            session_request_obj.is_paid = True
-            session_request_obj.save()
-            print(f"DEBUG: SessionRequest {session_request_obj.id} marked as paid upon STK Push initiation (meaning payment is now being handled/is not required).")
-            # --- MODIFICATION END ---
+            logger.debug("SessionRequest %s marked as paid upon STK Push initiation.", session_request_obj.id)
 
             payment_data = {
                 'client': self.request.user.id,
@@ -989,12 +1105,22 @@ class PaymentCreateView(generics.CreateAPIView):
                 'session_request': session_request_obj.id
             }
             serializer = self.get_serializer(data=payment_data)
-            serializer.is_valid(raise_exception=True)
-
-            with transaction.atomic():
-                payment_instance = serializer.save()
-                print(f"DEBUG: Payment record created/updated. ID: {payment_instance.id}, CheckoutRequestID: {payment_instance.checkout_request_id}, Status: {payment_instance.status}")
-
+            try:
+                serializer.is_valid(raise_exception=True)
+                with transaction.atomic():
+                    payment_instance = serializer.save()
+            except Exception:
+                # Without a Payment row the callback can't confirm this request, so it must not keep the slot.
+                logger.exception(
+                    "Could not record the payment for SessionRequest %s (CheckoutRequestID %s).",
+                    session_request_obj.id, stk_response.get('checkout_request_id')
+                )
+                self._release_slot(session_request_obj)
+                raise
+            logger.debug(
+                "Payment record created. ID: %s, CheckoutRequestID: %s, Status: %s",
+                payment_instance.id, payment_instance.checkout_request_id, payment_instance.status
+            )
 
             return Response({
                 "message": "M-Pesa STK Push initiated. Please check your phone to complete the payment.",
@@ -1003,13 +1129,17 @@ class PaymentCreateView(generics.CreateAPIView):
             }, status=status.HTTP_200_OK)
         else:
             # If STK push initiation fails, the session_request.is_paid should revert
-            if session_request_obj.is_paid:
-                session_request_obj.is_paid = False
-                session_request_obj.save()
-                print(f"DEBUG: SessionRequest {session_request_obj.id} reverted to unpaid due to STK Push failure.")
-
+            self._release_slot(session_request_obj)
             return Response({"error": stk_response["message"]}, status=status.HTTP_400_BAD_REQUEST)
 
+    def _release_slot(self, session_request_obj):
+        """Reverts the request to unpaid so it stops holding its slot."""
+        if session_request_obj.is_paid:
+            session_request_obj.is_paid = False
+            session_request_obj.save()
+            invalidate_therapist_slots(session_request_obj.therapist_id)
+            logger.debug("SessionRequest %s reverted to unpaid.", session_request_obj.id)
+
 class ClientPaymentStatusView(generics.RetrieveAPIView):
 # ... (rest of ClientPaymentStatusView) ...
     permission_classes = [permissions.IsAuthenticated]
@@ -1116,6 +1246,7 @@ def MpesaCallbackView(request):
             if payment.session_request:
                 payment.session_request.is_paid = True # Redundant but safe
                 payment.session_request.save()
+                invalidate_therapist_slots(payment.session_request.therapist_id)
                 print(f"INFO: SessionRequest {payment.session_request.id} marked as paid.")
 
             return Response({"message": "Payment successful and updated."}, status=status.HTTP_200_OK)
@@ -1130,6 +1261,7 @@ def MpesaCallbackView(request):
                 payment.session_request.is_paid = False # Set back to False
                 payment.session_request.status = 'cancelled' # Cancel session request on payment failure
                 payment.session_request.save()
+                invalidate_therapist_slots(payment.session_request.therapist_id)
                 print(f"INFO: SessionRequest {payment.session_request.id} cancelled due to payment failure.")
 
             return Response({"message": "Payment failed or cancelled."}, status=status.HTTP_200_OK) # Still 200 OK for M-Pesa to stop retrying
@@ -1161,6 +1293,7 @@ class TherapistAvailabilityListCreateView(generics.ListCreateAPIView):
             raise serializers.ValidationError({"detail": f"Availability for {day_of_week} already exists."})
 
         serializer.save(therapist=self.request.user)
+        invalidate_therapist_slots(self.request.user.id)
 
 class TherapistAvailabilityDetailView(generics.RetrieveUpdateDestroyAPIView):
 # ... (rest of TherapistAvailabilityDetailView) ...
@@ -1176,180 +1309,130 @@ class TherapistAvailabilityDetailView(generics.RetrieveUpdateDestroyAPIView):
         if not self.request.user.is_therapist:
             raise PermissionDenied("Only therapists can update availability.")
         serializer.save()
+        invalidate_therapist_slots(self.request.user.id)
 
     def perform_destroy(self, instance):
         if not self.request.user.is_therapist:
             raise PermissionDenied("Only therapists can delete availability.")
         instance.delete()
+        invalidate_therapist_slots(self.request.user.id)
+
+def parse_slot_date_range(request):
+    """
+    Reads start_date/end_date query params for the available-slots endpoints.
+    Returns (start_date, end_date, None) or (None, None, error_response).
+    Past start dates are clamped to today.
+    """
+    start_date_str = request.query_params.get('start_date')
+    end_date_str = request.query_params.get('end_date')
+
+    if not start_date_str or not end_date_str:
+        return None, None, Response({"error": "start_date and end_date query parameters are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return None, None, Response({"error": "Invalid date format. Use '%Y-%m-%d'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start_date > end_date:
+        return None, None, Response({"error": "start_date cannot be after end_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.localdate()
+    if start_date < today:
+        start_date = today
+
+    return start_date, end_date, None
+
 
 class TherapistAvailableSlotsView(generics.GenericAPIView):
 # ... (rest of TherapistAvailableSlotsView) ...
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, therapist_id, *args, **kwargs):
-        print(f"DEBUG: TherapistAvailableSlotsView - Request received for therapist {therapist_id}")
         try:
             therapist = User.objects.get(id=therapist_id, is_therapist=True, is_verified=True)
-            print(f"DEBUG: TherapistAvailableSlotsView - Found therapist: {therapist.email}")
         except User.DoesNotExist:
-            print(f"DEBUG: TherapistAvailableSlotsView - Therapist {therapist_id} not found or not verified.")
             return Response({"error": "Therapist not found or not verified."}, status=status.HTTP_404_NOT_FOUND)
 
-        start_date_str = request.query_params.get('start_date')
-        end_date_str = request.query_params.get('end_date')
+        start_date, end_date, error_response = parse_slot_date_range(request)
+        if error_response:
+            return error_response
+
+        # Day cursor: the first date of the next page, as returned in `next_cursor`.
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                cursor_date = datetime.strptime(cursor, '%Y-%m-%d').date()
+            except ValueError:
+                return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+            if cursor_date > end_date:
+                return Response({"error": "cursor is after end_date."}, status=status.HTTP_400_BAD_REQUEST)
+            start_date = max(start_date, cursor_date)
+
+        # Each response covers at most SLOT_LISTING_MAX_DAYS days; longer ranges are paged.
+        page_end = min(end_date, start_date + timedelta(days=settings.SLOT_LISTING_MAX_DAYS - 1))
+        next_cursor = (page_end + timedelta(days=1)).isoformat() if page_end < end_date else None
+
+        # Range read from the materialized calendar; missing days are computed and stored on the way.
+        available_slots = read_slot_calendar([therapist.id], start_date, page_end)[therapist.id]
+        return Response({"slots": available_slots, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
 
-        if not start_date_str or not end_date_str:
-            print("DEBUG: TherapistAvailableSlotsView - Missing start_date or end_date query parameters.")
-            return Response({"error": "start_date and end_date query parameters are required."}, status=status.HTTP_400_BAD_REQUEST)
 
+# --- NEW: Slot cache effectiveness (admin only) ---
+class AdminSlotCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(slot_cache.stats(), status=status.HTTP_200_OK)
+
+
+# --- NEW: WebSocket handshake auth counters (per worker process) ---
+class AdminWebSocketAuthStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(handshake_stats.stats(), status=status.HTTP_200_OK)
+
+
+# --- NEW: Batch Available Slots View (for the therapist directory) ---
+class BatchTherapistAvailableSlotsView(generics.GenericAPIView):
+    """
+    Returns free slots for many therapists in one call:
+    GET /therapists/available-slots/?therapist_ids=1,2,3&start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    Response is {therapist_id: {date: [slots]}}. The query count does not grow with the number of ids.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_therapists = 50
+
+    def get(self, request, *args, **kwargs):
+        raw_ids = request.query_params.get('therapist_ids', '')
         try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            print(f"DEBUG: TherapistAvailableSlotsView - Date range: {start_date} to {end_date}")
+            therapist_ids = list(dict.fromkeys(int(value) for value in raw_ids.split(',') if value.strip()))
         except ValueError:
-            print(f"DEBUG: TherapistAvailableSlotsView - Invalid date format. Use '%Y-%m-%d'." )
-            return Response({"error": "Invalid date format. Use '%Y-%m-%d'."}, status=status.HTTP_400_BAD_REQUEST)
-
-        if start_date > end_date:
-            print("DEBUG: TherapistAvailableSlotsView - start_date is after end_date.")
-            return Response({"error": "start_date cannot be after end_date."}, status=status.HTTP_400_BAD_REQUEST)
-
-        today = timezone.now().date()
-        if start_date < today:
-            print(f"DEBUG: TherapistAvailableSlotsView - Adjusted start_date from {start_date} to {today} (current date).")
-            start_date = today
-
-        available_slots = defaultdict(list)
-        therapist_availabilities = TherapistAvailability.objects.filter(therapist=therapist)
-        print(f"DEBUG: TherapistAvailableSlotsView - Number of therapist_availabilities found: {therapist_availabilities.count()}")
-
-        default_availabilities_map = {
-            'Monday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Tuesday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Wednesday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Thursday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Friday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Saturday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-            'Sunday': {'start_time': time(9, 0), 'end_time': time(17, 0), 'slot_duration': 60, 'break_start_time': None, 'break_end_time': None},
-        }
+            return Response({"error": "therapist_ids must be a comma-separated list of integers."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not therapist_ids:
+            return Response({"error": "therapist_ids query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(therapist_ids) > self.max_therapists:
+            return Response({"error": f"At most {self.max_therapists} therapists can be requested at once."}, status=status.HTTP_400_BAD_REQUEST)
 
-        scheduled_sessions = Session.objects.filter(
-            therapist=therapist,
-            session_date__range=[start_date, end_date]
-        ).values('session_date', 'session_time', 'duration_minutes')
-        print(f"DEBUG: TherapistAvailableSlotsView - Scheduled sessions count: {len(scheduled_sessions)}")
-
-        paid_pending_requests = SessionRequest.objects.filter(
-            therapist=therapist,
-            status__in=['pending', 'accepted'],
-            is_paid=True,
-            requested_date__range=[start_date, end_date]
-        ).values('requested_date', 'requested_time', 'session_duration')
-        print(f"DEBUG: TherapistAvailableSlotsView - Paid pending requests count: {len(paid_pending_requests)}")
-
-        unavailable_intervals = defaultdict(list)
-        for session in scheduled_sessions:
-            session_date = session['session_date']
-            session_start_time = session['session_time']
-            session_duration_minutes = session.get('duration_minutes', 120)
-            dummy_datetime = timezone.make_aware(datetime.combine(session_date, session_start_time))
-            session_end_time = (dummy_datetime + timedelta(minutes=session_duration_minutes)).time()
-            unavailable_intervals[session_date].append((session_start_time, session_end_time))
-            print(f"DEBUG: Unavailable interval (Scheduled Session): {session_date} {session_start_time}-{session_end_time}")
-
-        for req in paid_pending_requests:
-            req_date = req['requested_date']
-            req_start_time = req['requested_time']
-            req_duration_minutes = req.get('session_duration', 120)
-            dummy_datetime = timezone.make_aware(datetime.combine(req_date, req_start_time))
-            req_end_time = (dummy_datetime + timedelta(minutes=req_duration_minutes)).time()
-            unavailable_intervals[req_date].append((req_start_time, req_end_time))
-            print(f"DEBUG: Unavailable interval (Paid Pending Request): {req_date} {req_start_time}-{req_end_time}")
-
-
-        current_date = start_date
-        while current_date <= end_date:
-            day_of_week = current_date.strftime('%A')
-            availability = therapist_availabilities.filter(day_of_week=day_of_week).first()
-            print(f"\n--- Checking {current_date} ({day_of_week}) ---")
-
-            current_day_availability = None
-            if availability:
-                current_day_availability = availability
-                print(f"DEBUG: Found explicit TherapistAvailability for {day_of_week}: {availability.start_time}-{availability.end_time}, break: {availability.break_start_time}-{availability.break_end_time}, slot_duration: {availability.slot_duration}")
-            elif day_of_week in default_availabilities_map:
-                class TempAvailability:
-                    def __init__(self, data):
-                        self.start_time = data['start_time']
-                        self.end_time = data['end_time']
-                        self.slot_duration = data['slot_duration']
-                        self.break_start_time = data['break_start_time']
-                        self.break_end_time = data['break_end_time']
-                current_day_availability = TempAvailability(default_availabilities_map[day_of_week])
-                print(f"DEBUG: No explicit availability. Using default for {day_of_week}: {current_day_availability.start_time}-{current_day_availability.end_time}, slot_duration: {current_day_availability.slot_duration}")
-            else:
-                print(f"DEBUG: No TherapistAvailability found for {day_of_week} on {current_date}, and no default for this day.")
-                current_date += timedelta(days=1)
-                continue
-
-            working_start = timezone.make_aware(datetime.combine(current_date, current_day_availability.start_time))
-            working_end = timezone.make_aware(datetime.combine(current_date, current_day_availability.end_time))
-
-            slot_duration_minutes = current_day_availability.slot_duration if current_day_availability.slot_duration else 60
-            print(f"DEBUG: Calculated slot_duration_minutes: {slot_duration_minutes}")
-
-            current_slot_start = working_start
-            while current_slot_start + timedelta(minutes=slot_duration_minutes) <= working_end:
-                current_slot_end = current_slot_start + timedelta(minutes=slot_duration_minutes)
-                print(f"DEBUG: Generating potential slot: {current_slot_start.time()}-{current_slot_end.time()}")
-
-                is_during_break = False
-                if current_day_availability.break_start_time and current_day_availability.break_end_time:
-                    break_start_dt = timezone.make_aware(datetime.combine(current_date, current_day_availability.break_start_time))
-                    break_end_dt = timezone.make_aware(datetime.combine(current_date, current_day_availability.break_end_time))
-
-                    if not (current_slot_end <= break_start_dt or current_slot_start >= break_end_dt):
-                        is_during_break = True
-                        print(f"DEBUG:   - Slot overlaps with break: {break_start_dt.time()}-{break_end_dt.time()}")
-
-                if not is_during_break:
-                    is_booked = False
-                    for booked_start_time, booked_end_time in unavailable_intervals[current_date]:
-                        booked_start_dt = timezone.make_aware(datetime.combine(current_date, booked_start_time))
-                        booked_end_dt = timezone.make_aware(datetime.combine(current_date, booked_end_time))
-
-                        if not (current_slot_end <= booked_start_dt or current_slot_start >= booked_end_dt): # Corrected comparison to current_slot_start
-                            is_booked = True
-                            print(f"DEBUG:   - Slot conflicts with booked interval: {booked_start_dt.time()}-{booked_end_dt.time()}")
-                            break
-
-                    if not is_booked:
-                        now = timezone.now()
-                        # Removed slot_full_start_datetime as it's not defined here and was causing the error
-                        if current_slot_start > now: # Corrected this line to use current_slot_start
-                            print(f"DEBUG:   - Adding available slot: {current_slot_start.strftime('%H:%M')}-{current_slot_end.strftime('%H:%M')}")
-                            available_slots[current_date.isoformat()].append({
-                                "start_time": current_slot_start.strftime('%H:%M'),
-                                "end_time": current_slot_end.strftime('%H:%M'),
-                                "duration_minutes": slot_duration_minutes
-                            })
-                        else:
-                            print(f"DEBUG:   - Slot {current_slot_start.strftime('%H:%M')}-{current_slot_end.strftime('%H:%M')} is in the past/current moment. (Now: {now})")
-                    else:
-                        print(f"DEBUG:   - Slot {current_slot_start.strftime('%H:%M')}-{current_slot_end.strftime('%H:%M')} is BOOKED.")
-                else:
-                    print(f"DEBUG:   - Slot {current_slot_start.strftime('%H:%M')}-{current_slot_end.strftime('%H:%M')} is during BREAK.")
-
-                current_slot_start = current_slot_end
-
-            current_date += timedelta(days=1)
-
-        for date_str in available_slots:
-            available_slots[date_str].sort(key=lambda x: datetime.strptime(x['start_time'], '%H:%M').time())
-
-        print(f"DEBUG: Final available_slots to return: {available_slots}")
-        return Response(available_slots, status=status.HTTP_200_OK)
+        start_date, end_date, error_response = parse_slot_date_range(request)
+        if error_response:
+            return error_response
+        if (end_date - start_date).days + 1 > settings.SLOT_LISTING_MAX_DAYS:
+            return Response({"error": f"Date range cannot exceed {settings.SLOT_LISTING_MAX_DAYS} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Unknown or unverified ids are silently left out, like they would 404 individually.
+        verified_ids = list(User.objects.filter(
+            id__in=therapist_ids, is_therapist=True, is_verified=True
+        ).values_list('id', flat=True))
+
+        slots_by_therapist = read_slot_calendar(verified_ids, start_date, end_date)
+        return Response({
+            str(therapist_id): slots_by_therapist[therapist_id]
+            for therapist_id in therapist_ids if therapist_id in slots_by_therapist
+        }, status=status.HTTP_200_OK)
 
 # --- NEW: AI Recommendation View (for Meditation Hub) ---
 class AiRecommendationView(APIView):
@@ -1522,23 +1605,14 @@ class ChatWithGeminiView(APIView):
 # --- NEW: Unread Message Count View ---
 class UnreadMessageCountView(APIView):
     """
-    Returns the count of unread messages for the logged-in user.
-    A message is unread if the user is in the chat room, is NOT the sender, and is_read=False.
+    Returns the count of unread messages for the logged-in user: messages in their chat rooms
+    sent by someone else and not marked as read. Polled by the frontend, so it reads the counter row kept
+    by unread.py rather than counting messages.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        
-        # Count unread messages in any chat room the user belongs to, where the user is NOT the sender.
-        unread_message_count = ChatMessage.objects.filter(
-            Q(chat_room__user1=user) | Q(chat_room__user2=user) # User is in the room
-        ).exclude(
-            sender=user # User is not the sender
-        ).filter(
-            is_read=False # Message is unread
-        ).count()
-        
+        unread_message_count = unread_count(request.user)
         return Response({"unread_message_count": unread_message_count}, status=status.HTTP_200_OK)
     
 # ... (rest of the file, including ChatMessageListView) ...
@@ -1566,7 +1640,7 @@ class ChatMessageListView(generics.ListAPIView):
             raise PermissionDenied("You are not authorized to view this chat.")
 
         # <--- CORRECTED: Filter by the 'name' field of the related 'chat_room'
-        return ChatMessage.objects.filter(chat_room__name=room_name).order_by('timestamp')
+        return ChatMessage.objects.filter(chat_room__name=room_name).order_by('timestamp', 'id')
     
 class TherapistChatRoomListView(APIView):
     permission_classes = [IsAuthenticated]
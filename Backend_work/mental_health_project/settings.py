@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'cloudinary',
     'cloudinary_storage',
     'mental_health_app',
@@ -44,9 +45,12 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with the user served from cache (see mental_health_app/authentication.py)
+        'mental_health_app.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    )
+    ),
+    # Opt-in: list endpoints only page when the request passes ?page_size= or ?cursor=
+    'DEFAULT_PAGINATION_CLASS': 'mental_health_app.pagination.KeysetPagination',
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -106,6 +110,23 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache for directory pages, profiles, facet counts and JWT users. Their invalidation
+# (version bumps, deletes on save) only reaches every worker through a cache they all share,
+# so this is Redis (a separate database from the channel layer), not the per-process LocMemCache.
+# If Redis is unreachable the backend behaves like an empty cache instead of failing requests;
+# the short socket timeouts keep a hung Redis from stalling every request. Tests use LocMemCache
+# (see mental_health_app/tests/base.py).
+CACHES = {
+    'default': {
+        'BACKEND': 'mental_health_app.cache_backends.FailSafeRedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://127.0.0.1:6379/1'),
+        'KEY_PREFIX': 'mental-health',
+        'OPTIONS': {
+            'socket_connect_timeout': float(os.getenv('REDIS_CACHE_CONNECT_TIMEOUT', '0.5')),
+            'socket_timeout': float(os.getenv('REDIS_CACHE_TIMEOUT', '0.5')),
+        },
+    },
+}
 
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
@@ -168,6 +189,41 @@ CSRF_TRUSTED_ORIGINS = [
 
 AUTH_USER_MODEL = 'mental_health_app.User' 
 
+# Per-process cache of per-(therapist, date) available slots, invalidated across processes
+# through a generation in the shared cache (see mental_health_app/slot_cache.py)
+SLOT_CACHE_MAXSIZE = int(os.getenv('SLOT_CACHE_MAXSIZE', '50000'))
+SLOT_CACHE_TTL = int(os.getenv('SLOT_CACHE_TTL', '300'))  # seconds
+
+# Longest date range returned by one available-slots response; longer ranges are paged with next_cursor
+SLOT_LISTING_MAX_DAYS = int(os.getenv('SLOT_LISTING_MAX_DAYS', '62'))
+
+# How far ahead /api/therapists/earliest-available/ is allowed to look
+EARLIEST_AVAILABLE_HORIZON_DAYS = int(os.getenv('EARLIEST_AVAILABLE_HORIZON_DAYS', '30'))
+
+# How long directory facet counts (?facets=true) are cached per filter combination
+DIRECTORY_FACETS_CACHE_TTL = int(os.getenv('DIRECTORY_FACETS_CACHE_TTL', '60'))  # seconds
+
+# Upper bound on how long a cached directory page or therapist profile lives; save hooks invalidate them sooner
+DIRECTORY_CACHE_TTL = int(os.getenv('DIRECTORY_CACHE_TTL', '600'))  # seconds
+
+# Keyset pagination page sizes (see mental_health_app/pagination.py)
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '50'))
+LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', '200'))
+
+# Default and maximum radius for ?near= therapist searches
+GEO_DEFAULT_RADIUS_KM = float(os.getenv('GEO_DEFAULT_RADIUS_KM', '25'))
+GEO_MAX_RADIUS_KM = float(os.getenv('GEO_MAX_RADIUS_KM', '200'))
+
+# How old a worker's in-process autocomplete index may get before it is rebuilt from the database
+AUTOCOMPLETE_REBUILD_SECONDS = int(os.getenv('AUTOCOMPLETE_REBUILD_SECONDS', '300'))
+
+# Cached user lookup for JWT-authenticated requests (shared cache only, see mental_health_app/authentication.py)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '300'))  # seconds
+
+# WebSocket handshakes: validated access tokens kept until their exp, at most this long (see mental_health_app/middleware.py)
+WS_TOKEN_CACHE_TTL = int(os.getenv('WS_TOKEN_CACHE_TTL', '300'))  # seconds
+WS_TOKEN_CACHE_MAXSIZE = int(os.getenv('WS_TOKEN_CACHE_MAXSIZE', '10000'))
+
 # BEGIN MODIFICATION FOR CLOUDINARY CONFIGURATION
 # Remove or comment out the hardcoded block like this:
 # cloudinary.config(
@@ -91,7 +91,7 @@ export default function TherapistDetail() {
       const availabilityResponse = await axios.get(`http://localhost:8000/api/therapists/${id}/available-slots/?start_date=${formattedToday}&end_date=${formattedFutureDate}`, {
         headers: { Authorization: `Bearer ${token}` }
       });
-      setAvailableSlots(availabilityResponse.data);
+      setAvailableSlots(availabilityResponse.data.slots);
 
     } catch (err) {
       console.error("Error fetching therapist details or availability:", err.response?.data || err.message);